@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Benchmark as-of-date balance queries with ``BalanceCheckpoint`` rows.
+
+Seeds an in-memory SQLite database with one company whose bank account has
+``--entries`` postings spread over ``--years`` years, merges the balance deltas
+(building the monthly checkpoints), then times "balance as of a random date":
+
+* summing every journal line up to the date (the linear baseline),
+* ``pyledger.journal.balance_as_of`` (last checkpoint + that month's lines).
+
+Usage:
+    python -m benchmarks.bench_balance_as_of [--entries 200000] [--years 10]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from pyledger.journal import balance_as_of, merge_balance_deltas
+from pyledger.models import (
+    Account,
+    BalanceDelta,
+    Base,
+    Company,
+    JournalEntry,
+    JournalLine,
+)
+from pyledger.models.account import AccountType
+from pyledger.models.journal import delta_rows
+
+logger = logging.getLogger(__name__)
+
+
+async def timed(label: str, n: int, call: Callable[[], Awaitable[Any]]) -> None:
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    logger.info(
+        "%-28s p50 %9.1f us   p99 %9.1f us",
+        label,
+        statistics.median(samples) * 1e6,
+        samples[int(len(samples) * 0.99) - 1] * 1e6,
+    )
+
+
+async def run(entries: int, years: int, queries: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    rng = random.Random(0)
+    start = date(2026 - years, 1, 1)
+    days = [start + timedelta(days=rng.randrange(365 * years)) for _ in range(entries)]
+    amounts = [Decimal(rng.randrange(1, 100_000)) / 100 for _ in range(entries)]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Company), [{"name": "Bench"}])
+        await conn.execute(
+            insert(Account),
+            [
+                {"company_id": 1, "name": n, "type": t, "currency_code": "USD"}
+                for n, t in (("Bank", AccountType.ASSET), ("Sales", AccountType.INCOME))
+            ],
+        )
+        # Core inserts: the same rows post_entry would write, without the ORM
+        await conn.execute(
+            insert(JournalEntry),
+            [{"company_id": 1, "effective_date": day} for day in days],
+        )
+        await conn.execute(
+            insert(JournalLine),
+            [
+                {
+                    "entry_id": i + 1,
+                    "account_id": account,
+                    "amount": sign * amount,
+                    "effective_date": day,
+                }
+                for i, (day, amount) in enumerate(zip(days, amounts, strict=True))
+                for account, sign in ((1, 1), (2, -1))
+            ],
+        )
+        postings = [
+            (account, day, sign * amount)
+            for day, amount in zip(days, amounts, strict=True)
+            for account, sign in ((1, 1), (2, -1))
+        ]
+        await conn.execute(
+            insert(BalanceDelta),
+            [
+                {"account_id": a, "period": p, "amount": amount}
+                for (a, p), amount in delta_rows(postings).items()
+            ],
+        )
+
+    async with async_sessionmaker(engine)() as session:
+        t = time.perf_counter()
+        await merge_balance_deltas(session)
+        elapsed = time.perf_counter() - t
+        logger.info("merge into checkpoints       %9.1f ms", elapsed * 1e3)
+        probes = [start + timedelta(days=rng.randrange(365 * years)) for _ in range(64)]
+
+        def probe() -> date:
+            return rng.choice(probes)
+
+        async def full_scan() -> Any:
+            return await session.scalar(
+                select(func.sum(JournalLine.amount)).where(
+                    JournalLine.account_id == 1, JournalLine.effective_date <= probe()
+                )
+            )
+
+        async def checkpointed() -> Decimal:
+            return await balance_as_of(session, 1, probe())
+
+        await timed("sum all lines to date", min(queries, 50), full_scan)
+        await timed("balance_as_of (checkpoint)", queries, checkpointed)
+    await engine.dispose()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--entries", type=int, default=200_000)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--queries", type=int, default=1000)
+    args = p.parse_args()
+    asyncio.run(run(args.entries, args.years, args.queries))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Benchmark streaming statement import with ``pyledger.bank_import``.
+
+Writes a synthetic CSV statement of ``--lines`` lines to a temporary file and
+imports it into a SQLite file database (or ``--url``, e.g. a Postgres URL to
+exercise the COPY path), then imports it again (every line a duplicate). For
+comparison, the first ``--naive-lines`` lines are also loaded the naive way:
+whole file read, one ORM object per line, a single commit.
+
+Each run reports wall time, lines/s and the peak resident memory growth while
+it ran (sampled from ``/proc/self/statm``, Linux only).
+
+Usage:
+    python -m benchmarks.bench_bank_import [--lines 1000000] [--naive-lines 100000]
+    python -m benchmarks.bench_bank_import --url postgresql+asyncpg://u:p@host/db
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from pyledger.bank_import import import_statement, parse_csv
+from pyledger.models import Account, BankTransaction, Base, Company
+from pyledger.models.account import AccountType
+
+logger = logging.getLogger(__name__)
+
+PAYEES = ("Coffee", "Grocer", "Fuel", "Rent", "Payroll", "Card fee", "Transfer")
+
+
+def write_statement(path: Path, lines: int) -> None:
+    rng = random.Random(0)
+    day = date(2020, 1, 1)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("date", "amount", "description"))
+        for i in range(lines):
+            if i % 300 == 0:
+                day += timedelta(days=1)
+            amount = Decimal(rng.randrange(-50_000, 50_000)) / 100
+            writer.writerow((day.isoformat(), amount, rng.choice(PAYEES)))
+
+
+class RssSampler:
+    """Peak resident set size growth over a block, sampled in a thread."""
+
+    def __init__(self, interval: float = 0.02) -> None:
+        self.interval = interval
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except OSError:
+            return 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self) -> "RssSampler":
+        self.start = self.peak = self.rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+    @property
+    def growth_mb(self) -> float:
+        return (self.peak - self.start) / 2**20
+
+
+async def measure(label: str, lines: int, call: Callable[[], Awaitable[Any]]) -> None:
+    with RssSampler() as rss:
+        t = time.perf_counter()
+        await call()
+        elapsed = time.perf_counter() - t
+    logger.info(
+        "%-26s %9d lines %8.2f s %10.0f lines/s   peak RSS +%6.1f MB",
+        label,
+        lines,
+        elapsed,
+        lines / elapsed,
+        rss.growth_mb,
+    )
+
+
+async def run(url: str | None, lines: int, naive_lines: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "statement.csv")
+        write_statement(path, lines)
+        engine: AsyncEngine = create_async_engine(
+            url or f"sqlite+aiosqlite:///{Path(tmp, 'bench.db')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            company = Company(name="Bench")
+            session.add(company)
+            await session.flush()
+            account = Account(
+                company_id=company.id,
+                name="Checking",
+                type=AccountType.ASSET,
+                currency_code="USD",
+            )
+            session.add(account)
+            await session.commit()
+            account_id = account.id
+
+        async def streaming() -> None:
+            with open(path, newline="") as f:
+                async with sessionmaker() as session:
+                    await import_statement(session, account_id, parse_csv(f))
+
+        async def naive() -> None:
+            with open(path, newline="") as f:
+                rows = list(csv.DictReader(f.readlines()[: naive_lines + 1]))
+            async with sessionmaker() as session:
+                session.add_all(
+                    BankTransaction(
+                        account_id=account_id,
+                        posted_on=date.fromisoformat(row["date"]),
+                        amount=Decimal(row["amount"]),
+                        description=row["description"],
+                        content_hash=str(i),
+                    )
+                    for i, row in enumerate(rows)
+                )
+                await session.commit()
+
+        # Naive last: memory it frees is not returned to the OS, which would
+        # hide the streaming runs' own growth
+        await measure("streaming import", lines, streaming)
+        await measure("re-import (all duplicate)", lines, streaming)
+        await measure("naive (readlines + ORM)", naive_lines, naive)
+        await engine.dispose()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--url", help="Database URL (default: temporary SQLite file)")
+    p.add_argument("--lines", type=int, default=1_000_000)
+    p.add_argument("--naive-lines", type=int, default=100_000)
+    args = p.parse_args()
+    asyncio.run(run(args.url, args.lines, min(args.naive_lines, args.lines)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark bulk currency conversion against a loop over ``Currency.get_rate``.
+
+Seeds an in-memory SQLite database with a synthetic daily rate history, then
+converts ``--rows`` random (amount, source, target, timestamp) rows with
+``RateTable.convert`` and a sample of ``--loop-rows`` rows with the per-object
+``Currency.get_rate`` path, reporting throughput for both.
+
+Usage:
+    python -m benchmarks.bench_currency_convert [--rows 1000000] [--loop-rows 100000]
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from pyledger.models import Base, Currency, CurrencyRate
+from pyledger.models.currency_convert import load_rate_table
+from pyledger.models.rate_cache import to_epoch
+
+logger = logging.getLogger(__name__)
+
+CODES = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "SEK", "NZD"]
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def seed(session: Session, days: int) -> None:
+    rng = np.random.default_rng(0)
+    for code in CODES:
+        session.add(Currency(code=code, name=code))
+    session.flush()
+    for code in CODES:
+        base = 1.0 if code == "USD" else float(rng.uniform(0.5, 150))
+        walk = base * np.exp(np.cumsum(rng.normal(0, 0.003, days)))
+        session.add_all(
+            CurrencyRate(
+                currency_code=code,
+                rate_vs_usd=1.0 if code == "USD" else float(rate),
+                timestamp=T0 + timedelta(days=day),
+            )
+            for day, rate in enumerate(walk)
+        )
+    session.commit()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--loop-rows", type=int, default=100_000)
+    p.add_argument("--days", type=int, default=730)
+    args = p.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(1)
+    with Session(engine) as session:
+        seed(session, args.days)
+        codes = np.array(CODES)
+        amounts = rng.uniform(1, 10_000, args.rows)
+        src = codes[rng.integers(0, len(codes), args.rows)]
+        tgt = codes[rng.integers(0, len(codes), args.rows)]
+        offsets = rng.uniform(0, args.days * 86_400, args.rows)
+        at = [T0 + timedelta(seconds=float(s)) for s in offsets]
+        epochs = np.array([to_epoch(ts) for ts in at])
+
+        start = time.perf_counter()
+        table = load_rate_table(session, CODES)
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorized = table.convert(amounts, src, tgt, epochs)
+        vec_s = time.perf_counter() - start
+
+        currencies = {c.code: c for c in session.query(Currency).all()}
+        n = min(args.loop_rows, args.rows)
+        start = time.perf_counter()
+        looped = np.empty(n)
+        for i in range(n):
+            rate_src = currencies[src[i]].get_rate(session, at[i])
+            rate_tgt = currencies[tgt[i]].get_rate(session, at[i])
+            assert rate_src and rate_tgt
+            looped[i] = amounts[i] * rate_tgt / rate_src
+        loop_s = time.perf_counter() - start
+
+    np.testing.assert_allclose(vectorized[:n], looped)
+    logger.info("rate table: %d points loaded in %.3fs", len(table), load_s)
+    logger.info(
+        "RateTable.convert: %d rows in %.3fs (%.0f rows/s)",
+        args.rows, vec_s, args.rows / vec_s,
+    )
+    logger.info(
+        "Currency.get_rate loop: %d rows in %.3fs (%.0f rows/s)",
+        n, loop_s, n / loop_s,
+    )
+    logger.info("speedup: %.0fx", (args.rows / vec_s) / (n / loop_s))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark ISO code validation: ``pycountry.lookup`` vs ``pyledger.iso_codes``.
+
+Validates a mix of valid and invalid codes (``--invalid`` fraction) against the
+country, currency and language databases with both paths, and times
+``ERAPI.currency_rates`` over a synthetic snapshot of every ISO 4217 code, the
+per-refresh validation workload.
+
+Usage:
+    python -m benchmarks.bench_iso_codes [--n 100000] [--invalid 0.1]
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable
+
+import pycountry
+
+from pyledger import iso_codes
+from pyledger.models.rate_provider import ERAPI
+
+logger = logging.getLogger(__name__)
+
+DATABASES: dict[str, tuple[Any, Callable[[], iso_codes.CodeIndex], str]] = {
+    "countries": (pycountry.countries, iso_codes.countries, "alpha_2"),
+    "currencies": (pycountry.currencies, iso_codes.currencies, "alpha_3"),
+    "languages": (pycountry.languages, iso_codes.languages, "alpha_3"),
+}
+
+
+def pycountry_valid(database: Any, value: str) -> bool:
+    try:
+        database.lookup(value)
+    except LookupError:
+        return False
+    return True
+
+
+def timed(fn: Callable[..., object], *args: Any) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def validate_all(check: Callable[[str], bool], values: list[str]) -> list[bool]:
+    return [check(v) for v in values]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--n", type=int, default=100_000)
+    p.add_argument("--invalid", type=float, default=0.1)
+    args = p.parse_args()
+    rng = random.Random(0)
+
+    for name, (database, index_fn, field) in DATABASES.items():
+        codes = [getattr(r, field) for r in database]
+        values = [
+            "ZZZZ" if rng.random() < args.invalid else rng.choice(codes).lower()
+            for _ in range(args.n)
+        ]
+        build_s = timed(index_fn)
+        index = index_fn()
+        slow_s = timed(
+            validate_all, partial(pycountry_valid, database), values
+        )
+        fast_s = timed(validate_all, index.__contains__, values)
+        logger.info(
+            "%-10s pycountry.lookup %8.0f/s | iso_codes %10.0f/s | %5.0fx "
+            "(index built in %.1f ms)",
+            name, args.n / slow_s, args.n / fast_s, slow_s / fast_s,
+            build_s * 1000,
+        )
+
+    snapshot = ERAPI.model_validate(
+        {
+            "result": "success",
+            "time_last_update_unix": int(datetime(2025, 1, 1).timestamp()),
+            "base_code": "USD",
+            "rates": {r.alpha_3: 1.0 + i for i, r in enumerate(pycountry.currencies)},
+        }
+    )
+    rounds = 200
+    elapsed = timed(
+        lambda: [list(snapshot.currency_rates()) for _ in range(rounds)]
+    )
+    logger.info(
+        "ERAPI.currency_rates: %d codes x %d snapshots in %.3fs (%.2f ms each)",
+        len(snapshot.rates), rounds, elapsed, elapsed / rounds * 1000,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Benchmark loading company rows with lazy vs eager Pydantic JSON columns.
+
+Fills an in-memory SQLite database with ``--rows`` companies (address and
+settings set on every row) and loads them all through the ORM, once with
+``Company`` (``lazy=True`` columns, ``LazyModel`` proxies) and once with an
+otherwise identical mapping whose columns validate every row on load. Each mode
+is timed for: loading only, loading and reading one settings field per row, and
+loading and rendering the rows with ``pyledger.api.responses.dumps``.
+
+Usage:
+    python -m benchmarks.bench_lazy_columns [--rows 100000] [--repeat 3]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import DateTime, Integer, String, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from pyledger.api.responses import dumps
+from pyledger.models import Base, Company
+from pyledger.models.address import AddressSchema, AddressType
+from pyledger.models.company_settings import (
+    CompanySettingsSchema,
+    CompanySettingsType,
+)
+
+logger = logging.getLogger(__name__)
+
+COUNTRIES = ("US", "FR", "DE", "JP", "CA", "GB")
+CURRENCIES = ("USD", "EUR", "EUR", "JPY", "CAD", "GBP")
+
+
+class _EagerBase(DeclarativeBase):
+    pass
+
+
+class EagerCompany(_EagerBase):
+    """``Company`` with the pre-lazy column types (validated on load)."""
+
+    __tablename__ = "company"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    address: Mapped[Optional[AddressSchema]] = mapped_column(AddressType())
+    settings: Mapped[Optional[CompanySettingsSchema]] = mapped_column(
+        CompanySettingsType()
+    )
+
+
+def company_rows(n: int) -> list[dict[str, Any]]:
+    rows = []
+    for i in range(n):
+        k = i % len(COUNTRIES)
+        rows.append(
+            {
+                "name": f"Company {i}",
+                "address": AddressSchema(
+                    street=f"{i} Main Street",
+                    city="Springfield",
+                    postal_code=f"{10000 + i % 90000}",
+                    country_code=COUNTRIES[k],
+                ),
+                "settings": CompanySettingsSchema(
+                    invoice_prefix=f"C{i}",
+                    default_language_code="en",
+                    default_currency_code=CURRENCIES[k],
+                    timezone="UTC",
+                ),
+            }
+        )
+    return rows
+
+
+async def load(session: AsyncSession, model: Any) -> list[Any]:
+    session.expunge_all()
+    return list((await session.execute(select(model))).scalars())
+
+
+async def load_and_read(session: AsyncSession, model: Any) -> list[Any]:
+    companies = await load(session, model)
+    return [c.settings.default_currency_code for c in companies]
+
+
+async def load_and_render(session: AsyncSession, model: Any) -> bytes:
+    companies = await load(session, model)
+    return dumps(
+        [
+            {"id": c.id, "name": c.name, "address": c.address, "settings": c.settings}
+            for c in companies
+        ]
+    )
+
+
+SCENARIOS: dict[str, Callable[[AsyncSession, Any], Awaitable[Any]]] = {
+    "load": load,
+    "load + read field": load_and_read,
+    "load + render JSON": load_and_render,
+}
+
+
+async def run(rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    start = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(insert(Company), company_rows(rows))
+    logger.info("inserted %d companies in %.2f s", rows, time.perf_counter() - start)
+
+    async with async_sessionmaker(engine)() as session:
+        for label, scenario in SCENARIOS.items():
+            medians = {}
+            for mode, model in (("eager", EagerCompany), ("lazy", Company)):
+                samples = []
+                for _ in range(repeat):
+                    t = time.perf_counter()
+                    await scenario(session, model)
+                    samples.append(time.perf_counter() - t)
+                medians[mode] = statistics.median(samples)
+            logger.info(
+                "%-20s eager %8.1f ms   lazy %8.1f ms   (%.1fx)",
+                label,
+                medians["eager"] * 1000,
+                medians["lazy"] * 1000,
+                medians["eager"] / medians["lazy"],
+            )
+    await engine.dispose()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
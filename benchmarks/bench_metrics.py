@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark the cost of Prometheus metrics collection (``pyledger.metrics``).
+
+Times, with metrics off and on:
+
+* ``GET /api/health`` through ``ASGITransport`` (stubbed session), i.e. the
+  ``MetricsMiddleware`` overhead per request;
+* ``SELECT 1`` on a SQLite engine from ``EngineManager``, i.e. the pool
+  checkout timing and cursor execute events per statement;
+
+plus a single ``Histogram.observe`` call and rendering the registry.
+
+Usage:
+    python -m benchmarks.bench_metrics [--requests 5000] [--queries 5000]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from pyledger import metrics
+from pyledger.api import router as api_router
+from pyledger.api.metrics import MetricsMiddleware
+from pyledger.config import PoolSettings
+from pyledger.db import EngineManager, get_session
+from pyledger.tenancy import Tenant
+
+logger = logging.getLogger(__name__)
+
+
+async def timed(label: str, n: int, call: Callable[[], Awaitable[Any]]) -> None:
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    logger.info(
+        "%-28s p50 %9.1f us   p99 %9.1f us",
+        label,
+        statistics.median(samples) * 1e6,
+        samples[int(len(samples) * 0.99) - 1] * 1e6,
+    )
+
+
+async def fake_session() -> AsyncGenerator[object, None]:
+    class Dummy:
+        async def execute(self, *args: object, **kwargs: object) -> None:
+            return None
+
+    yield Dummy()
+
+
+async def bench_requests(n: int) -> None:
+    for enabled in (False, True):
+        app = FastAPI()
+        if enabled:
+            app.add_middleware(MetricsMiddleware)
+        app.include_router(api_router, prefix="/api")
+        app.dependency_overrides[get_session] = fake_session
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://b") as client:
+
+            async def health() -> Any:
+                return await client.get("/api/health")
+
+            await timed(f"GET /api/health metrics={enabled}", n, health)
+
+
+async def bench_queries(n: int, directory: Path) -> None:
+    for enabled in (False, True):
+        manager = EngineManager(
+            url_factory=lambda t: f"sqlite+aiosqlite:///{directory / t.id}.db",
+            settings=PoolSettings(),
+            metrics=enabled,
+        )
+        engine = manager.get_engine(Tenant(id=f"bench-{enabled}"))
+
+        async def select_one(engine: AsyncEngine = engine) -> Any:
+            async with engine.connect() as conn:
+                return await conn.execute(text("SELECT 1"))
+
+        await timed(f"SELECT 1 metrics={enabled}", n, select_one)
+        await manager.dispose_all()
+
+
+async def run(requests: int, queries: int) -> None:
+    histogram = metrics.Registry().histogram("bench", "Bench.", ("a", "b"))
+
+    async def observe() -> None:
+        histogram.observe(0.0123, "GET", "/api/health")
+
+    async def render() -> str:
+        return metrics.REGISTRY.render()
+
+    await bench_requests(requests)
+    with tempfile.TemporaryDirectory() as directory:
+        await bench_queries(queries, Path(directory))
+    await timed("Histogram.observe", 100_000, observe)
+    await timed("REGISTRY.render", 1000, render)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=5000)
+    p.add_argument("--queries", type=int, default=5000)
+    args = p.parse_args()
+    asyncio.run(run(args.requests, args.queries))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name in ("httpx", "sqlalchemy"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark per-request authorization cost with ``pyledger.permissions``.
+
+Seeds an in-memory SQLite database with one user holding grants on
+``--companies`` companies and times, per simulated request:
+
+* walking ``User.user_permissions`` (lazy-loaded relationship, the old path),
+* loading the ``PermissionMap`` with one query (cache miss),
+* ``get_permissions`` served from the ``PermissionCache`` (cache hit),
+* a batch check of ``--batch`` company ids for write access on a cached map,
+* listing the first 100 writable companies by loading every grant and filtering
+  with ``can_write()`` in Python vs with ``list_accessible_companies`` (mask
+  test and pagination in SQL).
+
+Usage:
+    python -m benchmarks.bench_permissions [--companies 2000] [--batch 500]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from pyledger.models import Base, Company, User, UserPermission
+from pyledger.models.user_permission import Permission
+from pyledger.permissions import (
+    PermissionCache,
+    PermissionMap,
+    list_accessible_companies,
+    load_permission_map,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def walk_relationships(session: Session, user_id: int, company_id: int) -> bool:
+    user = session.get(User, user_id)
+    assert user is not None
+    return any(
+        up.company_id == company_id and up.permission.can_write()
+        for up in user.user_permissions
+    )
+
+
+async def timed(
+    label: str, n: int, call: Callable[[], Awaitable[Any]]
+) -> None:
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    logger.info(
+        "%-28s p50 %9.1f us   p99 %9.1f us",
+        label,
+        statistics.median(samples) * 1e6,
+        samples[int(len(samples) * 0.99) - 1] * 1e6,
+    )
+
+
+async def run(companies: int, batch: int, requests: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User), [{"username": "u", "email": "u@x", "password_hash": "x"}]
+        )
+        await conn.execute(
+            insert(Company), [{"name": f"C{i}"} for i in range(companies)]
+        )
+        rng = random.Random(0)
+        await conn.execute(
+            insert(UserPermission),
+            [
+                {"user_id": 1, "company_id": i + 1, "permission": rng.randrange(8)}
+                for i in range(companies)
+            ],
+        )
+    ids = list(range(1, companies + 1))
+    batch_ids = random.Random(1).sample(ids, min(batch, companies))
+
+    async with async_sessionmaker(engine)() as session:
+        user_id = (await session.execute(select(User.id))).scalar_one()
+
+        async def relationship_walk() -> bool:
+            session.expunge_all()
+            return await session.run_sync(walk_relationships, user_id, ids[-1])
+
+        async def miss() -> PermissionMap:
+            return await load_permission_map(session, user_id)
+
+        cache = PermissionCache()
+
+        async def hit() -> PermissionMap:
+            return await cache.get("default", user_id, miss)
+
+        pm = await hit()
+
+        async def batch_check() -> frozenset[int]:
+            return pm.filter(batch_ids, Permission.WRITE_MASK)
+
+        async def single_check() -> bool:
+            return (await hit()).can_write(ids[-1])
+
+        async def list_python() -> list[Company]:
+            session.expunge_all()
+            rows = await session.execute(
+                select(UserPermission, Company)
+                .join(Company, UserPermission.company_id == Company.id)
+                .where(UserPermission.user_id == user_id)
+                .order_by(Company.id)
+            )
+            return [c for up, c in rows if up.permission.can_write()][:100]
+
+        async def list_sql() -> list[Company]:
+            session.expunge_all()
+            page = await list_accessible_companies(
+                session, user_id, Permission.WRITE_MASK, limit=100
+            )
+            return page.items
+
+        await timed("relationship walk", min(requests, 200), relationship_walk)
+        await timed("load map (cache miss)", min(requests, 200), miss)
+        await timed("get map (cache hit)", requests, hit)
+        await timed(f"batch check {len(batch_ids)} ids", requests, batch_check)
+        await timed("single check (cache hit)", requests, single_check)
+        await timed("list writable (Python)", min(requests, 200), list_python)
+        await timed("list writable (SQL mask)", min(requests, 200), list_sql)
+    await engine.dispose()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--companies", type=int, default=2000)
+    p.add_argument("--batch", type=int, default=500)
+    p.add_argument("--requests", type=int, default=10_000)
+    args = p.parse_args()
+    asyncio.run(run(args.companies, args.batch, args.requests))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
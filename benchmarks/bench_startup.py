@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Benchmark cold start: import time and first-request latency of ``create_app``.
+
+Each sample runs in a fresh interpreter. ``python -X importtime`` measures the
+cumulative import time of ``--module`` (default ``pyledger.app``) and lists the
+slowest imports; a second child process times ``create_app()``, the lifespan
+startup (``SCHEMA_STARTUP=skip``, so no database is needed) and the first two
+``/api/health`` requests served over ``httpx.ASGITransport`` against in-memory
+SQLite.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--top 15]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import AsyncGenerator
+
+logger = logging.getLogger(__name__)
+
+# Imports we expect to be deferred until first use
+LAZY_MODULES = ("httpx", "pycountry", "numpy", "pyledger.models.rate_provider")
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Map module -> cumulative import time (us) from ``-X importtime`` output."""
+    times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure_imports(module: str) -> dict[str, int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+async def first_requests() -> dict[str, float]:
+    """Child process: time app creation, lifespan startup and first requests."""
+    os.environ.setdefault("SCHEMA_STARTUP", "skip")
+    start = time.perf_counter()
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy.ext.asyncio import (
+        AsyncSession,
+        async_sessionmaker,
+        create_async_engine,
+    )
+
+    from pyledger.app import create_app
+    from pyledger.db import get_session
+
+    timings = {"import": time.perf_counter() - start}
+    t = time.perf_counter()
+    app = create_app()
+    timings["create_app"] = time.perf_counter() - t
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    sessionmaker = async_sessionmaker(engine)
+
+    async def sqlite_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = sqlite_session
+    t = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["lifespan"] = time.perf_counter() - t
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as ac:
+            for label in ("first_request", "second_request"):
+                t = time.perf_counter()
+                resp = await ac.get("/api/health")
+                resp.raise_for_status()
+                timings[label] = time.perf_counter() - t
+    await engine.dispose()
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def measure_first_requests() -> dict[str, float]:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--module", default="pyledger.app")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.child:
+        sys.stdout.write(json.dumps(asyncio.run(first_requests())) + "\n")
+        return
+
+    imports = [measure_imports(args.module) for _ in range(args.repeat)]
+    totals = [run[args.module] / 1000 for run in imports]
+    logger.info(
+        "import %s: median %.1f ms (min %.1f, max %.1f) over %d runs",
+        args.module, statistics.median(totals), min(totals), max(totals),
+        args.repeat,
+    )
+    last = imports[-1]
+    for name in LAZY_MODULES:
+        state = "IMPORTED" if name in last else "deferred"
+        logger.info("  %-32s %s", name, state)
+    logger.info("slowest imports (cumulative):")
+    for name, us in sorted(last.items(), key=lambda kv: kv[1], reverse=True)[
+        : args.top
+    ]:
+        logger.info("  %8.1f ms  %s", us / 1000, name)
+
+    samples = [measure_first_requests() for _ in range(args.repeat)]
+    for key in samples[0]:
+        values = [s[key] * 1000 for s in samples]
+        logger.info(
+            "%-15s median %8.1f ms (min %.1f, max %.1f)",
+            key, statistics.median(values), min(values), max(values),
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
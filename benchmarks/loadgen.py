@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""In-process load generator for the ``create_app()`` API.
+
+Runs ``--clients`` concurrent virtual clients against the app for
+``--duration`` seconds (after ``--warmup`` seconds whose results are dropped).
+Each client sends its next request as soon as the previous one completed
+(closed loop), picking requests from the scenario by weight. Reports
+requests/s, error count and p50/p95/p99/max latency, overall and per request.
+
+Transports:
+
+* ``asgi`` (default): ``httpx.ASGITransport``, no sockets; the framework and
+  app cost only;
+* ``uvicorn``: a uvicorn server on a free local port in the same process, so
+  HTTP parsing and the event loop's socket handling are included (the clients
+  share the process's CPU: compare runs, don't read absolute capacity off it).
+
+Databases (``--db``), swapped in through ``app.dependency_overrides``:
+
+* ``stub`` (default): ``get_session`` yields a session whose ``execute`` does
+  nothing, isolating framework overhead from database cost;
+* ``sqlite``: a temporary SQLite file seeded with ``--entries`` journal entries;
+* ``app``: no override; the app's own Postgres engines (``DB_HOST`` etc., e.g.
+  the compose database), with the lifespan run around the load.
+
+``get_current_user_id`` always returns ``--user-id`` (the app has no login, so
+this is also what lets it mount the journal export router ``create_app``
+leaves out), and the ``/api/metrics`` token check is overridden.
+
+Usage:
+    python -m benchmarks.loadgen [--scenario health] [--clients 50] [--duration 10]
+    python -m benchmarks.loadgen --scenario export --db sqlite --transport uvicorn
+    python -m benchmarks.loadgen --path /api/metrics --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import tempfile
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator, Callable
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from pyledger.api.exports import router as exports_router
+from pyledger.api.metrics import require_metrics_token
+from pyledger.app import create_app
+from pyledger.db import get_session
+from pyledger.journal import post_entry
+from pyledger.models import Account, Base, Company, User, UserPermission
+from pyledger.models.account import AccountType
+from pyledger.models.user_permission import Permission
+from pyledger.permissions import get_current_user_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    description: str
+    # (weight, method, path); "{company_id}" is filled in from --company-id
+    requests: tuple[tuple[int, str, str], ...]
+    # Needs real rows: not runnable with --db stub
+    needs_db: bool = False
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "health": Scenario("GET /api/health", ((1, "GET", "/api/health"),)),
+    "metrics": Scenario("GET /api/metrics", ((1, "GET", "/api/metrics"),)),
+    "mixed": Scenario(
+        "health checks with a Prometheus scrape every tenth request",
+        ((9, "GET", "/api/health"), (1, "GET", "/api/metrics")),
+    ),
+    "export": Scenario(
+        "NDJSON journal export of one company",
+        ((1, "GET", "/api/companies/{company_id}/journal/export?format=ndjson"),),
+        needs_db=True,
+    ),
+}
+
+
+@dataclass
+class Summary:
+    requests: int
+    errors: int
+    rps: float
+    # Milliseconds
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+
+@dataclass
+class Recorder:
+    """Latencies (seconds) and error counts per request label."""
+
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def add(self, label: str, latency: float, ok: bool) -> None:
+        self.latencies.setdefault(label, []).append(latency)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+    def summary(self, label: str | None, elapsed: float) -> Summary:
+        if label is None:
+            samples = [s for values in self.latencies.values() for s in values]
+            errors = sum(self.errors.values())
+        else:
+            samples, errors = self.latencies[label], self.errors.get(label, 0)
+        samples.sort()
+        return Summary(
+            requests=len(samples),
+            errors=errors,
+            rps=len(samples) / elapsed,
+            p50=statistics.median(samples) * 1000,
+            p95=percentile(samples, 0.95) * 1000,
+            p99=percentile(samples, 0.99) * 1000,
+            max=samples[-1] * 1000,
+        )
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``ordered``."""
+    return ordered[max(0, min(len(ordered) - 1, int(len(ordered) * q + 0.5) - 1))]
+
+
+async def stub_session() -> AsyncGenerator[object, None]:
+    class Stub:
+        async def execute(self, *args: object, **kwargs: object) -> None:
+            return None
+
+    yield Stub()
+
+
+async def seed(session: AsyncSession, entries: int) -> int:
+    """A user with read access to a company with ``entries`` journal entries."""
+    user = User(username="load", email="load@example.com", password_hash="x")
+    company = Company(name="Load Co")
+    session.add_all([user, company])
+    await session.flush()
+    session.add(
+        UserPermission(
+            user_id=user.id, company_id=company.id, permission=Permission.READ_MASK
+        )
+    )
+    bank, sales = (
+        Account(company_id=company.id, name=n, type=t, currency_code="EUR")
+        for n, t in (("Bank", AccountType.ASSET), ("Sales", AccountType.INCOME))
+    )
+    session.add_all([bank, sales])
+    await session.flush()
+    for i in range(entries):
+        await post_entry(
+            session,
+            company.id,
+            [(bank.id, i + 1), (sales.id, -(i + 1))],
+            effective_date=date(2026, 1 + i % 12, 1 + i % 28),
+            description=f"Sale #{i}",
+        )
+    await session.commit()
+    return company.id
+
+
+@asynccontextmanager
+async def sqlite_database(
+    app: FastAPI, entries: int, directory: Path
+) -> AsyncIterator[int]:
+    """Point ``get_session`` at a seeded SQLite file; yields the company id."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / 'load.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        company_id = await seed(session, entries)
+    logger.info("Seeded %d journal entries for company %d", entries, company_id)
+
+    async def session_override() -> AsyncGenerator[AsyncSession, None]:
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    try:
+        yield company_id
+    finally:
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def serve(
+    app: FastAPI, transport: str, lifespan: bool
+) -> AsyncIterator[Callable[[], httpx.AsyncClient]]:
+    """
+    Serve ``app`` over ``transport`` (running its lifespan if asked) and yield
+    a client factory. Every virtual client gets its own ``AsyncClient``, i.e.
+    its own keep-alive connection: one pool shared by all clients serializes
+    on the pool's bookkeeping.
+    """
+    if transport == "asgi":
+        async with AsyncExitStack() as stack:
+            if lifespan:
+                await stack.enter_async_context(app.router.lifespan_context(app))
+            asgi = httpx.ASGITransport(app=app)
+            yield lambda: httpx.AsyncClient(transport=asgi, base_url="http://load")
+        return
+
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        host="127.0.0.1",
+        port=0,
+        lifespan="on" if lifespan else "off",
+        log_level="warning",
+        access_log=False,
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if task.done():
+                task.result()
+                raise RuntimeError("uvicorn exited before starting")
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        yield lambda: httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30)
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def virtual_client(
+    make_client: Callable[[], httpx.AsyncClient],
+    requests: list[tuple[int, str, str]],
+    rng: random.Random,
+    record_from: float,
+    until: float,
+    recorder: Recorder,
+) -> None:
+    weights = [weight for weight, _, _ in requests]
+    async with make_client() as client:
+        while (start := time.perf_counter()) < until:
+            _, method, path = rng.choices(requests, weights)[0]
+            try:
+                response = await client.request(method, path)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if start >= record_from:
+                recorder.add(f"{method} {path}", time.perf_counter() - start, ok)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    scenario = (
+        Scenario(f"GET {args.path}", ((1, "GET", args.path),))
+        if args.path
+        else SCENARIOS[args.scenario]
+    )
+    if scenario.needs_db and args.db == "stub":
+        raise SystemExit(f"Scenario {args.scenario!r} needs --db sqlite or app")
+
+    app = create_app()
+    app.include_router(exports_router, prefix="/api")
+    app.dependency_overrides[get_current_user_id] = lambda: args.user_id
+    app.dependency_overrides[require_metrics_token] = lambda: None
+    async with AsyncExitStack() as stack:
+        company_id = args.company_id
+        if args.db == "stub":
+            app.dependency_overrides[get_session] = stub_session
+        elif args.db == "sqlite":
+            directory = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+            company_id = await stack.enter_async_context(
+                sqlite_database(app, args.entries, directory)
+            )
+        make_client = await stack.enter_async_context(
+            serve(app, args.transport, lifespan=args.db == "app")
+        )
+        requests = [
+            (weight, method, path.format(company_id=company_id))
+            for weight, method, path in scenario.requests
+        ]
+        logger.info(
+            "%s: %d clients, %s transport, %s database, %.0f s (+%.0f s warm-up)",
+            scenario.description,
+            args.clients,
+            args.transport,
+            args.db,
+            args.duration,
+            args.warmup,
+        )
+        recorder = Recorder()
+        record_from = time.perf_counter() + args.warmup
+        until = record_from + args.duration
+        await asyncio.gather(
+            *(
+                virtual_client(
+                    make_client,
+                    requests,
+                    random.Random(args.seed + i),
+                    record_from,
+                    until,
+                    recorder,
+                )
+                for i in range(args.clients)
+            )
+        )
+        # In-flight requests at the deadline also count toward the window
+        elapsed = max(time.perf_counter(), until) - record_from
+
+    if not recorder.latencies:
+        raise SystemExit("No request completed in the measurement window")
+    results = {label: recorder.summary(label, elapsed) for label in recorder.latencies}
+    total = recorder.summary(None, elapsed)
+    logger.info(
+        "%-60s %8s %6s %9s %8s %8s %8s %8s",
+        "request",
+        "count",
+        "errors",
+        "req/s",
+        "p50 ms",
+        "p95 ms",
+        "p99 ms",
+        "max ms",
+    )
+    for label, summary in [*results.items(), ("total", total)]:
+        logger.info(
+            "%-60s %8d %6d %9.1f %8.2f %8.2f %8.2f %8.2f",
+            label,
+            summary.requests,
+            summary.errors,
+            summary.rps,
+            summary.p50,
+            summary.p95,
+            summary.p99,
+            summary.max,
+        )
+    return {
+        "scenario": args.path or args.scenario,
+        "clients": args.clients,
+        "transport": args.transport,
+        "db": args.db,
+        "duration": elapsed,
+        "total": asdict(total),
+        "requests": {label: asdict(summary) for label, summary in results.items()},
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--scenario", choices=sorted(SCENARIOS), default="health")
+    p.add_argument("--path", help="GET this path instead of a scenario")
+    p.add_argument("--clients", type=int, default=50)
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--warmup", type=float, default=2.0)
+    p.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    p.add_argument("--db", choices=("stub", "sqlite", "app"), default="stub")
+    p.add_argument("--entries", type=int, default=1000, help="--db sqlite rows")
+    p.add_argument("--user-id", type=int, default=1)
+    p.add_argument("--company-id", type=int, default=1)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", type=Path, help="also write the results here")
+    args = p.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+        logger.info("Wrote %s", args.json)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name in ("httpx", "sqlalchemy"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    main()
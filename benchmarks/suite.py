@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Micro-benchmark suite with saved baselines and a regression gate.
+
+``run`` times every registered benchmark (or those matching ``--filter``) and
+writes the results as JSON; ``compare`` reads a baseline and a current result
+file and exits with status 1 when any benchmark got slower by more than
+``--threshold`` (a fraction: 0.10 = 10 %).
+
+Each benchmark is calibrated to run at least ``--min-time`` seconds per sample;
+``--repeat`` samples are taken and the per-operation median and minimum are
+recorded. Comparisons use the median.
+
+Benchmarks:
+
+* ``pydantic_type.bind`` / ``.result`` / ``.result_lazy``:
+  ``PydanticTypeDecorator`` bind and result processing of an address;
+* ``permission.checks``: ``Permission`` bit checks and ``PermissionMap.allows``;
+* ``iso_codes.currency``: ``iso_codes.is_currency`` on valid and invalid codes;
+* ``erapi.iter_rates``: ``ERAPI.iter_rates`` over ``tests/resources`` fixture;
+* ``currency.get_rate`` / ``.get_rate_cold``: ``Currency.get_rate`` from the
+  rate cache and with the cache invalidated, against SQLite (``--database-url``
+  for e.g. a local Postgres);
+* ``api.health``: ``GET /api/health`` through ``ASGITransport`` (stub session).
+
+Usage:
+    python -m benchmarks.suite run [--output results.json] [--filter iso_codes]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncContextManager, AsyncGenerator, AsyncIterator, Callable
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from pyledger import iso_codes
+from pyledger.app import create_app
+from pyledger.db import get_session
+from pyledger.models import Base, Currency, CurrencyRate
+from pyledger.models.address import AddressSchema, AddressType
+from pyledger.models.rate_provider import ERAPI
+from pyledger.models.user_permission import Permission
+from pyledger.permissions import PermissionMap
+
+logger = logging.getLogger(__name__)
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "resources" / "erapi_fixture.json"
+
+Operation = Callable[[], Any]
+Setup = Callable[[argparse.Namespace], AsyncContextManager[Operation]]
+
+# name -> setup yielding the operation to time (sync or async callable)
+BENCHMARKS: dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@dataclass
+class Result:
+    # Seconds per operation
+    median: float
+    min: float
+    stdev: float
+    # Operations per sample, samples
+    number: int
+    repeat: int
+
+
+async def _sample(op: Operation, number: int, is_async: bool) -> float:
+    if is_async:
+        start = time.perf_counter()
+        for _ in range(number):
+            await op()
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(number):
+        op()
+    return time.perf_counter() - start
+
+
+async def measure(op: Operation, repeat: int, min_time: float) -> Result:
+    """Time ``op``: calibrate the loop count, then take ``repeat`` samples."""
+    is_async = inspect.iscoroutinefunction(op)
+    number = 1
+    while (elapsed := await _sample(op, number, is_async)) < min_time:
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    samples = [await _sample(op, number, is_async) / number for _ in range(repeat)]
+    return Result(
+        median=statistics.median(samples),
+        min=min(samples),
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        number=number,
+        repeat=repeat,
+    )
+
+
+@benchmark("pydantic_type.bind")
+@asynccontextmanager
+async def pydantic_bind(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    column = AddressType()
+    address = AddressSchema(street="1 Main St", city="Paris", country_code="FR")
+    pg = postgresql.dialect()  # type: ignore[no-untyped-call]
+    dialects = (sqlite.dialect(), pg)
+
+    def bind() -> None:
+        for dialect in dialects:
+            column.process_bind_param(address, dialect)
+
+    yield bind
+
+
+@benchmark("pydantic_type.result")
+@asynccontextmanager
+async def pydantic_result(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    column, dialect = AddressType(), sqlite.dialect()
+    raw = AddressSchema(street="1 Main St", city="Paris", country_code="FR")
+    text = raw.model_dump_json()
+    yield lambda: column.process_result_value(text, dialect)
+
+
+@benchmark("pydantic_type.result_lazy")
+@asynccontextmanager
+async def pydantic_result_lazy(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    column, dialect = AddressType(lazy=True), sqlite.dialect()
+    text = AddressSchema(city="Paris", country_code="FR").model_dump_json()
+    yield lambda: column.process_result_value(text, dialect)
+
+
+@benchmark("permission.checks")
+@asynccontextmanager
+async def permission_checks(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    grants = [Permission(value) for value in range(8)]
+    permissions = PermissionMap.compile(1, ((i, i % 8) for i in range(1000)))
+    company_ids = range(0, 1000, 7)
+
+    def check() -> None:
+        for grant in grants:
+            grant.can_read()
+            grant.can_write()
+            grant.can_execute()
+        for company_id in company_ids:
+            permissions.allows(company_id, Permission.WRITE_MASK)
+
+    yield check
+
+
+@benchmark("iso_codes.currency")
+@asynccontextmanager
+async def iso_currency(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    codes = ["usd", "EUR", "JPY", "ZZZ", "chf", "XXXX", "gbp", "", "BTC", "CAD"]
+
+    def validate() -> None:
+        for code in codes:
+            iso_codes.is_currency(code)
+
+    yield validate
+
+
+@benchmark("erapi.iter_rates")
+@asynccontextmanager
+async def erapi_iter_rates(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    snapshot = json.loads(FIXTURE.read_text())
+
+    class FixtureERAPI(ERAPI):
+        @classmethod
+        async def make_request(cls, *args: Any, **kwargs: Any) -> ERAPI:
+            return cls.model_validate(snapshot)
+
+    async def iter_rates() -> None:
+        async for _ in FixtureERAPI.iter_rates():
+            pass
+
+    logging.getLogger("pyledger.models.rate_provider").setLevel(logging.ERROR)
+    yield iter_rates
+
+
+@asynccontextmanager
+async def rate_database(args: argparse.Namespace) -> AsyncIterator[Session]:
+    engine = create_engine(args.database_url)
+    tables = [Currency.__table__, CurrencyRate.__table__]
+    Base.metadata.create_all(engine, tables=tables)  # type: ignore[arg-type]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        session.merge(Currency(code="EUR", name="Euro", symbol="€"))
+        session.flush()
+        session.execute(
+            insert(CurrencyRate),
+            [
+                {
+                    "currency_code": "EUR",
+                    "rate_vs_usd": 0.9 + i / 10_000,
+                    "timestamp": start + timedelta(days=i),
+                }
+                for i in range(365)
+            ],
+        )
+        try:
+            yield session
+        finally:
+            session.rollback()
+            CurrencyRate.RATE_CACHE.invalidate()
+    engine.dispose()
+
+
+@benchmark("currency.get_rate")
+@asynccontextmanager
+async def currency_get_rate(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    async with rate_database(args) as session:
+        currency = session.get_one(Currency, "EUR")
+        at = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+        yield lambda: currency.get_rate(session, at)
+
+
+@benchmark("currency.get_rate_cold")
+@asynccontextmanager
+async def currency_get_rate_cold(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    async with rate_database(args) as session:
+        currency = session.get_one(Currency, "EUR")
+        at = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+        def get_rate() -> None:
+            CurrencyRate.RATE_CACHE.invalidate(["EUR"])
+            currency.get_rate(session, at)
+
+        yield get_rate
+
+
+async def _stub_session() -> AsyncGenerator[object, None]:
+    class Stub:
+        async def execute(self, *args: object, **kwargs: object) -> None:
+            return None
+
+    yield Stub()
+
+
+@benchmark("api.health")
+@asynccontextmanager
+async def api_health(args: argparse.Namespace) -> AsyncIterator[Operation]:
+    app = create_app()
+    app.dependency_overrides[get_session] = _stub_session
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def health() -> None:
+            (await client.get("/api/health")).raise_for_status()
+
+        yield health
+
+
+async def run(args: argparse.Namespace) -> int:
+    names = [n for n in BENCHMARKS if not args.filter or args.filter in n]
+    if not names:
+        logger.error("No benchmark matches %r", args.filter)
+        return 2
+    results: dict[str, dict[str, Any]] = {}
+    for name in names:
+        async with BENCHMARKS[name](args) as op:
+            result = await measure(op, args.repeat, args.min_time)
+        results[name] = asdict(result)
+        logger.info(
+            "%-28s %12.2f us/op  (min %.2f, stdev %.2f, %d x %d)",
+            name,
+            result.median * 1e6,
+            result.min * 1e6,
+            result.stdev * 1e6,
+            result.repeat,
+            result.number,
+        )
+    document = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(text)
+    else:
+        Path(args.output).write_text(text)
+        logger.info("Wrote %s", args.output)
+    return 0
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> int:
+    """Log the per-benchmark change; 1 if any regressed beyond ``threshold``."""
+    regressions = []
+    for name, now in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None:
+            logger.info("%-28s %12.2f us/op  (new)", name, now["median"] * 1e6)
+            continue
+        change = now["median"] / before["median"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        logger.info(
+            "%-28s %12.2f -> %10.2f us/op  %+7.1f%%%s",
+            name,
+            before["median"] * 1e6,
+            now["median"] * 1e6,
+            change * 100,
+            flag,
+        )
+    for name in sorted(set(baseline["results"]) - set(current["results"])):
+        logger.info("%-28s (missing from current results)", name)
+    if regressions:
+        logger.error(
+            "%d benchmark(s) regressed by more than %.0f%%: %s",
+            len(regressions),
+            threshold * 100,
+            ", ".join(regressions),
+        )
+        return 1
+    return 0
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = p.add_subparsers(dest="command", required=True)
+    run_p = commands.add_parser("run", help="run the benchmarks, write JSON")
+    run_p.add_argument("--output", default="benchmark-results.json")
+    run_p.add_argument("--filter", default="", help="substring of benchmark names")
+    run_p.add_argument("--repeat", type=int, default=5)
+    run_p.add_argument("--min-time", type=float, default=0.1)
+    run_p.add_argument("--database-url", default="sqlite://")
+    compare_p = commands.add_parser("compare", help="fail on regressions")
+    compare_p.add_argument("baseline", type=Path)
+    compare_p.add_argument("current", type=Path)
+    compare_p.add_argument("--threshold", type=float, default=0.10)
+    args = p.parse_args()
+
+    if args.command == "run":
+        return asyncio.run(run(args))
+    return compare(
+        json.loads(args.baseline.read_text()),
+        json.loads(args.current.read_text()),
+        args.threshold,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name in ("httpx", "sqlalchemy"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    raise SystemExit(main())
@@ -8,8 +8,12 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_session
+from .metrics import router as metrics_router
 
 router = APIRouter()
+router.include_router(metrics_router)
+# .exports is not mounted yet: its routes authorize request.state.user_id, which
+# nothing sets until there is an authentication layer (docs/TODO.md)
 
 
 @router.get("/health")
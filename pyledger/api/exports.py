@@ -0,0 +1,70 @@
+"""
+Export endpoints, streamed with ``pyledger.api.streaming``.
+
+``router`` is not part of ``pyledger.api.router``: ``require_permission`` needs
+the ``request.state.user_id`` an authentication layer would set, so until one
+exists the routes could only answer 401. Mount it with that layer (tests and
+``benchmarks/loadgen.py`` mount it with their own stand-in).
+"""
+from datetime import date
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_session
+from ..models import Account, JournalEntry, JournalLine
+from ..models.user_permission import Permission
+from ..permissions import require_permission
+from .streaming import ExportFormat, ExportResponse, export_response
+
+router = APIRouter()
+
+
+def journal_lines_statement(
+    company_id: int, start: date | None = None, end: date | None = None
+) -> Select:
+    """One row per journal line of ``company_id``, in date order."""
+    stmt = (
+        select(
+            JournalLine.effective_date,
+            JournalEntry.id.label("entry_id"),
+            JournalEntry.reference,
+            JournalEntry.description,
+            Account.name.label("account"),
+            Account.currency_code,
+            JournalLine.amount,
+            JournalLine.memo,
+        )
+        .join(JournalEntry, JournalLine.entry_id == JournalEntry.id)
+        .join(Account, JournalLine.account_id == Account.id)
+        .where(JournalEntry.company_id == company_id)
+        .order_by(JournalEntry.effective_date, JournalEntry.id, JournalLine.id)
+    )
+    if start is not None:
+        stmt = stmt.where(JournalEntry.effective_date >= start)
+    if end is not None:
+        stmt = stmt.where(JournalEntry.effective_date <= end)
+    return stmt
+
+
+@router.get(
+    "/companies/{company_id}/journal/export",
+    dependencies=[Depends(require_permission(Permission.READ_MASK))],
+    response_class=ExportResponse,
+)
+async def export_journal(
+    company_id: int,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    format: ExportFormat = ExportFormat.CSV,
+    start: date | None = None,
+    end: date | None = None,
+) -> ExportResponse:
+    """The company's journal lines as a CSV or NDJSON download."""
+    return export_response(
+        session,
+        journal_lines_statement(company_id, start, end),
+        format,
+        filename=f"journal-{company_id}",
+    )
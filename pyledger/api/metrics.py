@@ -0,0 +1,95 @@
+"""
+``/metrics`` endpoint and the request latency middleware.
+
+The series name every tenant that has an engine (DB metrics are labelled by
+tenant slug), so scraping requires ``Authorization: Bearer <METRICS_TOKEN>``;
+without a configured token the endpoint answers 404.
+"""
+import secrets
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.responses import Response
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import get_metrics_token
+from ..db import get_engine_manager
+from ..metrics import CONTENT_TYPE, REGISTRY, REQUEST_DURATION, observe_pools
+
+router = APIRouter()
+
+# Route label for requests that matched no route (keeps 404 scans to one series)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+async def require_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    """Dependency: 404 unless a token is configured, 401 unless it was sent."""
+    token = get_metrics_token()
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        credentials.encode(), token.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get(
+    "/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)]
+)
+async def metrics() -> Response:
+    """All metrics in the Prometheus text format."""
+    observe_pools(get_engine_manager().items())
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's full path template, from the (routed) ``scope``."""
+    # Routers included lazily (recent FastAPI) keep the route's own path, without
+    # the include prefixes, on scope["route"]; the full one is on the context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    template = getattr(context, "path", None)
+    if template is None:
+        route: BaseRoute | None = scope.get("route")
+        template = getattr(route, "path_format", None)
+    return template or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Observe each HTTP request's duration, labelled by the route template
+    (``/api/companies/{company_id}/...``, not the raw path), method and status.
+    The duration runs until the last body chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUEST_DURATION.observe(
+                elapsed, scope["method"], route_template(scope), status
+            )
@@ -0,0 +1,56 @@
+"""Development middleware reporting each request's SQL statistics."""
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..query_stats import N_PLUS_ONE_THRESHOLD, collect_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    Collect ``pyledger.query_stats`` for every HTTP request. The response gets
+    ``X-Query-Count`` / ``X-DB-Time-Ms`` headers (as of the response start:
+    streamed bodies may run more) and, when a statement shape repeats
+    ``threshold`` times, an ``X-Query-Warning`` header and a warning log line
+    naming the statement.
+    """
+
+    def __init__(self, app: ASGIApp, threshold: int = N_PLUS_ONE_THRESHOLD) -> None:
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.1f}"
+                    suspects = stats.suspects(self.threshold)
+                    if suspects:
+                        headers["X-Query-Warning"] = (
+                            f"possible N+1: {len(suspects)} statement(s) "
+                            f"repeated up to {suspects[0][1]}x"
+                        )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        request = f"{scope['method']} {scope['path']}"
+        suspects = stats.suspects(self.threshold)
+        if suspects:
+            shape, times = suspects[0]
+            logger.warning(
+                f"Possible N+1 in {request}: {stats.summary()}; "
+                f"ran {times}x: {shape}"
+            )
+        else:
+            logger.debug(f"{request}: {stats.summary()}")
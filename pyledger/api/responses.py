@@ -0,0 +1,58 @@
+"""JSON responses that pass lazily loaded column values through unparsed."""
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from ..models.lazy_model import LazyModel
+
+
+def _encode(value: Any, out: list[str]) -> None:
+    if isinstance(value, LazyModel):
+        out.append(value.raw_json())
+    elif isinstance(value, BaseModel):
+        out.append(value.model_dump_json())
+    elif isinstance(value, dict):
+        out.append("{")
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                out.append(",")
+            out.append(json.dumps(str(key), ensure_ascii=False))
+            out.append(":")
+            _encode(item, out)
+        out.append("}")
+    elif isinstance(value, (list, tuple)):
+        out.append("[")
+        for i, item in enumerate(value):
+            if i:
+                out.append(",")
+            _encode(item, out)
+        out.append("]")
+    else:
+        out.append(
+            json.dumps(
+                jsonable_encoder(value),
+                ensure_ascii=False,
+                allow_nan=False,
+                separators=(",", ":"),
+            )
+        )
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize ``content`` (dicts, lists, models, scalars) to JSON, writing
+    unmaterialized ``LazyModel`` values as the JSON text read from the database.
+    """
+    out: list[str] = []
+    _encode(content, out)
+    return "".join(out).encode("utf-8")
+
+
+class RawJSONResponse(JSONResponse):
+    """``JSONResponse`` that renders with ``dumps`` (for rows with lazy columns)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,177 @@
+"""Streaming CSV / NDJSON exports over server-side cursors.
+
+``export_response(session, stmt, fmt)`` runs ``stmt`` with
+``AsyncSession.stream`` and ``yield_per`` (a server-side cursor on Postgres)
+and sends each fetched partition as one chunk, so memory is bounded by
+``batch_size`` rows and the first bytes leave as soon as the first partition
+is fetched, whatever the size of the result. ASGI servers apply flow control
+to ``send``, so a slow client also slows the fetching.
+
+``ExportResponse`` watches for the client disconnecting while it streams (also
+while a fetch is in flight) and then cancels the stream. SQLAlchemy invalidates
+a connection whose fetch is interrupted that way, which ends the query on the
+server; the session must be closed (``get_session`` does) or rolled back before
+it is used again.
+
+The session must stay open while the body streams; ``get_session`` does, as
+dependencies with ``yield`` exit after the response is sent.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+from decimal import Decimal
+from enum import StrEnum
+from typing import Any, AsyncIterator, Mapping
+
+import anyio
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from ..models.lazy_model import LazyModel
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched (and sent) per chunk
+EXPORT_BATCH_SIZE: int = 1000
+
+
+class ExportFormat(StrEnum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    @property
+    def media_type(self) -> str:
+        if self is ExportFormat.CSV:
+            return "text/csv; charset=utf-8"
+        return "application/x-ndjson"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, LazyModel):
+        return value.raw_json()
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if isinstance(value, (dict, list)):
+        return json.dumps(jsonable_encoder(value), separators=(",", ":"))
+    return value
+
+
+def _csv_chunk(rows: list[tuple[Any, ...]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_value(value: Any) -> Any:
+    # Amounts as exact decimal strings; the JSON encoder would make them floats
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def _ndjson_chunk(keys: list[str], rows: list[tuple[Any, ...]]) -> bytes:
+    return b"".join(
+        dumps({k: _ndjson_value(v) for k, v in zip(keys, row, strict=True)}) + b"\n"
+        for row in rows
+    )
+
+
+async def stream_rows(
+    session: AsyncSession,
+    stmt: Select,
+    fmt: ExportFormat,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield ``stmt``'s rows encoded as ``fmt``, one chunk per fetched batch (the
+    CSV header first). ``stmt`` should select columns, not ORM entities; the
+    column labels name the fields.
+    """
+    keys = list(stmt.selected_columns.keys())
+    if fmt is ExportFormat.CSV:
+        yield _csv_chunk([tuple(keys)])
+    result = await session.stream(stmt, execution_options={"yield_per": batch_size})
+    try:
+        async for partition in result.partitions():
+            rows = [tuple(row) for row in partition]
+            if fmt is ExportFormat.CSV:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(keys, rows)
+    except anyio.get_cancelled_exc_class():
+        # Cancelled mid-fetch (the client went away): SQLAlchemy invalidates
+        # the connection, and the cursor with it, so there is nothing to close.
+        # On asyncpg that terminates the backend, ending the query.
+        raise
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await result.close()
+        raise
+    else:
+        await result.close()
+
+
+class ExportResponse(StreamingResponse):
+    """
+    ``StreamingResponse`` that always races the body against the client's
+    disconnect. Starlette only does so for ASGI < 2.4 servers and otherwise
+    notices on the next ``send``, i.e. only after a slow query returns.
+
+    The body is cancelled once, asyncio-style, rather than through an anyio
+    cancel scope, which would also cancel SQLAlchemy's cleanup of the
+    interrupted connection.
+    """
+
+    async def _send_body(self, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:  # ASGI 2.4: sending to a closed connection
+            pass
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stream = asyncio.create_task(self._send_body(send))
+        watch = asyncio.create_task(self.listen_for_disconnect(receive))
+        try:
+            await asyncio.wait((stream, watch), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watch.cancel()
+            if not stream.done():
+                stream.cancel()
+                # Let the body iterator's cleanup run before returning
+                await asyncio.gather(stream, return_exceptions=True)
+        if stream.cancelled():
+            logger.info(f"Client disconnected; export of {scope.get('path')} cancelled")
+            closer = getattr(self.body_iterator, "aclose", None)
+            if closer is not None:
+                await closer()
+            return
+        stream.result()  # a failing query surfaces as itself
+        if self.background is not None:
+            await self.background()
+
+
+def export_response(
+    session: AsyncSession,
+    stmt: Select,
+    fmt: ExportFormat,
+    filename: str | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    headers: Mapping[str, str] | None = None,
+) -> ExportResponse:
+    """Stream ``stmt``'s rows as a CSV or NDJSON download (see ``stream_rows``)."""
+    all_headers = dict(headers or {})
+    if filename is not None:
+        all_headers["Content-Disposition"] = (
+            f'attachment; filename="{filename}.{fmt.value}"'
+        )
+    return ExportResponse(
+        stream_rows(session, stmt, fmt, batch_size),
+        media_type=fmt.media_type,
+        headers=all_headers,
+    )
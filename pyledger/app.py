@@ -1,29 +1,61 @@
 """Application factory for PyLedger FastAPI app."""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import router as api_router
+from .api.metrics import MetricsMiddleware
+from .api.query_stats import QueryStatsMiddleware
+from .config import (
+    get_metrics_enabled,
+    get_query_stats_enabled,
+    get_rate_refresh_enabled,
+    get_schema_startup_mode,
+    get_startup_warmup,
+)
+from .db import get_engine_manager, lookup_tenant
+from .http import close_http_client
+from .migrations import prepare_schema
+from .rate_refresh import RateRefreshScheduler
+from .reference_data import warm_reference_data
+from .tenancy import resolver_from_env, set_tenant_resolver
 
 
-
-import logging
-import asyncio
-from contextlib import asynccontextmanager
-from sqlalchemy.ext.asyncio import AsyncEngine
-from .db import get_engine
-from .models import Base
-
 def create_app() -> FastAPI:
     @asynccontextmanager
-    async def lifespan(app: FastAPI):
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         logger = logging.getLogger("pyledger.migration")
-        engine: AsyncEngine = get_engine()
-        logger.info("Checking and migrating database schema (if needed)...")
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database schema check/migration complete.")
+        start = time.perf_counter()
+        mode = get_schema_startup_mode()
+        warmup = (
+            asyncio.create_task(asyncio.to_thread(warm_reference_data))
+            if get_startup_warmup()
+            else None
+        )
+        try:
+            await prepare_schema(mode)
+        finally:
+            warmup_s = await warmup if warmup is not None else 0.0
+        logger.info(
+            f"Startup complete in {(time.perf_counter() - start) * 1000:.1f} ms "
+            f"(schema {mode}, reference data warm-up {warmup_s * 1000:.1f} ms)"
+        )
+        # One worker of the fleet fetches; the others pick the new rates up
+        refresher = RateRefreshScheduler() if get_rate_refresh_enabled() else None
+        if refresher is not None:
+            refresher.start()
         yield
+        if refresher is not None:
+            await refresher.stop()
+        await close_http_client()
+        await get_engine_manager().dispose_all()
 
+    set_tenant_resolver(resolver_from_env(lookup_tenant))
     app = FastAPI(title="PyLedger API", lifespan=lifespan)
 
     # Simple CORS for local dev — tighten for production
@@ -34,6 +66,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
         allow_credentials=True,
     )
+    if get_query_stats_enabled():
+        app.add_middleware(QueryStatsMiddleware)
+    if get_metrics_enabled():
+        app.add_middleware(MetricsMiddleware)
 
     app.include_router(api_router, prefix="/api")
     return app
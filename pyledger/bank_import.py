@@ -0,0 +1,353 @@
+"""Streaming import of bank/card statements (CSV, OFX) into ``BankTransaction``.
+
+``parse_csv`` / ``parse_ofx`` are generators over the file's lines, so a
+statement is never held in memory. ``import_statement`` hashes each line
+(``content_hash``), groups rows into batches and hands them to a writer task
+through a bounded queue: the parser waits while ``queue_size`` batches are
+pending, so memory stays at a few batches whatever the file size.
+
+Each batch is written with one statement and committed. On Postgres rows are
+``COPY``'d into a temporary staging table and moved with ``INSERT ... SELECT
+... ON CONFLICT DO NOTHING``; other dialects use a multi-row ``INSERT ... ON
+CONFLICT DO NOTHING``. Lines whose hash the account already has are skipped,
+so re-importing an overlapping statement, or re-running an import that failed
+halfway, only adds the missing lines.
+"""
+import asyncio
+import csv
+import hashlib
+import html
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterable, Callable, Iterable, Iterator, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models.account import Account
+from .models.bank_transaction import BankTransaction
+from .models.base import ON_CONFLICT_INSERTS
+from .models.journal import to_amount
+
+logger = logging.getLogger(__name__)
+
+# Rows per write; each batch is one statement and one commit
+IMPORT_BATCH_SIZE: int = 10_000
+# Parsed batches allowed to wait for the writer before the parser pauses
+IMPORT_QUEUE_SIZE: int = 4
+
+_COLUMNS = (
+    "account_id",
+    "posted_on",
+    "amount",
+    "description",
+    "fit_id",
+    "content_hash",
+)
+_DESCRIPTION_LENGTH = 255
+
+
+class StatementError(ValueError):
+    """A statement file (or the account it is imported into) is invalid."""
+
+
+class StatementLine(NamedTuple):
+    """One parsed statement line; ``amount`` is signed as on the statement."""
+
+    posted_on: date
+    amount: Decimal
+    description: str = ""
+    fit_id: str | None = None
+
+
+@dataclass
+class ImportResult:
+    """Progress and outcome of ``import_statement``."""
+
+    inserted: int = 0
+    skipped: int = 0
+    batches: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.skipped
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    """Column names and value formats of a bank's CSV export."""
+
+    date: str = "date"
+    amount: str = "amount"
+    description: str = "description"
+    fit_id: str | None = None
+    date_format: str = "%Y-%m-%d"
+    delimiter: str = ","
+
+
+def _parse_amount(value: str) -> Decimal:
+    try:
+        return to_amount(value.strip().replace(" ", ""))
+    except (InvalidOperation, ValueError) as e:
+        raise StatementError(f"Invalid amount {value!r}") from e
+
+
+def _csv_field(row: dict[str, str | None], name: str) -> str:
+    value = row.get(name)
+    if value is None:
+        raise StatementError(f"missing column {name!r}")
+    return value
+
+
+def parse_csv(
+    lines: Iterable[str], fmt: CsvFormat | None = None
+) -> Iterator[StatementLine]:
+    """Parse a CSV statement with a header row, one line at a time."""
+    fmt = fmt or CsvFormat()
+    reader = csv.DictReader(lines, delimiter=fmt.delimiter)
+    iso_dates = fmt.date_format == "%Y-%m-%d"
+    for row in reader:
+        try:
+            raw_date = _csv_field(row, fmt.date).strip()
+            posted_on = (
+                date.fromisoformat(raw_date)
+                if iso_dates
+                else datetime.strptime(raw_date, fmt.date_format).date()
+            )
+            amount = _parse_amount(_csv_field(row, fmt.amount))
+        except ValueError as e:
+            raise StatementError(f"Line {reader.line_num}: {e}") from e
+        description = row.get(fmt.description) or ""
+        fit_id = (row.get(fmt.fit_id) or None) if fmt.fit_id else None
+        yield StatementLine(posted_on, amount, description, fit_id)
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_elements(chunks: Iterable[str]) -> Iterator[tuple[bool, str, str]]:
+    """(closing, TAG, text) for each tag; text may span chunks, tags may not end."""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        # Everything before the last "<" is complete
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            continue
+        for m in _OFX_TAG.finditer(buffer, 0, cut):
+            yield m[1] == "/", m[2].upper(), m[3].strip()
+        buffer = buffer[cut:]
+    for m in _OFX_TAG.finditer(buffer):
+        yield m[1] == "/", m[2].upper(), m[3].strip()
+
+
+def _ofx_line(fields: dict[str, str]) -> StatementLine:
+    try:
+        posted = fields["DTPOSTED"]
+        posted_on = date(int(posted[:4]), int(posted[4:6]), int(posted[6:8]))
+        amount = _parse_amount(fields["TRNAMT"].replace(",", "."))
+    except KeyError as e:
+        raise StatementError(f"OFX transaction without {e}") from e
+    except ValueError as e:
+        raise StatementError(f"OFX transaction {fields}: {e}") from e
+    name = html.unescape(fields.get("NAME", ""))
+    memo = html.unescape(fields.get("MEMO", ""))
+    description = name if not memo or memo == name else f"{name} {memo}".strip()
+    return StatementLine(posted_on, amount, description, fields.get("FITID"))
+
+
+def parse_ofx(chunks: Iterable[str]) -> Iterator[StatementLine]:
+    """
+    Parse the ``<STMTTRN>`` records of an OFX statement, SGML (1.x, leaf tags
+    left open) or XML (2.x), from lines or chunks of any size.
+    """
+    fields: dict[str, str] | None = None
+    for closing, tag, value in _ofx_elements(chunks):
+        if tag == "STMTTRN":
+            if closing and fields is not None:
+                yield _ofx_line(fields)
+                fields = None
+            elif not closing:
+                fields = {}
+        elif fields is not None and not closing and value:
+            fields[tag] = value
+
+
+def content_hash(line: StatementLine, occurrence: int = 0) -> str:
+    """
+    Identity of a statement line within its account: the bank's FITID when
+    there is one, else date, amount, description and ``occurrence`` (the
+    count of identical lines seen before it on the same day).
+    """
+    if line.fit_id:
+        key = f"fitid|{line.fit_id}"
+    else:
+        key = f"{line.posted_on}|{line.amount}|{line.description}|{occurrence}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class _RowBuilder:
+    """
+    Normalizes and hashes statement lines into ``BankTransaction`` insert
+    parameters for one account.
+
+    Identical lines on the same day (two equal card payments) are numbered,
+    counting within each run of consecutive same-day lines: statements are
+    grouped by date, so re-reading a file numbers them the same way, and only
+    one day's lines are remembered at a time.
+    """
+
+    def __init__(self, account_id: int) -> None:
+        self.account_id = account_id
+        self.day: date | None = None
+        self.seen: dict[tuple[Decimal, str], int] = {}
+
+    def __call__(self, line: StatementLine) -> dict[str, Any]:
+        description = " ".join(line.description.split())[:_DESCRIPTION_LENGTH]
+        line = line._replace(amount=to_amount(line.amount), description=description)
+        occurrence = 0
+        if not line.fit_id:
+            if line.posted_on != self.day:
+                self.day = line.posted_on
+                self.seen.clear()
+            key = (line.amount, description)
+            occurrence = self.seen.get(key, 0)
+            self.seen[key] = occurrence + 1
+        return {
+            "account_id": self.account_id,
+            "posted_on": line.posted_on,
+            "amount": line.amount,
+            "description": description,
+            "fit_id": line.fit_id,
+            "content_hash": content_hash(line, occurrence),
+        }
+
+
+def insert_rows(
+    account_id: int, lines: Iterable[StatementLine]
+) -> Iterator[dict[str, Any]]:
+    """``BankTransaction`` insert parameters for ``lines`` (see ``_RowBuilder``)."""
+    return map(_RowBuilder(account_id), lines)
+
+
+_STAGING_TABLE = "bank_transaction_import"
+
+
+async def _copy_batch(session: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    """Postgres: COPY into a temporary table, then move the new rows over."""
+    conn = await session.connection()
+    columns = ", ".join(_COLUMNS)
+    await conn.execute(
+        text(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE} "
+            f"ON COMMIT DELETE ROWS AS SELECT {columns} FROM bank_transaction "
+            "WITH NO DATA"
+        )
+    )
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection  # asyncpg.Connection
+    assert driver is not None
+    await driver.copy_records_to_table(
+        _STAGING_TABLE,
+        records=[tuple(row[c] for c in _COLUMNS) for row in rows],
+        columns=_COLUMNS,
+    )
+    result = await conn.execute(
+        text(
+            f"INSERT INTO bank_transaction ({columns}) "
+            f"SELECT {columns} FROM {_STAGING_TABLE} "
+            "ON CONFLICT (account_id, content_hash) DO NOTHING"
+        )
+    )
+    return result.rowcount
+
+
+async def _insert_batch(session: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    dialect_name = session.get_bind().dialect.name
+    insert = ON_CONFLICT_INSERTS.get(dialect_name)
+    if insert is None:
+        raise NotImplementedError(
+            f"Statement import is not supported on {dialect_name!r}"
+        )
+    # Core insert on the table: the ORM bulk path costs more than the write
+    table = BankTransaction.__table__
+    stmt = insert(table).on_conflict_do_nothing(
+        index_elements=[table.c.account_id, table.c.content_hash]
+    )
+    return len((await session.execute(stmt.returning(table.c.id), rows)).all())
+
+
+async def import_statement(
+    session: AsyncSession,
+    account_id: int,
+    lines: AsyncIterable[StatementLine] | Iterable[StatementLine],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    queue_size: int = IMPORT_QUEUE_SIZE,
+    on_progress: Callable[[ImportResult], Any] | None = None,
+) -> ImportResult:
+    """
+    Import statement ``lines`` into account ``account_id``, committing every
+    ``batch_size`` rows and calling ``on_progress`` after each batch.
+
+    A parse error stops the import; the batches already committed stay, and
+    re-running the corrected file skips them.
+    """
+    if await session.get(Account, account_id) is None:
+        raise StatementError(f"Account {account_id} does not exist")
+    use_copy = session.get_bind().dialect.name == "postgresql"
+    queue: asyncio.Queue[list[dict[str, Any]]] = asyncio.Queue(maxsize=queue_size)
+
+    build_row = _RowBuilder(account_id)
+
+    async def produce() -> None:
+        batch: list[dict[str, Any]] = []
+        try:
+            if isinstance(lines, AsyncIterable):
+                async for line in lines:
+                    batch.append(build_row(line))
+                    if len(batch) >= batch_size:
+                        await queue.put(batch)
+                        batch = []
+            else:
+                for line in lines:
+                    batch.append(build_row(line))
+                    if len(batch) >= batch_size:
+                        await queue.put(batch)
+                        batch = []
+            if batch:
+                await queue.put(batch)
+        finally:
+            # Lets the writer drain what is queued, then stop
+            queue.shutdown()
+
+    result = ImportResult()
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                batch = await queue.get()
+            except asyncio.QueueShutDown:
+                break
+            if use_copy:
+                inserted = await _copy_batch(session, batch)
+            else:
+                inserted = await _insert_batch(session, batch)
+            await session.commit()
+            result.inserted += inserted
+            result.skipped += len(batch) - inserted
+            result.batches += 1
+            if on_progress is not None:
+                on_progress(result)
+    finally:
+        if not producer.done():
+            producer.cancel()
+    # Re-raises a parse error
+    await producer
+    logger.info(
+        f"Imported {result.inserted} statement lines into account {account_id} "
+        f"({result.skipped} already present)"
+    )
+    return result
@@ -0,0 +1,92 @@
+"""Single-flight async TTL cache, the base of the tenant and permission caches."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def shared_load_cancelled(inflight: asyncio.Future[Any]) -> bool:
+    """
+    Whether a single-flight waiter got CancelledError because the shared load
+    was cancelled (with its leader's request), rather than being cancelled
+    itself: then it should retry the load instead of failing.
+    """
+    task = asyncio.current_task()
+    return inflight.cancelled() and not (task is not None and task.cancelling())
+
+
+class SingleFlightCache(Generic[K, V]):
+    """
+    Async TTL cache whose concurrent misses for a key share one load.
+
+    If that load is cancelled, a waiter retries it; failures are not cached.
+    ``None`` values are cached for ``negative_ttl`` (default ``ttl``) seconds
+    and entries are evicted LRU beyond ``max_size``. A load that overlaps an
+    invalidation (``discard``, ``discard_where`` or ``clear``) is returned but
+    not cached, so the data it read before the change cannot be stored back.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float | None = None,
+        max_size: int = 10_000,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+        self._generation = 0
+
+    async def get_or_load(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1]
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not shared_load_cancelled(inflight):
+                    raise
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # Retrieve so an un-awaited future doesn't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        if generation == self._generation:
+            ttl = self.ttl if value is not None else self.negative_ttl
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def discard(self, key: K) -> None:
+        self._generation += 1
+        self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[K], bool]) -> None:
+        """Forget every key for which ``predicate`` is true."""
+        self._generation += 1
+        for key in [k for k in self._entries if predicate(k)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
@@ -9,6 +9,8 @@ Usage:
 """
 
 import os
+import tempfile
+from dataclasses import dataclass
 from typing import Optional
 
 
@@ -33,6 +35,16 @@ def get_db_password() -> Optional[str]:
     return os.getenv("DB_PASSWORD") or os.getenv("DB_ROOT_PASSWORD")
 
 
+def get_erapi_api_key() -> Optional[str]:
+    """Return the exchangerate-api.com key (secret file first, then env var)."""
+    path = os.getenv("ERAPI_API_KEY_FILE")
+    if path:
+        val = _read_secret_file(path)
+        if val:
+            return val
+    return os.getenv("ERAPI_API_KEY")
+
+
 def get_database_url() -> str:
     """Return a Postgres connection URL constructed from env/secrets.
 
@@ -54,3 +66,89 @@ def get_database_url() -> str:
         return f"postgresql://{user}:{pwd}@{host}:{port}/{db}"
 
     return f"postgresql://{user}@{host}:{port}/{db}"
+
+
+def get_schema_startup_mode() -> str:
+    """How the app prepares the DB schema at startup: check, migrate or skip."""
+    return os.getenv("SCHEMA_STARTUP", "check").lower()
+
+
+def get_startup_warmup() -> bool:
+    """Whether the app warms reference data at startup (``STARTUP_WARMUP``)."""
+    return os.getenv("STARTUP_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+def get_metrics_enabled() -> bool:
+    """Whether requests and DB engines record Prometheus metrics (``METRICS``)."""
+    return os.getenv("METRICS", "1").lower() not in ("0", "false", "no")
+
+
+def get_metrics_token() -> Optional[str]:
+    """
+    Bearer token required to scrape ``/api/metrics`` (secret file first, then
+    env var); without one the endpoint is not served.
+    """
+    path = os.getenv("METRICS_TOKEN_FILE")
+    if path:
+        val = _read_secret_file(path)
+        if val:
+            return val
+    return os.getenv("METRICS_TOKEN") or None
+
+
+def get_rate_refresh_enabled() -> bool:
+    """Whether the app refreshes currency rates on a schedule (``RATE_REFRESH``)."""
+    return os.getenv("RATE_REFRESH", "0").lower() in ("1", "true", "yes")
+
+
+def get_rate_cache_dir() -> str:
+    """Directory shared by a host's workers for cached rate provider responses."""
+    return os.getenv("RATE_CACHE_DIR") or os.path.join(
+        tempfile.gettempdir(), "pyledger-rate-cache"
+    )
+
+
+def get_query_stats_enabled() -> bool:
+    """Whether responses report per-request SQL statistics (``QUERY_STATS``, dev)."""
+    return os.getenv("QUERY_STATS", "0").lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Per-tenant pool sizing and the global connection budget."""
+
+    # Idle connections kept by the default (common) database's pool
+    pool_size: int = 5
+    # Idle connections kept by each other tenant's pool: most tenants are cold
+    tenant_pool_size: int = 1
+    max_overflow: int = 5
+    pool_timeout: float = 30.0
+    # Upper bound on connections across all tenant engines of all workers
+    max_connections: int = 100
+    # Worker processes sharing max_connections (uvicorn's WEB_CONCURRENCY)
+    workers: int = 1
+    # Seconds an unused tenant engine is kept before it is disposed
+    idle_timeout: float = 600.0
+
+    @property
+    def process_connections(self) -> int:
+        """This worker's share of ``max_connections``."""
+        return max(1, self.max_connections // max(1, self.workers))
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            tenant_pool_size=int(
+                os.getenv("DB_TENANT_POOL_SIZE", cls.tenant_pool_size)
+            ),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", cls.pool_timeout)),
+            max_connections=int(
+                os.getenv("DB_MAX_CONNECTIONS", cls.max_connections)
+            ),
+            workers=int(os.getenv("WEB_CONCURRENCY", cls.workers)),
+            idle_timeout=float(
+                os.getenv("DB_ENGINE_IDLE_TIMEOUT", cls.idle_timeout)
+            ),
+        )
@@ -1,44 +1,307 @@
-"""Database helpers: engine and async session dependency.
+"""Database helpers: per-tenant engines and the async session dependency.
 
-This is intentionally minimal for single-tenant usage, and includes small abstractions
-(Async engine factory and session dependency) that will make moving to multi-tenant
-(engine-per-tenant) easier later.
+``EngineManager`` maps a tenant to its own ``AsyncEngine`` (the tenant's
+``db_name`` on the configured server, or the default database). Each engine has
+a bounded pool (other tenants keep only ``tenant_pool_size`` idle connections),
+and a ``ConnectionBudget`` caps the connections open across all of them at this
+worker's share of ``max_connections``. Opening a connection past the budget
+first disposes the least-recently-used engine that has none checked out, then
+waits up to ``pool_timeout`` for another engine to return or close one; busy
+engines are never disposed. Engines idle for longer than ``idle_timeout`` are
+disposed as well.
 """
-from typing import AsyncGenerator
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Annotated, Any, AsyncGenerator, Callable, Iterator
 
+from fastapi import Depends
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Dialect, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import ConnectionPoolEntry
+from sqlalchemy.util import await_only
 
-from .config import get_database_url
-
-_engine: AsyncEngine | None = None
-_sessionmaker: async_sessionmaker[AsyncSession] | None = None
-
-
-def get_engine() -> AsyncEngine:
-    global _engine, _sessionmaker
-    if _engine is None:
-        DATABASE_URL = get_database_url()
-        # Use asyncpg driver
-        async_database_url = DATABASE_URL.replace(
-            "postgresql://", "postgresql+asyncpg://"
-        )
-        _engine = create_async_engine(async_database_url)
-        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
-    return _engine
-
-
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency that yields an AsyncSession for request handlers."""
-    global _sessionmaker
-    if _sessionmaker is None:
-        # Ensure engine/sessionmaker initialized
-        get_engine()
-    # mypy: convince the type checker that _sessionmaker is initialized
-    assert _sessionmaker is not None
-    async with _sessionmaker() as session:
+from .config import PoolSettings, get_database_url, get_metrics_enabled
+from .metrics import InstrumentedPool, instrument_engine
+from .models.tenant import TenantRecord
+from .tenancy import DEFAULT_TENANT, Tenant, get_tenant
+
+logger = logging.getLogger(__name__)
+
+
+def async_database_url(tenant: Tenant) -> str:
+    """Return the asyncpg URL for ``tenant`` (its db_name on the default server)."""
+    # Use asyncpg driver
+    url = make_url(
+        get_database_url().replace("postgresql://", "postgresql+asyncpg://")
+    )
+    if tenant.db_name:
+        url = url.set(database=tenant.db_name)
+    return url.render_as_string(hide_password=False)
+
+
+class ConnectionBudget:
+    """
+    Counts the DBAPI connections open across an ``EngineManager``'s engines, from
+    connect to close (so idle pooled connections keep their slot), up to
+    ``limit``.
+    """
+
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError(f"limit must be positive, got {limit}")
+        self.limit = limit
+        self.open = 0
+        # Set when a connection is closed or returned to its pool
+        self._changed: asyncio.Event | None = None
+
+    def try_acquire(self) -> bool:
+        if self.open >= self.limit:
+            return False
+        self.open += 1
+        return True
+
+    def release(self) -> None:
+        self.open -= 1
+        self.notify()
+
+    def notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until a connection is closed or checked in (TimeoutError after)."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        self._changed.clear()
+        async with asyncio.timeout(max(timeout, 0)):
+            await self._changed.wait()
+
+
+class TenantPool(InstrumentedPool):
+    """``InstrumentedPool`` that gives its connections' slots back to a budget."""
+
+    budget: ConnectionBudget | None = None
+
+    def _close_connection(self, connection: Any, *, terminate: bool = False) -> None:
+        try:
+            super()._close_connection(connection, terminate=terminate)
+        finally:
+            if self.budget is not None:
+                self.budget.release()
+
+    def recreate(self) -> "TenantPool":
+        pool = super().recreate()
+        assert isinstance(pool, TenantPool)
+        pool.budget = self.budget
+        return pool
+
+
+@dataclass
+class TenantEngine:
+    engine: AsyncEngine
+    sessionmaker: async_sessionmaker[AsyncSession]
+    last_used: float
+
+    def checked_out(self) -> int:
+        return self.engine.pool.checkedout()  # type: ignore[attr-defined]
+
+
+class EngineManager:
+    """Maps tenant -> pooled ``AsyncEngine`` under a global connection budget."""
+
+    def __init__(
+        self,
+        url_factory: Callable[[Tenant], str] = async_database_url,
+        settings: PoolSettings | None = None,
+        metrics: bool | None = None,
+    ) -> None:
+        self.url_factory = url_factory
+        self.settings = settings or PoolSettings.from_env()
+        self.metrics = get_metrics_enabled() if metrics is None else metrics
+        self.budget = ConnectionBudget(self.settings.process_connections)
+        self._engines: OrderedDict[str, TenantEngine] = OrderedDict()
+        self._disposals: set[asyncio.Task[None]] = set()
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self._engines
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def items(self) -> Iterator[tuple[str, AsyncEngine]]:
+        """Iterate (tenant_id, engine) pairs, least recently used first."""
+        return ((tid, entry.engine) for tid, entry in self._engines.items())
+
+    def _entry(self, tenant: Tenant) -> TenantEngine:
+        now = time.monotonic()
+        entry = self._engines.get(tenant.id)
+        if entry is None:
+            self.evict_idle(now)
+            engine = create_async_engine(
+                self.url_factory(tenant),
+                pool_size=(
+                    self.settings.pool_size
+                    if tenant.id == DEFAULT_TENANT.id
+                    else self.settings.tenant_pool_size
+                ),
+                max_overflow=self.settings.max_overflow,
+                pool_timeout=self.settings.pool_timeout,
+                pool_pre_ping=True,
+                poolclass=TenantPool,
+            )
+            self._budget_engine(engine, tenant.id)
+            if self.metrics:
+                instrument_engine(engine, tenant.id)
+            entry = TenantEngine(
+                engine=engine,
+                sessionmaker=async_sessionmaker(engine, expire_on_commit=False),
+                last_used=now,
+            )
+            self._engines[tenant.id] = entry
+            logger.debug(f"Created engine for tenant {tenant.id!r}")
+        else:
+            entry.last_used = now
+            self._engines.move_to_end(tenant.id)
+        return entry
+
+    def get_engine(self, tenant: Tenant = DEFAULT_TENANT) -> AsyncEngine:
+        return self._entry(tenant).engine
+
+    def get_sessionmaker(
+        self, tenant: Tenant = DEFAULT_TENANT
+    ) -> async_sessionmaker[AsyncSession]:
+        return self._entry(tenant).sessionmaker
+
+    def _budget_engine(self, engine: AsyncEngine, tenant_id: str) -> None:
+        pool = engine.sync_engine.pool
+        assert isinstance(pool, TenantPool)
+        pool.budget = self.budget
+
+        @event.listens_for(engine.sync_engine, "do_connect")
+        def do_connect(
+            dialect: Dialect,
+            record: ConnectionPoolEntry,
+            cargs: tuple[Any, ...],
+            cparams: dict[str, Any],
+        ) -> Any:
+            # Runs in the greenlet of the awaiting checkout
+            await_only(self._reserve(tenant_id))
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except BaseException:
+                self.budget.release()
+                raise
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def checkin(dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+            self.budget.notify()
+
+    async def _reserve(self, tenant_id: str) -> None:
+        """Take a budget slot for a new connection of ``tenant_id``'s engine."""
+        deadline = time.monotonic() + self.settings.pool_timeout
+        while not self.budget.try_acquire():
+            self._release_idle(keep=tenant_id)
+            try:
+                await self.budget.wait(deadline - time.monotonic())
+            except TimeoutError:
+                raise exc.TimeoutError(
+                    f"Connection budget of {self.budget.limit} exhausted; "
+                    f"timed out after {self.settings.pool_timeout}s waiting for "
+                    f"tenant {tenant_id!r}"
+                ) from None
+
+    def _release_idle(self, keep: str) -> None:
+        # Dispose the LRU engine holding only idle connections; its pool closes
+        # them, giving their slots back. Busy engines are left alone.
+        for tenant_id, entry in self._engines.items():
+            pool = entry.engine.sync_engine.pool
+            if tenant_id == keep or entry.checked_out():
+                continue
+            if isinstance(pool, TenantPool) and pool.checkedin():
+                logger.info(
+                    f"Connection budget exhausted; disposing idle tenant "
+                    f"{tenant_id!r}"
+                )
+                self.evict(tenant_id)
+                return
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """Dispose engines unused for longer than ``idle_timeout``."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.settings.idle_timeout
+        stale = [
+            tid
+            for tid, entry in self._engines.items()
+            if entry.last_used < cutoff and not entry.checked_out()
+        ]
+        for tenant_id in stale:
+            self.evict(tenant_id)
+        return stale
+
+    def evict(self, tenant_id: str) -> None:
+        """
+        Dispose ``tenant_id``'s engine in the background. Must run on the event
+        loop: closing its connections is what returns their budget slots.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._engines.pop(tenant_id, None)
+        if entry is None:
+            return
+        logger.debug(f"Disposing engine for tenant {tenant_id!r}")
+        task = loop.create_task(entry.engine.dispose())
+        self._disposals.add(task)
+        task.add_done_callback(self._disposals.discard)
+
+    async def dispose_all(self) -> None:
+        """Dispose every engine (call on application shutdown)."""
+        for tenant_id in list(self._engines):
+            self.evict(tenant_id)
+        if self._disposals:
+            await asyncio.gather(*self._disposals)
+
+
+_engine_manager: EngineManager | None = None
+
+
+def get_engine_manager() -> EngineManager:
+    global _engine_manager
+    if _engine_manager is None:
+        _engine_manager = EngineManager()
+    return _engine_manager
+
+
+def get_engine(tenant: Tenant = DEFAULT_TENANT) -> AsyncEngine:
+    return get_engine_manager().get_engine(tenant)
+
+
+async def get_session(
+    tenant: Annotated[Tenant, Depends(get_tenant)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that yields an AsyncSession bound to the request's tenant."""
+    async with get_engine_manager().get_sessionmaker(tenant)() as session:
         yield session
+
+
+async def lookup_tenant(slug: str) -> Tenant | None:
+    """Resolve a tenant slug against the registry in the common (default) DB."""
+    async with get_engine_manager().get_sessionmaker(DEFAULT_TENANT)() as session:
+        record = await TenantRecord.lookup(session, slug)
+    if record is None:
+        return None
+    return Tenant(id=record.slug, db_name=record.db_name)
+
+
+async def list_tenants() -> list[Tenant]:
+    """Return the active tenants registered in the common (default) DB."""
+    async with get_engine_manager().get_sessionmaker(DEFAULT_TENANT)() as session:
+        records = await TenantRecord.list_active(session)
+    return [Tenant(id=record.slug, db_name=record.db_name) for record in records]
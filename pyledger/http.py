@@ -0,0 +1,66 @@
+"""Shared HTTP client for outbound API calls (currency rate providers, etc.).
+
+Like ``db.get_engine``, the client is created lazily and reused, so repeated
+requests share pooled keep-alive connections instead of paying for a new
+TCP/TLS handshake every call. An ``httpx.AsyncClient`` is bound to the event
+loop it was first used on, so there is one client per loop (e.g. per test case
+or successive ``asyncio.run`` call). Clients of loops that have since closed
+are dropped (their connections cannot be closed gracefully without the loop);
+``close_http_client`` closes the rest.
+
+``httpx`` is imported on first use, so processes that never call out (most
+CLI scripts, workers before their first rate refresh) don't pay for it.
+"""
+import asyncio
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+# Seconds
+DEFAULT_TIMEOUT: float = 10.0
+DEFAULT_CONNECT_TIMEOUT: float = 5.0
+
+DEFAULT_MAX_CONNECTIONS: int = 20
+DEFAULT_MAX_KEEPALIVE: int = 10
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the process-wide pooled client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        for stale in [other for other in _clients if other.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=DEFAULT_MAX_CONNECTIONS,
+                max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+            ),
+        )
+    return client
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared clients (call on application shutdown): this loop's is
+    awaited, those of loops still running in other threads are closed there.
+    """
+    loop = asyncio.get_running_loop()
+    clients, pending = list(_clients.items()), []
+    _clients.clear()
+    for owner, client in clients:
+        if owner is loop:
+            await client.aclose()
+        elif owner.is_running():
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+            pending.append(asyncio.wrap_future(future))
+    await asyncio.gather(*pending, return_exceptions=True)
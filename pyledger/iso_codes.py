@@ -0,0 +1,84 @@
+"""
+Precomputed ISO 3166 / 4217 / 639 code indexes for validators.
+
+``pycountry.<db>.lookup`` tries each index and then scans every record's name
+fields, raising ``LookupError`` on a miss. The indexes here are built once from
+the same records (every field, lower-cased, mapped to the record's canonical
+code), so a lookup accepts exactly what ``pycountry`` accepts in one dict probe
+and a miss is just ``None``. They are built on first use, or at startup by
+``pyledger.reference_data.warm_reference_data``.
+"""
+from dataclasses import dataclass
+from functools import cache
+from typing import Mapping
+
+
+@dataclass(frozen=True)
+class CodeIndex:
+    """Canonical codes plus a case-insensitive alias -> canonical code map."""
+
+    codes: frozenset[str]
+    aliases: Mapping[str, str]
+
+    def __contains__(self, value: object) -> bool:
+        return isinstance(value, str) and value.lower() in self.aliases
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def canonical(self, value: str | None) -> str | None:
+        """Return the canonical code for ``value`` (any code or name), if known."""
+        if not isinstance(value, str):
+            return None
+        return self.aliases.get(value.lower())
+
+
+def _is_code_field(key: str) -> bool:
+    return key.startswith("alpha_") or key in ("numeric", "bibliographic")
+
+
+def _build(database_name: str, code_field: str) -> CodeIndex:
+    import pycountry
+
+    records = list(getattr(pycountry, database_name))
+    aliases: dict[str, str] = {}
+    # Codes take precedence over names (as in pycountry's lookup), so e.g. "en"
+    # is English and not a language that happens to be named "En"
+    for is_code_pass in (True, False):
+        for record in records:
+            code = getattr(record, code_field)
+            for key, value in record._fields.items():
+                if isinstance(value, str) and _is_code_field(key) == is_code_pass:
+                    aliases.setdefault(value.lower(), code)
+    codes = frozenset(getattr(record, code_field) for record in records)
+    return CodeIndex(codes=codes, aliases=aliases)
+
+
+@cache
+def countries() -> CodeIndex:
+    """ISO 3166-1 countries, canonical code alpha_2."""
+    return _build("countries", "alpha_2")
+
+
+@cache
+def currencies() -> CodeIndex:
+    """ISO 4217 currencies, canonical code alpha_3."""
+    return _build("currencies", "alpha_3")
+
+
+@cache
+def languages() -> CodeIndex:
+    """ISO 639 languages, canonical code alpha_3."""
+    return _build("languages", "alpha_3")
+
+
+def is_country(value: object) -> bool:
+    return value in countries()
+
+
+def is_currency(value: object) -> bool:
+    return value in currencies()
+
+
+def is_language(value: object) -> bool:
+    return value in languages()
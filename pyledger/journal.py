@@ -0,0 +1,317 @@
+"""Posting to the journal and reading account balances.
+
+``post_entry`` validates and adds a balanced ``JournalEntry`` (the model layer
+adds its ``BalanceDelta`` rows on flush); ``reverse_entry`` cancels one with an
+opposite entry, the only way to correct the append-only journal.
+
+``account_balance`` / ``account_balances`` read the merged ``AccountBalance``
+plus the deltas not merged yet, so a read costs one row plus the postings since
+the last merge, independent of the account's history. ``balances_as_of`` reads
+the last ``BalanceCheckpoint`` before the date's month, the pending deltas
+before that month and the month's lines up to the date: also bounded, however
+long the history. Each read is a single statement, so it sees one consistent
+state even while a merge commits.
+
+``merge_balance_deltas`` folds pending deltas into ``AccountBalance`` and the
+checkpoints; it runs out of band (``pyledger.scripts.merge_balances``) so
+postings never wait on it.
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import Select, and_, delete, func, insert, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models.account import Account
+from .models.base import ON_CONFLICT_INSERTS
+from .models.journal import (
+    AccountBalance,
+    BalanceCheckpoint,
+    BalanceDelta,
+    JournalEntry,
+    JournalError,
+    JournalLine,
+    period_of,
+    to_amount,
+)
+
+logger = logging.getLogger(__name__)
+
+# Deltas folded per merge statement
+MERGE_BATCH_SIZE: int = 10_000
+
+
+class Posting(NamedTuple):
+    """One line of an entry to post: debit (> 0) or credit (< 0) an account."""
+
+    account_id: int
+    amount: Decimal | int | str
+    memo: str | None = None
+
+
+async def post_entry(
+    session: AsyncSession,
+    company_id: int,
+    postings: Iterable[Posting | tuple[int, Decimal | int | str]],
+    effective_date: date | None = None,
+    description: str | None = None,
+    reference: str | None = None,
+    reverses_id: int | None = None,
+) -> JournalEntry:
+    """
+    Add a journal entry for ``company_id`` and flush it (the caller commits).
+
+    Raises ``UnbalancedEntry`` if the amounts do not sum to zero and
+    ``JournalError`` if an account does not belong to the company or the
+    accounts use different currencies.
+    """
+    lines = [Posting(*posting) for posting in postings]
+    account_ids = {line.account_id for line in lines}
+    rows = await session.execute(
+        select(Account.id, Account.currency_code).where(
+            Account.id.in_(account_ids), Account.company_id == company_id
+        )
+    )
+    currencies = dict(rows.all())
+    missing = account_ids - currencies.keys()
+    if missing:
+        raise JournalError(
+            f"Accounts {sorted(missing)} do not exist for company {company_id}"
+        )
+    if len(set(currencies.values())) > 1:
+        raise JournalError("All lines of an entry must use the same currency")
+    entry = JournalEntry(
+        company_id=company_id,
+        effective_date=effective_date or date.today(),
+        description=description,
+        reference=reference,
+        reverses_id=reverses_id,
+        lines=[
+            JournalLine(account_id=line.account_id, amount=line.amount, memo=line.memo)
+            for line in lines
+        ],
+    )
+    entry.check_balanced()
+    session.add(entry)
+    await session.flush()
+    return entry
+
+
+async def reverse_entry(
+    session: AsyncSession,
+    entry_id: int,
+    effective_date: date | None = None,
+    description: str | None = None,
+) -> JournalEntry:
+    """Post the opposite of entry ``entry_id`` (and flush)."""
+    entry = await session.get(JournalEntry, entry_id)
+    if entry is None:
+        raise JournalError(f"Journal entry {entry_id} does not exist")
+    rows = await session.execute(
+        select(JournalLine.account_id, JournalLine.amount, JournalLine.memo).where(
+            JournalLine.entry_id == entry_id
+        )
+    )
+    return await post_entry(
+        session,
+        entry.company_id,
+        [Posting(account_id, -amount, memo) for account_id, amount, memo in rows],
+        effective_date=effective_date or entry.effective_date,
+        description=description or f"Reversal of entry {entry_id}",
+        reference=entry.reference,
+        reverses_id=entry_id,
+    )
+
+
+async def _sum_by_account(
+    session: AsyncSession, account_ids: list[int], *parts: Select[int, Decimal]
+) -> dict[int, Decimal]:
+    """Sum the ``(account_id, amount)`` rows of ``parts`` in one statement."""
+    balances = {account_id: Decimal(0) for account_id in account_ids}
+    rows = union_all(*parts).subquery()
+    result = await session.execute(
+        select(rows.c.account_id, func.sum(rows.c.amount)).group_by(rows.c.account_id)
+    )
+    for account_id, amount in result:
+        balances[account_id] += to_amount(amount)
+    return balances
+
+
+async def account_balances(
+    session: AsyncSession, account_ids: Iterable[int]
+) -> dict[int, Decimal]:
+    """Current balances of ``account_ids`` (0 for accounts without postings)."""
+    ids = list(account_ids)
+    return await _sum_by_account(
+        session,
+        ids,
+        select(AccountBalance.account_id, AccountBalance.balance.label("amount")).where(
+            AccountBalance.account_id.in_(ids)
+        ),
+        select(BalanceDelta.account_id, BalanceDelta.amount).where(
+            BalanceDelta.account_id.in_(ids)
+        ),
+    )
+
+
+async def account_balance(session: AsyncSession, account_id: int) -> Decimal:
+    """Current balance of one account (see ``account_balances``)."""
+    return (await account_balances(session, [account_id]))[account_id]
+
+
+async def balances_as_of(
+    session: AsyncSession, account_ids: Iterable[int], day: date
+) -> dict[int, Decimal]:
+    """Balances of ``account_ids`` at the end of ``day`` (entries dated <= day)."""
+    ids = list(account_ids)
+    period = period_of(day)
+    latest = (
+        select(
+            BalanceCheckpoint.account_id,
+            func.max(BalanceCheckpoint.period).label("period"),
+        )
+        .where(BalanceCheckpoint.account_id.in_(ids), BalanceCheckpoint.period < period)
+        .group_by(BalanceCheckpoint.account_id)
+        .subquery()
+    )
+    return await _sum_by_account(
+        session,
+        ids,
+        select(
+            BalanceCheckpoint.account_id,
+            BalanceCheckpoint.closing_balance.label("amount"),
+        ).join(
+            latest,
+            and_(
+                BalanceCheckpoint.account_id == latest.c.account_id,
+                BalanceCheckpoint.period == latest.c.period,
+            ),
+        ),
+        select(BalanceDelta.account_id, BalanceDelta.amount).where(
+            BalanceDelta.account_id.in_(ids), BalanceDelta.period < period
+        ),
+        select(JournalLine.account_id, JournalLine.amount).where(
+            JournalLine.account_id.in_(ids),
+            JournalLine.effective_date >= period,
+            JournalLine.effective_date <= day,
+        ),
+    )
+
+
+async def balance_as_of(session: AsyncSession, account_id: int, day: date) -> Decimal:
+    """Balance of one account at the end of ``day`` (see ``balances_as_of``)."""
+    return (await balances_as_of(session, [account_id], day))[account_id]
+
+
+async def _apply_merged(session: AsyncSession, totals: dict[int, Decimal]) -> None:
+    # In account order: the upsert locks each account's row until commit, which
+    # also serializes concurrent mergers' checkpoint updates for the account
+    rows = [{"account_id": a, "balance": totals[a]} for a in sorted(totals)]
+    insert = ON_CONFLICT_INSERTS.get(session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(AccountBalance)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AccountBalance.account_id],
+            set_={
+                "balance": AccountBalance.balance + stmt.excluded.balance,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt, rows)
+        return
+    for account_id, amount in totals.items():
+        result = await session.execute(
+            update(AccountBalance)
+            .where(AccountBalance.account_id == account_id)
+            .values(balance=AccountBalance.balance + amount)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:  # type: ignore[attr-defined]
+            session.add(AccountBalance(account_id=account_id, balance=amount))
+    await session.flush()
+
+
+async def _apply_checkpoints(
+    session: AsyncSession, totals: dict[tuple[int, date], Decimal]
+) -> None:
+    for (account_id, period), amount in sorted(totals.items()):
+        # The month's closing and every later one (a back-dated delta) move
+        moved = await session.execute(
+            update(BalanceCheckpoint)
+            .where(
+                BalanceCheckpoint.account_id == account_id,
+                BalanceCheckpoint.period >= period,
+            )
+            .values(closing_balance=BalanceCheckpoint.closing_balance + amount)
+            .returning(BalanceCheckpoint.period)
+            .execution_options(synchronize_session=False)
+        )
+        if period in moved.scalars().all():
+            continue
+        # First postings in this month: open from the previous closing
+        previous = await session.scalar(
+            select(BalanceCheckpoint.closing_balance)
+            .where(
+                BalanceCheckpoint.account_id == account_id,
+                BalanceCheckpoint.period < period,
+            )
+            .order_by(BalanceCheckpoint.period.desc())
+            .limit(1)
+        )
+        await session.execute(
+            insert(BalanceCheckpoint).values(
+                account_id=account_id,
+                period=period,
+                closing_balance=(previous or Decimal(0)) + amount,
+            )
+        )
+
+
+async def merge_balance_deltas(
+    session: AsyncSession, batch_size: int = MERGE_BATCH_SIZE
+) -> int:
+    """
+    Fold pending ``BalanceDelta`` rows into ``AccountBalance`` and the
+    ``BalanceCheckpoint`` rows and commit each batch; returns the number of
+    deltas merged.
+
+    Each batch deletes its deltas with ``RETURNING`` and adds exactly what was
+    deleted, so a delta committed concurrently is either in the batch or left
+    for the next one; on Postgres ``SKIP LOCKED`` lets several mergers run.
+    """
+    merged = 0
+    while True:
+        batch = (
+            select(BalanceDelta.id)
+            .order_by(BalanceDelta.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(BalanceDelta)
+            .where(BalanceDelta.id.in_(batch.scalar_subquery()))
+            .returning(
+                BalanceDelta.account_id, BalanceDelta.period, BalanceDelta.amount
+            )
+            .execution_options(synchronize_session=False)
+        )
+        totals: dict[int, Decimal] = defaultdict(Decimal)
+        periods: dict[tuple[int, date], Decimal] = defaultdict(Decimal)
+        count = 0
+        for account_id, period, amount in result.all():
+            totals[account_id] += amount
+            periods[(account_id, period)] += amount
+            count += 1
+        if count:
+            await _apply_merged(session, totals)
+            await _apply_checkpoints(session, periods)
+        await session.commit()
+        merged += count
+        if count < batch_size:
+            break
+    if merged:
+        logger.debug(f"Merged {merged} balance deltas")
+    return merged
@@ -0,0 +1,207 @@
+"""Request-scoped batching loaders (the DataLoader pattern).
+
+Serializing N users with their companies through ``User.companies`` issues a
+relationship query per user (and per grant), and with ``AsyncSession`` an
+implicit lazy load outside ``run_sync`` fails outright. A ``DataLoader`` instead
+collects the keys requested during one event-loop tick (e.g. by the coroutines
+of an ``asyncio.gather``) and resolves them with one ``IN (...)`` query, caching
+the result per key for the rest of the request:
+
+    loaders = Loaders(session)
+    companies = await asyncio.gather(
+        *(loaders.companies_of_user(user.id) for user in users)
+    )
+
+runs two statements whatever the number of users: the grants of every user,
+then every company they reference.
+
+``get_loaders`` is the FastAPI dependency; FastAPI caches it per request, so all
+dependencies and the handler share one ``Loaders`` and its cache. The loaders
+take turns on the session (a shared lock), but the handler must not use the
+session itself while it awaits a loader.
+"""
+import asyncio
+from collections import defaultdict
+from typing import (
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    Sequence,
+    TypeVar,
+)
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from .db import get_session
+from .models.company import Company
+from .models.user import User
+from .models.user_permission import UserPermission
+
+# Keys per IN (...) query; larger batches are split (bind parameter limits)
+MAX_BATCH_SIZE: int = 1000
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+M = TypeVar("M")
+
+BatchFn = Callable[[list[K]], Awaitable[Sequence[V]]]
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Batches ``load(key)`` calls made in the same tick into one ``batch_fn(keys)``
+    call, which returns the values in key order. Results (not failures) are
+    cached per key for the loader's lifetime.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn[K, V],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        lock: asyncio.Lock | None = None,
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._lock = lock or asyncio.Lock()
+        self._cache: dict[K, asyncio.Future[V]] = {}
+        # Queued with their futures: clear() may drop the key from the cache
+        self._pending: list[tuple[K, asyncio.Future[V]]] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def load(self, key: K) -> Awaitable[V]:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append((key, future))
+        return future
+
+    async def load_many(self, keys: Sequence[K]) -> list[V]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V) -> None:
+        """Cache ``value`` for ``key`` unless it is already loaded or pending."""
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def clear(self, key: K | None = None) -> None:
+        """Forget ``key`` (every key if None); the next ``load`` queries again."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.max_batch_size):
+            task = asyncio.ensure_future(
+                self._run(pending[start : start + self.max_batch_size])
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: list[tuple[K, asyncio.Future[V]]]) -> None:
+        keys = [key for key, _ in pending]
+        try:
+            async with self._lock:
+                values = await self.batch_fn(keys)
+            if len(values) != len(keys):
+                raise ValueError(
+                    f"Batch function returned {len(values)} values for "
+                    f"{len(keys)} keys"
+                )
+        except Exception as exc:
+            for key, future in pending:
+                if self._cache.get(key) is future:
+                    del self._cache[key]  # retried by the next load
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), value in zip(pending, values, strict=True):
+            if not future.done():
+                future.set_result(value)
+
+
+def _by_key(
+    session: AsyncSession, column: InstrumentedAttribute[Any], model: type[M]
+) -> BatchFn[int, M | None]:
+    """Batch function: the ``model`` row whose ``column`` equals each key."""
+
+    async def batch(keys: list[int]) -> list[M | None]:
+        rows = await session.scalars(select(model).where(column.in_(keys)))
+        found = {getattr(row, column.key): row for row in rows}
+        return [found.get(key) for key in keys]
+
+    return batch
+
+
+def _grouped_by(
+    session: AsyncSession, column: InstrumentedAttribute[int]
+) -> BatchFn[int, list[UserPermission]]:
+    """Batch function: the ``UserPermission`` rows per ``column`` value."""
+
+    async def batch(keys: list[int]) -> list[list[UserPermission]]:
+        rows = await session.scalars(
+            select(UserPermission)
+            .where(column.in_(keys))
+            .order_by(UserPermission.id)
+        )
+        groups: dict[int, list[UserPermission]] = defaultdict(list)
+        for row in rows:
+            groups[getattr(row, column.key)].append(row)
+        return [groups.get(key, []) for key in keys]
+
+    return batch
+
+
+class Loaders:
+    """The loaders of one request, sharing ``session`` (one at a time)."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        lock = asyncio.Lock()
+        self.users: DataLoader[int, User | None] = DataLoader(
+            _by_key(session, User.id, User), lock=lock
+        )
+        self.companies: DataLoader[int, Company | None] = DataLoader(
+            _by_key(session, Company.id, Company), lock=lock
+        )
+        self.permissions_by_user: DataLoader[int, list[UserPermission]] = (
+            DataLoader(_grouped_by(session, UserPermission.user_id), lock=lock)
+        )
+        self.permissions_by_company: DataLoader[int, list[UserPermission]] = (
+            DataLoader(_grouped_by(session, UserPermission.company_id), lock=lock)
+        )
+
+    async def companies_of_user(self, user_id: int) -> list[Company]:
+        """``User.companies`` for ``user_id``, batched with concurrent calls."""
+        grants = await self.permissions_by_user.load(user_id)
+        # dict.fromkeys: one company per id even if grant rows are duplicated
+        ids = list(dict.fromkeys(g.company_id for g in grants))
+        companies = await self.companies.load_many(ids)
+        return [company for company in companies if company is not None]
+
+    async def users_of_company(self, company_id: int) -> list[User]:
+        """``Company.users`` for ``company_id``, batched with concurrent calls."""
+        grants = await self.permissions_by_company.load(company_id)
+        users = await self.users.load_many(
+            list(dict.fromkeys(g.user_id for g in grants))
+        )
+        return [user for user in users if user is not None]
+
+
+async def get_loaders(
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> Loaders:
+    """Dependency returning the request's ``Loaders``."""
+    return Loaders(session)
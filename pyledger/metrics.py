@@ -0,0 +1,293 @@
+"""Prometheus metrics without a client library.
+
+A ``Registry`` holds ``Histogram`` and ``Gauge`` families and renders them in
+the Prometheus text exposition format (served at ``/api/metrics``). Recording
+is a ``bisect`` and two additions under no lock: every observation happens on
+the event loop thread, so this is cheap enough to leave on in production.
+
+Database metrics come from two hooks installed by ``instrument_engine``:
+
+* ``InstrumentedPool`` (the pool class ``EngineManager`` uses) times each
+  connection checkout and counts the checkouts in progress, i.e. requests
+  waiting for the pool or for a new connection;
+* ``before/after_cursor_execute`` engine events time every statement.
+
+Pool occupancy (checked out, overflow, size) is read from the pools at scrape
+time by ``observe_pools``; all DB series are labelled by tenant.
+"""
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Sequence, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+# Prometheus' default buckets (seconds): request latencies
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Finer buckets for single statements and pool checkouts
+QUERY_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Statement label values; anything else is "OTHER" to bound the series count
+_VERBS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (non-cumulative, +Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            if len(labels) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self) -> Iterable[str]:
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                extra = f'le="{le}"'
+                yield (
+                    f"{self.name}_bucket"
+                    f"{_labels(self.labelnames, labels, extra)} {cumulative}"
+                )
+            label_text = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_number(total[0])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Gauge:
+    """Point-in-time values with a fixed label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        self._values[labels] = value
+
+    def get(self, *labels: str) -> float | None:
+        return self._values.get(labels)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def render(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+M = TypeVar("M", Histogram, Gauge)
+
+
+class Registry:
+    """A set of metric families rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Histogram | Gauge] = {}
+
+    def _add(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "pyledger_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    ("method", "route", "status"),
+)
+QUERY_DURATION = REGISTRY.histogram(
+    "pyledger_db_query_duration_seconds",
+    "SQL statement execution time by tenant and statement type.",
+    ("tenant", "statement"),
+    QUERY_BUCKETS,
+)
+POOL_CHECKOUT_DURATION = REGISTRY.histogram(
+    "pyledger_db_pool_checkout_seconds",
+    "Time to obtain a pooled connection (waiting for the pool or connecting).",
+    ("tenant",),
+    QUERY_BUCKETS,
+)
+POOL_CHECKED_OUT = REGISTRY.gauge(
+    "pyledger_db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    ("tenant",),
+)
+POOL_OVERFLOW = REGISTRY.gauge(
+    "pyledger_db_pool_overflow",
+    "Connections open beyond pool_size (negative: pool not yet filled).",
+    ("tenant",),
+)
+POOL_SIZE = REGISTRY.gauge(
+    "pyledger_db_pool_size", "Configured pool_size.", ("tenant",)
+)
+POOL_WAITING = REGISTRY.gauge(
+    "pyledger_db_pool_waiting",
+    "Connection checkouts in progress (waiting for the pool or connecting).",
+    ("tenant",),
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` that times checkouts and counts pending ones."""
+
+    waiting: int = 0
+    on_checkout: Callable[[float], None] | None = None
+
+    def connect(self) -> PoolProxiedConnection:
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.waiting -= 1
+            if self.on_checkout is not None:
+                self.on_checkout(time.perf_counter() - start)
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        assert isinstance(pool, InstrumentedPool)
+        pool.on_checkout = self.on_checkout
+        return pool
+
+
+def statement_type(statement: str) -> str:
+    """The statement's leading keyword (``SELECT``, ...) or ``OTHER``."""
+    head = statement.lstrip()[:7].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb if verb in _VERBS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, tenant_id: str) -> None:
+    """Record ``engine``'s statement and checkout timings under ``tenant_id``."""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    if isinstance(pool, InstrumentedPool):
+        pool.on_checkout = lambda seconds: POOL_CHECKOUT_DURATION.observe(
+            seconds, tenant_id
+        )
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        conn.info.setdefault("pyledger_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        elapsed = time.perf_counter() - conn.info["pyledger_query_start"].pop()
+        QUERY_DURATION.observe(elapsed, tenant_id, statement_type(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context: Any) -> None:
+        # A failed statement never reaches after_cursor_execute
+        starts = context.connection.info.get("pyledger_query_start")
+        if starts:
+            starts.pop()
+
+
+def observe_pools(engines: Iterable[tuple[str, AsyncEngine]]) -> None:
+    """Set the pool gauges from ``(tenant_id, engine)`` pairs (before a scrape)."""
+    gauges = (POOL_CHECKED_OUT, POOL_OVERFLOW, POOL_SIZE, POOL_WAITING)
+    for gauge in gauges:
+        gauge.clear()  # disposed engines drop out
+    for tenant_id, engine in engines:
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            continue
+        POOL_CHECKED_OUT.set(pool.checkedout(), tenant_id)
+        POOL_OVERFLOW.set(pool.overflow(), tenant_id)
+        POOL_SIZE.set(pool.size(), tenant_id)
+        if isinstance(pool, InstrumentedPool):
+            POOL_WAITING.set(pool.waiting, tenant_id)
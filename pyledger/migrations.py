@@ -0,0 +1,578 @@
+"""
+Versioned schema migrations for the common and tenant databases.
+
+Each database records the migrations applied to it in a ``schema_version``
+table; its current version is the highest recorded one. ``migrate_database``
+reads that single value and returns immediately when the database is already at
+the target, otherwise it applies the pending ``MIGRATIONS`` in one transaction.
+On Postgres that transaction first takes ``pg_advisory_xact_lock``, and then
+re-reads the version. Workers or deploys that migrate the same database at once
+therefore run one after the other, and the later ones find nothing left to do.
+``migrate_all`` does this for many tenants concurrently with a bounded number of
+workers and collects a per-tenant ``MigrationResult`` (versions, duration,
+error) into a ``MigrationSummary``.
+
+At startup the app does not reflect the schema: ``prepare_schema`` reads the
+latest ``schema_version`` row and compares its version and model fingerprint
+with the code's (``SCHEMA_STARTUP=check``, the default). Creating or migrating
+happens only with ``SCHEMA_STARTUP=migrate`` or via the migration scripts.
+
+This deliberately deviates from the "manage DB schema changes with Alembic"
+rule in ``docs/Style.md``: Alembic is still deferred (see ``docs/TODO.md``), and
+``MIGRATIONS`` is where its revisions would plug in. Like Alembic revisions, a
+shipped step must not change: step 1 creates a frozen copy of the version-1
+tables rather than the current models.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Select,
+    String,
+    Table,
+    UniqueConstraint,
+    desc,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .db import EngineManager, get_engine_manager
+from .models import Base
+from .models.journal import period_of, to_amount
+from .tenancy import DEFAULT_TENANT, Tenant
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata so create_all never records a version by itself
+schema_version_table = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+    # schema_fingerprint() of the models that applied the latest migration
+    Column("fingerprint", String(64), nullable=True),
+)
+
+STARTUP_MODES = ("check", "migrate", "skip")
+
+# Transaction-level advisory lock key of upgrades (the ASCII bytes of "pyledmig")
+MIGRATION_LOCK_KEY: int = 0x70796C65646D6967
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database schema is behind the code (run the migrations)."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# Version 1's tables as they were when it shipped, frozen: later model changes
+# belong in later steps. Steps that create a whole table do so from its current
+# model, so later steps touching it stay idempotent (only add what is missing).
+_initial_metadata = MetaData()
+Table(
+    "company",
+    _initial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(255), nullable=False, unique=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+Table(
+    "currency",
+    _initial_metadata,
+    Column("code", String(8), primary_key=True),
+    Column("name", String(64), nullable=False),
+    Column("symbol", String(8)),
+)
+Table(
+    "tenant",
+    _initial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("slug", String(63), nullable=False, unique=True),
+    Column("name", String(255), nullable=False),
+    Column("db_name", String(63)),
+    Column("is_active", Boolean, nullable=False),
+)
+Table(
+    "user",
+    _initial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(150), nullable=False, unique=True),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("is_admin", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+    Column("oauth_provider", String(64)),
+    Column("oauth_id", String(255)),
+)
+Table(
+    "currency_rate",
+    _initial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column(
+        "currency_code", String(8), ForeignKey("currency.code"), nullable=False
+    ),
+    Column("rate_vs_usd", Float, nullable=False),
+    Column(
+        "timestamp",
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    ),
+    UniqueConstraint(
+        "currency_code", "timestamp", name="uq_currency_rate_code_timestamp"
+    ),
+)
+Table(
+    "user_permission",
+    _initial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("user.id"), nullable=False),
+    Column("company_id", Integer, ForeignKey("company.id"), nullable=False),
+    Column("permission", Integer, nullable=False),
+)
+
+
+def _initial_schema(conn: Connection) -> None:
+    _initial_metadata.create_all(conn)
+
+
+def _add_missing_columns(conn: Connection, table: Table, *names: str) -> None:
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    table_name = conn.dialect.identifier_preparer.format_table(table)
+    for name in names:
+        if name not in existing:
+            column_ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+
+
+def _create_missing_indexes(conn: Connection, table: Table, *names: str) -> None:
+    # IF NOT EXISTS rather than checkfirst: SQLite does not reflect expression
+    # indexes, so they would look missing
+    indexes = {str(index.name): index for index in table.indexes}
+    for name in names:
+        conn.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def _company_json_columns(conn: Connection) -> None:
+    table = Base.metadata.tables["company"]
+    _add_missing_columns(conn, table, "address", "settings")
+    _create_missing_indexes(
+        conn, table, "ix_company_default_currency", "ix_company_country"
+    )
+    if conn.dialect.name == "postgresql":
+        _create_missing_indexes(conn, table, "ix_company_settings_gin")
+
+
+def _user_permission_index(conn: Connection) -> None:
+    table = Base.metadata.tables["user_permission"]
+    # Merge duplicate grants into their first row (permissions OR-ed) before
+    # the unique index goes on
+    grants: dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+    rows = conn.execute(
+        select(table.c.id, table.c.user_id, table.c.company_id, table.c.permission)
+        .order_by(table.c.id)
+    )
+    for row_id, user_id, company_id, permission in rows:
+        grants[(user_id, company_id)].append((row_id, int(permission)))
+    duplicates: list[int] = []
+    for group in grants.values():
+        if len(group) < 2:
+            continue
+        combined = 0
+        for _, permission in group:
+            combined |= permission
+        conn.execute(
+            table.update()
+            .where(table.c.id == group[0][0])
+            .values(permission=combined)
+        )
+        duplicates.extend(row_id for row_id, _ in group[1:])
+    if duplicates:
+        conn.execute(table.delete().where(table.c.id.in_(duplicates)))
+        logger.info(f"Merged {len(duplicates)} duplicate user_permission rows")
+    _create_missing_indexes(
+        conn,
+        table,
+        "uq_user_permission_user_company",
+        "ix_user_permission_user_company_permission",
+    )
+
+
+def _journal_tables(conn: Connection) -> None:
+    names = (
+        "account",
+        "journal_entry",
+        "journal_line",
+        "balance_delta",
+        "account_balance",
+    )
+    # checkfirst: databases created at version 1 by newer code have them already
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[n] for n in names])
+
+
+def _bank_transactions(conn: Connection) -> None:
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables["bank_transaction"]])
+
+
+def _line_dates(conn: Connection) -> None:
+    lines = Base.metadata.tables["journal_line"]
+    existing = {col["name"] for col in inspect(conn).get_columns("journal_line")}
+    if "effective_date" not in existing:
+        # Added nullable, filled from the entries, then made NOT NULL (where
+        # the dialect can alter columns)
+        conn.execute(text("ALTER TABLE journal_line ADD COLUMN effective_date DATE"))
+        entries = Base.metadata.tables["journal_entry"]
+        conn.execute(
+            lines.update().values(
+                effective_date=select(entries.c.effective_date)
+                .where(entries.c.id == lines.c.entry_id)
+                .scalar_subquery()
+            )
+        )
+        if conn.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    "ALTER TABLE journal_line "
+                    "ALTER COLUMN effective_date SET NOT NULL"
+                )
+            )
+    _create_missing_indexes(conn, lines, "ix_journal_line_account_date")
+
+
+def _balance_checkpoints(conn: Connection) -> None:
+    _line_dates(conn)
+    table = Base.metadata.tables["balance_checkpoint"]
+    table.create(conn, checkfirst=True)
+    if conn.execute(select(func.count()).select_from(table)).scalar_one():
+        return
+    # Closings cover merged deltas only: journal movement less pending deltas
+    lines = Base.metadata.tables["journal_line"]
+    deltas = Base.metadata.tables["balance_delta"]
+    movements: dict[tuple[int, date], Decimal] = defaultdict(Decimal)
+    daily = conn.execute(
+        select(lines.c.account_id, lines.c.effective_date, func.sum(lines.c.amount))
+        .group_by(lines.c.account_id, lines.c.effective_date)
+    )
+    for account_id, day, amount in daily:
+        movements[(account_id, period_of(day))] += to_amount(amount)
+    pending = conn.execute(
+        select(deltas.c.account_id, deltas.c.period, func.sum(deltas.c.amount))
+        .group_by(deltas.c.account_id, deltas.c.period)
+    )
+    for account_id, period, amount in pending:
+        movements[(account_id, period)] -= to_amount(amount)
+    rows = []
+    closing: dict[int, Decimal] = defaultdict(Decimal)
+    for (account_id, period), amount in sorted(movements.items()):
+        if amount == 0:
+            continue
+        closing[account_id] += amount
+        rows.append(
+            {
+                "account_id": account_id,
+                "period": period,
+                "closing_balance": closing[account_id],
+            }
+        )
+    if rows:
+        conn.execute(insert(table), rows)
+
+
+def _rate_refresh(conn: Connection) -> None:
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables["rate_refresh"]])
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "Initial schema", _initial_schema),
+    Migration(2, "Company address/settings JSON columns", _company_json_columns),
+    Migration(3, "User permission lookup and unique indexes", _user_permission_index),
+    Migration(4, "Journal, accounts and balances", _journal_tables),
+    Migration(5, "Imported bank transactions", _bank_transactions),
+    Migration(6, "Journal line dates and balance checkpoints", _balance_checkpoints),
+    Migration(7, "Rate refresh schedule", _rate_refresh),
+)
+TARGET_VERSION: int = MIGRATIONS[-1].version
+
+
+def schema_fingerprint(metadata: MetaData = Base.metadata) -> str:
+    """
+    Stable hash of the tables, columns (Postgres DDL types), keys and indexes
+    declared in ``metadata``; it changes whenever the models do.
+    """
+    dialect = postgresql.dialect()  # type: ignore[no-untyped-call]
+    parts = []
+    for table in metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for col in table.columns:
+            try:
+                type_ddl = col.type.compile(dialect=dialect)
+            except Exception:
+                type_ddl = type(col.type).__name__
+            parts.append(
+                f"  {col.name} {type_ddl} null={col.nullable} pk={col.primary_key}"
+            )
+        for fk in sorted(fk.target_fullname for fk in table.foreign_keys):
+            parts.append(f"  fk {fk}")
+        for cons in table.constraints:
+            cols = ",".join(c.name for c in cons.columns)  # type: ignore[attr-defined]
+            parts.append(f"  {type(cons).__name__} {cons.name} ({cols})")
+        for index in sorted(table.indexes, key=lambda i: str(i.name)):
+            cols = ",".join(str(e) for e in index.expressions)
+            parts.append(f"  index {index.name} unique={index.unique} ({cols})")
+    return hashlib.sha256("\n".join(sorted(parts)).encode()).hexdigest()
+
+
+def current_version(conn: Connection) -> int | None:
+    """Return the database's schema version (``None`` if never migrated)."""
+    if not inspect(conn).has_table(schema_version_table.name):
+        return None
+    return conn.execute(select(func.max(schema_version_table.c.version))).scalar()
+
+
+def lock_statement() -> Select:
+    """Blocks until this transaction holds the database's migration lock."""
+    return select(func.pg_advisory_xact_lock(MIGRATION_LOCK_KEY))
+
+
+def upgrade(conn: Connection, target: int = TARGET_VERSION) -> list[int]:
+    """
+    Apply the migrations above the current version up to ``target``, within
+    the caller's transaction. The version is read under the migration lock
+    (Postgres), so concurrent upgrades of one database never repeat a step.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(lock_statement())
+    current = current_version(conn) or 0
+    schema_version_table.create(conn, checkfirst=True)
+    applied = []
+    for migration in MIGRATIONS:
+        if current < migration.version <= target:
+            migration.upgrade(conn)
+            conn.execute(
+                insert(schema_version_table).values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(timezone.utc),
+                    fingerprint=(
+                        schema_fingerprint()
+                        if migration.version == TARGET_VERSION
+                        else None
+                    ),
+                )
+            )
+            applied.append(migration.version)
+    return applied
+
+
+def read_schema_state(conn: Connection) -> tuple[int | None, str | None]:
+    """
+    Return ``(version, fingerprint)`` from the latest ``schema_version`` row in
+    one query, or ``(None, None)`` if the database was never migrated.
+    """
+    table = schema_version_table
+    try:
+        row = conn.execute(
+            select(table.c.version, table.c.fingerprint)
+            .order_by(desc(table.c.version))
+            .limit(1)
+        ).first()
+    except DBAPIError:
+        # Most likely the table does not exist yet
+        return None, None
+    return (row[0], row[1]) if row is not None else (None, None)
+
+
+@dataclass
+class MigrationResult:
+    tenant_id: str
+    target: int
+    current: int | None = None
+    applied: list[int] = field(default_factory=list)
+    duration: float = 0.0
+    error: str | None = None
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return "failed"
+        return "migrated" if self.applied else "current"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "tenant": self.tenant_id,
+            "status": self.status,
+            "current": self.current,
+            "target": self.target,
+            "applied": self.applied,
+            "duration": round(self.duration, 4),
+            "error": self.error,
+        }
+
+
+@dataclass
+class MigrationSummary:
+    results: list[MigrationResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def failed(self) -> list[MigrationResult]:
+        return [r for r in self.results if r.error is not None]
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    def slowest(self, n: int = 10) -> list[MigrationResult]:
+        return sorted(self.results, key=lambda r: r.duration, reverse=True)[:n]
+
+    def to_dict(self, slowest: int = 10) -> dict[str, Any]:
+        """Machine-readable summary: counts, slowest tenants and errors."""
+        return {
+            "total": len(self.results),
+            "migrated": self.count("migrated"),
+            "current": self.count("current"),
+            "failed": self.count("failed"),
+            "duration": round(self.duration, 4),
+            "slowest": [r.to_dict() for r in self.slowest(slowest)],
+            "errors": [r.to_dict() for r in self.failed],
+        }
+
+
+async def migrate_database(
+    tenant: Tenant,
+    manager: EngineManager | None = None,
+    target: int = TARGET_VERSION,
+) -> MigrationResult:
+    """
+    Bring ``tenant``'s database to ``target``. Failures are recorded on the
+    result rather than raised, so one broken tenant does not stop a rollout.
+    """
+    if manager is None:
+        manager = get_engine_manager()
+    result = MigrationResult(tenant_id=tenant.id, target=target)
+    start = time.perf_counter()
+    try:
+        engine = manager.get_engine(tenant)
+        async with engine.connect() as conn:
+            result.current = await conn.run_sync(current_version)
+        if result.current is None or result.current < target:
+            async with engine.begin() as conn:
+                result.applied = await conn.run_sync(upgrade, target)
+    except Exception as err:
+        result.error = f"{type(err).__name__}: {err}"
+        logger.error(f"Migration failed for tenant {tenant.id!r}: {result.error}")
+    result.duration = time.perf_counter() - start
+    logger.debug(
+        f"Tenant {tenant.id!r}: {result.status} "
+        f"({result.current} -> {target}) in {result.duration:.3f}s"
+    )
+    return result
+
+
+async def migrate_all(
+    tenants: Iterable[Tenant],
+    concurrency: int = 8,
+    manager: EngineManager | None = None,
+    target: int = TARGET_VERSION,
+) -> MigrationSummary:
+    """
+    Migrate ``tenants`` with at most ``concurrency`` running at once.
+
+    Concurrency is capped at the manager's connection budget, and each
+    tenant's engine is disposed once it is done (unless it was already open),
+    so a rollout over hundreds of tenants keeps a bounded number of connections.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}")
+    if manager is None:
+        manager = get_engine_manager()
+    concurrency = min(concurrency, manager.budget.limit)
+    summary = MigrationSummary()
+    pending = iter(tenants)
+    start = time.perf_counter()
+
+    async def worker() -> None:
+        for tenant in pending:
+            opened = tenant.id not in manager
+            summary.results.append(await migrate_database(tenant, manager, target))
+            if opened:
+                manager.evict(tenant.id)
+
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(concurrency):
+            tg.create_task(worker())
+    summary.duration = time.perf_counter() - start
+    logger.info(
+        f"Migrated {len(summary.results)} databases in {summary.duration:.2f}s: "
+        f"{summary.count('migrated')} migrated, {summary.count('current')} "
+        f"already current, {summary.count('failed')} failed."
+    )
+    return summary
+
+
+async def prepare_schema(
+    mode: str = "check",
+    tenant: Tenant = DEFAULT_TENANT,
+    manager: EngineManager | None = None,
+) -> None:
+    """
+    Make sure ``tenant``'s database is usable at startup.
+
+    ``check`` reads the stored version and fingerprint and raises
+    ``SchemaOutOfDate`` if the database is behind (a fingerprint mismatch at the
+    current version only logs a warning: the models changed without a new
+    migration). ``migrate`` applies pending migrations. ``skip`` does nothing.
+    """
+    if mode not in STARTUP_MODES:
+        raise ValueError(f"Unknown schema startup mode {mode!r}")
+    if mode == "skip":
+        return
+    if manager is None:
+        manager = get_engine_manager()
+    if mode == "migrate":
+        result = await migrate_database(tenant, manager)
+        if result.error is not None:
+            raise RuntimeError(f"Migration failed: {result.error}")
+        return
+    async with manager.get_engine(tenant).connect() as conn:
+        version, fingerprint = await conn.run_sync(read_schema_state)
+    if version is None or version < TARGET_VERSION:
+        raise SchemaOutOfDate(
+            f"Database for tenant {tenant.id!r} is at schema version {version}, "
+            f"code expects {TARGET_VERSION}; run pyledger.scripts.migrate_all or "
+            "start with SCHEMA_STARTUP=migrate."
+        )
+    if version == TARGET_VERSION and fingerprint != schema_fingerprint():
+        logger.warning(
+            f"Models differ from the schema recorded at version {version}; "
+            "add a migration for the change."
+        )
@@ -1,9 +1,20 @@
 """PyLedger models package: exposes Base, Company, User."""
 
+from .account import Account
+from .bank_transaction import BankTransaction
 from .base import Base
 from .company import Company
 from .currency import Currency
 from .currency_rate import CurrencyRate
+from .journal import (
+    AccountBalance,
+    BalanceCheckpoint,
+    BalanceDelta,
+    JournalEntry,
+    JournalLine,
+)
+from .rate_refresh import RateRefresh
+from .tenant import TenantRecord
 from .user import User
 from .user_permission import UserPermission
 
@@ -14,4 +25,13 @@ __all__ = [
     "UserPermission",
     "Currency",
     "CurrencyRate",
+    "TenantRecord",
+    "Account",
+    "JournalEntry",
+    "JournalLine",
+    "BalanceDelta",
+    "AccountBalance",
+    "BalanceCheckpoint",
+    "BankTransaction",
+    "RateRefresh",
 ]
@@ -0,0 +1,82 @@
+"""Company ledger accounts (chart of accounts, bank/card/loan/cash accounts)."""
+from datetime import datetime
+from enum import StrEnum, auto
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, validates
+from sqlalchemy.sql import func
+
+from .. import iso_codes
+from .base import Base, TableNames
+
+
+class AccountType(StrEnum):
+    """Accounting class; decides the account's normal balance side."""
+
+    ASSET = auto()
+    LIABILITY = auto()
+    EQUITY = auto()
+    INCOME = auto()
+    EXPENSE = auto()
+
+
+class AccountKind(StrEnum):
+    """What the account represents, for import and reconciliation."""
+
+    BANK = auto()
+    CREDIT_CARD = auto()
+    LOAN = auto()
+    CASH = auto()
+
+
+def _enum_values(enum: type[StrEnum]) -> list[str]:
+    return [member.value for member in enum]
+
+
+class Account(Base):
+    """
+    A ledger account. It has no balance column: balances come from the journal
+    (see ``pyledger.journal.account_balance``), so postings never update a
+    shared account row.
+    """
+
+    __tablename__ = TableNames.ACCOUNT
+    __table_args__ = (
+        UniqueConstraint("company_id", "name", name="uq_account_company_name"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.COMPANY}.id"), nullable=False
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    type: Mapped[AccountType] = mapped_column(
+        Enum(AccountType, native_enum=False, length=16, values_callable=_enum_values),
+        nullable=False,
+    )
+    kind: Mapped[Optional[AccountKind]] = mapped_column(
+        Enum(AccountKind, native_enum=False, length=16, values_callable=_enum_values),
+        nullable=True,
+    )
+    currency_code: Mapped[str] = mapped_column(String(8), nullable=False)  # ISO 4217
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    @validates("currency_code")
+    def validate_currency_code(self, key: str, value: str) -> str:
+        if not iso_codes.is_currency(value):
+            raise ValueError(f"Invalid currency code: {value}")
+        return value
+
+    @property
+    def normal_sign(self) -> int:
+        """+1 for debit-normal accounts (assets, expenses), -1 otherwise."""
+        return 1 if self.type in (AccountType.ASSET, AccountType.EXPENSE) else -1
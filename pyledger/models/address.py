@@ -2,9 +2,9 @@
 Address schema and custom SQLAlchemy type for storing address as JSON using Pydantic.
 """
 
-import pycountry
 from pydantic import BaseModel, field_validator
 
+from .. import iso_codes
 from .base import PydanticTypeDecorator
 
 
@@ -26,10 +26,8 @@ class AddressSchema(BaseModel):
         """Validate that the country code is a valid ISO 3166-1 code."""
         if v is None:
             return v
-        try:
-            pycountry.countries.lookup(v)
-        except Exception as err:
-            raise ValueError(f"Invalid country code: {v}") from err
+        if not iso_codes.is_country(v):
+            raise ValueError(f"Invalid country code: {v}")
         return v
 
 
@@ -0,0 +1,61 @@
+"""Imported bank/card statement lines, kept apart from the journal until reconciled."""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
+
+from .account import Account
+from .base import Base, TableNames
+from .journal import AMOUNT_TYPE
+
+
+class BankTransaction(Base):
+    """
+    One line of an imported statement. ``content_hash`` identifies the line
+    within its account (see ``pyledger.bank_import.content_hash``) so
+    re-importing an overlapping statement skips lines already stored.
+    ``entry_id`` is set once the line is reconciled with a journal entry.
+    """
+
+    __tablename__ = TableNames.BANK_TRANSACTION
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "content_hash", name="uq_bank_transaction_account_hash"
+        ),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.ACCOUNT}.id"), nullable=False
+    )
+    posted_on: Mapped[date] = mapped_column(Date, nullable=False)
+    amount: Mapped[Decimal] = mapped_column(AMOUNT_TYPE, nullable=False)
+    description: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    # Bank-assigned transaction id (OFX FITID), when the format has one
+    fit_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    entry_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.JOURNAL_ENTRY}.id"), nullable=True
+    )
+    imported_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    account: Mapped[Account] = relationship()
+
+
+Index(
+    "ix_bank_transaction_account_date",
+    BankTransaction.account_id,
+    BankTransaction.posted_on,
+)
@@ -1,10 +1,20 @@
 import json
+import types
 from enum import StrEnum, auto
-from typing import Any, Generic, Type, TypeVar, get_args
+from typing import Any, Callable, Generic, Type, TypeVar, Union, get_args, get_origin
 
 from pydantic import BaseModel
+from sqlalchemy import Boolean, Float, Integer, and_, cast, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.types import String, TypeDecorator
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal, Visitable
+from sqlalchemy.types import String, TypeDecorator, TypeEngine
+
+from .lazy_model import LazyModel
 
 
 class Base(DeclarativeBase):
@@ -12,42 +22,244 @@ class Base(DeclarativeBase):
 
 T = TypeVar("T", bound=BaseModel)
 
+# Dialects with INSERT ... ON CONFLICT, for bulk ingest and upserts
+ON_CONFLICT_INSERTS: dict[str, Callable[..., postgresql.Insert | sqlite.Insert]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 class PydanticTypeDecorator(TypeDecorator, Generic[T]):
     """
     Generic SQLAlchemy TypeDecorator for serializing/deserializing Pydantic models.
     Usage: subclass as PydanticTypeDecorator[YourModel].
+
+    Stored as JSONB on Postgres (so fields can be filtered and indexed in the
+    database, see ``json_field`` / ``json_contains``) and as a JSON string
+    elsewhere.
+
+    With ``lazy=True`` loaded values are ``LazyModel`` proxies holding the raw
+    JSON text (Postgres selects ``jsonb::text`` so the driver does not decode
+    it either); validation happens on first attribute access.
     """
     impl = String
     cache_ok = True
     __pydantic_model__: Type[BaseModel]
 
+    def __init__(self, lazy: bool = False) -> None:
+        super().__init__()
+        # Part of the statement cache key (SQLAlchemy reads __init__ arguments)
+        self.lazy = lazy
+
+    def __class_getitem__(cls, params: Any) -> Any:
+        # Visitable.__class_getitem__ returns the bare class and drops the
+        # argument; use Generic's so subclasses see it in __orig_bases__
+        return super(Visitable, cls).__class_getitem__(params)  # type: ignore[misc]
+
     def __init_subclass__(cls) -> None:
         super().__init_subclass__()
-        # Automatically set __pydantic_model__ from generic type argument
-        args = get_args(cls)
-        if args:
-            cls.__pydantic_model__ = args[0]
+        # Automatically set __pydantic_model__ from the generic type argument
+        for base in getattr(cls, "__orig_bases__", ()):
+            args = get_args(base)
+            if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+                cls.__pydantic_model__ = args[0]
+        # SQLAlchemy reads cache_ok per class; subclasses hold no extra state
+        if "cache_ok" not in cls.__dict__:
+            cls.cache_ok = True
 
-    def process_bind_param(self, value: T | dict | None, dialect: Any) -> str | None:
+    def load_dialect_impl(self, dialect: Any) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.JSONB())
+        return dialect.type_descriptor(String())
+
+    def column_expression(self, column: ColumnElement[Any]) -> ColumnElement[Any]:
+        if self.lazy:
+            return _json_text(column)
+        return column
+
+    def process_bind_param(
+        self, value: T | LazyModel[T] | dict | None, dialect: Any
+    ) -> str | dict | None:
         if value is None:
             return None
+        if isinstance(value, LazyModel):
+            if value.is_loaded:
+                value = value.materialize()
+            elif dialect.name == "postgresql":
+                return json.loads(value.raw_json())
+            else:
+                # Unchanged since it was loaded: write the stored text back as is
+                return value.raw_json()
+        if dialect.name == "postgresql":
+            # JSONB serializes Python objects itself
+            if isinstance(value, self.__pydantic_model__):
+                return value.model_dump(mode="json")
+            return value  # type: ignore[return-value]
         if isinstance(value, self.__pydantic_model__):
             return value.model_dump_json()
         return json.dumps(value)
 
-    def process_result_value(self, value: str | None, dialect: Any) -> T | None:
+    def process_result_value(
+        self, value: str | dict | None, dialect: Any
+    ) -> T | LazyModel[T] | None:
         if value is None:
             return None
+        elif self.lazy and isinstance(value, (str, bytes)):
+            return LazyModel(self.__pydantic_model__, value)  # type: ignore[arg-type]
         elif issubclass(self.__pydantic_model__, BaseModel):
+            if isinstance(value, dict):
+                return self.__pydantic_model__.model_validate(value)  # type: ignore[return-value]
             return self.__pydantic_model__.model_validate_json(value)  # type: ignore[return-value]
         else:
             raise TypeError("Unsupported Pydantic model type for deserialization.")
 
 
+class _json_text(FunctionElement[Any]):
+    """Select a lazy column as JSON text (no driver-side JSONB decoding)."""
+
+    inherit_cache = True
+    name = "json_text"
+
+    def __init__(self, column: ColumnElement[Any]) -> None:
+        # Keep the column's type so its result processing still applies
+        self.type = column.type
+        super().__init__(column)
+
+
+_SQL_TYPES: dict[type, type[TypeEngine[Any]]] = {
+    str: String,
+    int: Integer,
+    float: Float,
+    bool: Boolean,
+}
+
+
+def _field_sql_type(column: Any, name: str) -> TypeEngine[Any]:
+    model = getattr(column.type, "__pydantic_model__", None)
+    if model is None:
+        raise TypeError(f"{column} is not a PydanticTypeDecorator column")
+    field = model.model_fields.get(name)
+    if field is None:
+        raise ValueError(f"{model.__name__} has no field {name!r}")
+    annotation = field.annotation
+    if get_origin(annotation) in (Union, types.UnionType):
+        # Optional[X] -> X
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+    return _SQL_TYPES.get(annotation, String)()
+
+
+class json_field(FunctionElement[Any]):
+    """
+    Typed SQL expression for one field of a ``PydanticTypeDecorator`` column,
+    e.g. ``json_field(Company.settings, "default_currency_code") == "EUR"``.
+
+    Renders ``(col ->> 'field')`` (cast for non-text fields) on Postgres and
+    ``json_extract(col, '$."field"')`` elsewhere. The field name is validated
+    against the Pydantic model and inlined, so the expression can back an
+    expression index.
+    """
+
+    inherit_cache = True
+    name = "json_field"
+    # The field is part of the SQL text, so it must be part of the cache key
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("field", InternalTraversal.dp_string)
+    ]
+
+    def __init__(self, column: Any, field: str) -> None:
+        self.type = _field_sql_type(column, field)
+        self.field = field
+        super().__init__(column)
+
+
+class json_contains(FunctionElement[bool]):
+    """
+    ``col @> '{"field": value, ...}'`` on Postgres (served by a GIN index on the
+    column); an AND of ``json_field`` equalities elsewhere.
+    """
+
+    inherit_cache = True
+    name = "json_contains"
+    type = Boolean()
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("payload", InternalTraversal.dp_string)
+    ]
+
+    def __init__(self, column: Any, **values: Any) -> None:
+        if not values:
+            raise ValueError("json_contains needs at least one field")
+        for field in values:
+            _field_sql_type(column, field)
+        self.values = values
+        self.payload = json.dumps(values, sort_keys=True)
+        super().__init__(column)
+
+
+def _column_of(element: FunctionElement[Any]) -> ColumnElement[Any]:
+    return list(element.clauses)[0]
+
+
+@compiles(json_field, "postgresql")
+def _json_field_postgresql(
+    element: json_field, compiler: SQLCompiler, **kw: Any
+) -> str:
+    column = compiler.process(_column_of(element), **kw)
+    text = f"({column} ->> '{element.field}')"
+    if isinstance(element.type, String):
+        return text
+    type_ddl = compiler.dialect.type_compiler_instance.process(element.type)
+    return f"(CAST({text} AS {type_ddl}))"
+
+
+@compiles(json_field)
+def _json_field_default(element: json_field, compiler: SQLCompiler, **kw: Any) -> str:
+    column = compiler.process(_column_of(element), **kw)
+    return f"json_extract({column}, '$.\"{element.field}\"')"
+
+
+@compiles(_json_text, "postgresql")
+def _json_text_postgresql(
+    element: _json_text, compiler: SQLCompiler, **kw: Any
+) -> str:
+    return f"CAST({compiler.process(_column_of(element), **kw)} AS TEXT)"
+
+
+@compiles(_json_text)
+def _json_text_default(element: _json_text, compiler: SQLCompiler, **kw: Any) -> str:
+    # Already stored as text
+    return compiler.process(_column_of(element), **kw)
+
+
+@compiles(json_contains, "postgresql")
+def _json_contains_postgresql(
+    element: json_contains, compiler: SQLCompiler, **kw: Any
+) -> str:
+    payload = cast(literal(element.payload), postgresql.JSONB())
+    return f"({compiler.process(_column_of(element).op('@>')(payload), **kw)})"
+
+
+@compiles(json_contains)
+def _json_contains_default(
+    element: json_contains, compiler: SQLCompiler, **kw: Any
+) -> str:
+    column = _column_of(element)
+    clauses = [json_field(column, k) == v for k, v in element.values.items()]
+    return compiler.process(and_(*clauses).self_group(), **kw)
+
+
 class TableNames(StrEnum):
     COMPANY = auto()
     USER = auto()
     CURRENCY = auto()
     CURRENCY_RATE = auto()
     USER_PERMISSION = auto()
-    # Add more table names as needed
\ No newline at end of file
+    TENANT = auto()
+    ACCOUNT = auto()
+    JOURNAL_ENTRY = auto()
+    JOURNAL_LINE = auto()
+    BALANCE_DELTA = auto()
+    ACCOUNT_BALANCE = auto()
+    BALANCE_CHECKPOINT = auto()
+    BANK_TRANSACTION = auto()
+    RATE_REFRESH = auto()
+    # Add more table names as needed
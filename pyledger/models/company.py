@@ -1,15 +1,60 @@
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String
 from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from .db import Base
-from .user import User
+
+from .address import AddressSchema, AddressType
+from .base import Base, TableNames, json_field
+from .company_settings import CompanySettingsSchema, CompanySettingsType
+from .lazy_model import LazyModel, materialize
+
 
 class Company(Base):
-    __tablename__ = "companies"
-    id = Column(Integer, primary_key=True)
-    name = Column(String(255), nullable=False, unique=True)
-    created_at = Column(DateTime, default=func.now())
-    last_updated = Column(DateTime, default=func.now(), onupdate=func.now())
-
-    user_companies = relationship("UserCompany", back_populates="company")
-    users = association_proxy("user_companies", "user")
+    __tablename__ = TableNames.COMPANY
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), onupdate=func.now()
+    )
+    # JSONB on Postgres; filter with json_field(Company.settings, "...").
+    # Loaded as LazyModel proxies, validated on first attribute access; use
+    # get_address() / get_settings() where the schema instance itself is needed
+    address: Mapped[Optional[AddressSchema | LazyModel[AddressSchema]]] = (
+        mapped_column(AddressType(lazy=True), nullable=True)
+    )
+    settings: Mapped[
+        Optional[CompanySettingsSchema | LazyModel[CompanySettingsSchema]]
+    ] = mapped_column(CompanySettingsType(lazy=True), nullable=True)
+
+    user_permissions = relationship(
+        "UserPermission",
+        back_populates="company",
+        cascade="all, delete-orphan",
+    )
+    users = association_proxy("user_permissions", "user")
+
+    def get_address(self) -> Optional[AddressSchema]:
+        return materialize(self.address)
+
+    def get_settings(self) -> Optional[CompanySettingsSchema]:
+        return materialize(self.settings)
+
+
+Index(
+    "ix_company_default_currency",
+    json_field(Company.settings, "default_currency_code"),
+)
+Index(
+    "ix_company_country",
+    json_field(Company.address, "country_code"),
+)
+# Containment queries (json_contains) on any settings field; Postgres only
+Index(
+    "ix_company_settings_gin", Company.settings, postgresql_using="gin"
+).ddl_if(dialect="postgresql")
@@ -4,10 +4,10 @@ Custom SQLAlchemy column type for serializing/deserializing CompanySettingsSchem
 """
 from typing import Optional
 
-import pycountry
 from pydantic import BaseModel, field_validator
 from sqlalchemy.orm import Session
 
+from .. import iso_codes
 from .base import PydanticTypeDecorator
 from .currency import Currency
 
@@ -28,10 +28,8 @@ class CompanySettingsSchema(BaseModel):
     def validate_language_code(cls, v: str | None) -> str | None:
         if v is None:
             return v
-        try:
-            pycountry.languages.lookup(v)
-        except Exception as err:
-            raise ValueError(f"Invalid language code: {v}") from err
+        if not iso_codes.is_language(v):
+            raise ValueError(f"Invalid language code: {v}")
         return v
 
     @field_validator("default_currency_code")
@@ -39,10 +37,8 @@ class CompanySettingsSchema(BaseModel):
     def validate_currency_code(cls, v: str | None) -> str | None:
         if v is None:
             return v
-        try:
-            pycountry.currencies.lookup(v)
-        except Exception as err:
-            raise ValueError(f"Invalid currency code: {v}") from err
+        if not iso_codes.is_currency(v):
+            raise ValueError(f"Invalid currency code: {v}")
         return v
 
 
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from sqlalchemy import String
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm import Session as SASession
 
@@ -25,23 +26,15 @@ class Currency(Base):
     ) -> float | None:
         """
         Return the rate_vs_usd for this currency at a specific datetime, or the
-        latest if not provided.
+        latest if not provided. Served from ``CurrencyRate.RATE_CACHE`` after the
+        first lookup for this currency.
         """
-        q = session.query(CurrencyRate).filter_by(currency_code=self.code)
-        if at:
-            q = q.filter(CurrencyRate.timestamp <= at)
-        q = q.order_by(CurrencyRate.timestamp.desc())
-        rate = q.first()
-        return rate.rate_vs_usd if rate else None
+        return CurrencyRate.rate_at(session, self.code, at)
 
     @classmethod
-    async def update_all_rates(cls, session: "SASession") -> None:
+    async def update_all_rates(cls, session: AsyncSession) -> None:
         """
         Update all currency rates in the table using the external API and store
         them in currency_rate.
         """
-        rates = []
-        async for rate in await CurrencyRate.RATE_PROVIDER.iter_rates():
-            rates.append(rate)
-        session.add_all(rates)
-        await session.commit()  # type: ignore[func-returns-value]
+        await CurrencyRate.update_all(session)
@@ -0,0 +1,115 @@
+"""
+Vectorized bulk currency conversion over CurrencyRate history.
+
+Every stored rate is quoted against ``RATE_BASE`` (USD), so converting an amount
+from A to B at time T is ``amount * rate(B, T) / rate(A, T)``. ``RateTable``
+concatenates the cached per-currency histories into one sorted key array so that
+the as-of lookup for a whole batch is a single ``numpy.searchsorted`` call.
+
+Timestamps are accepted as ``datetime64`` arrays (interpreted as UTC) or as
+epoch seconds. Rows whose rate is unknown (unknown code, or a timestamp before
+the first stored rate) convert to ``NaN``.
+"""
+from typing import Iterable, Mapping
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .currency_rate import RATE_BASE, CurrencyRate
+from .rate_cache import RateHistory
+
+
+def to_epoch_array(at: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """Convert datetime64 values (UTC) or epoch seconds to float epoch seconds."""
+    arr = np.asarray(at)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        micros = arr.astype("datetime64[us]").astype(np.int64)
+        return micros.astype(np.float64) / 1_000_000
+    return arr.astype(np.float64)
+
+
+class RateTable:
+    """Immutable snapshot of rate histories arranged for vectorized as-of joins."""
+
+    def __init__(
+        self, histories: Mapping[str, RateHistory], base: str = RATE_BASE
+    ) -> None:
+        self.base = base
+        self.codes = np.array(sorted(set(histories) | {base}))
+        self._base_idx = int(np.searchsorted(self.codes, base))
+
+        timestamps = [
+            np.frombuffer(histories[code].timestamps, dtype=np.float64)
+            if code in histories
+            else np.empty(0, dtype=np.float64)
+            for code in self.codes
+        ]
+        rates = [
+            np.frombuffer(histories[code].rates, dtype=np.float64)
+            if code in histories
+            else np.empty(0, dtype=np.float64)
+            for code in self.codes
+        ]
+        lengths = np.array([len(ts) for ts in timestamps], dtype=np.int64)
+        all_ts = np.concatenate(timestamps)
+        self._origin = float(all_ts.min()) if all_ts.size else 0.0
+        # Each code owns a disjoint key range [idx * span, idx * span + span)
+        self._span = float(all_ts.max()) - self._origin + 2 if all_ts.size else 2.0
+        self._point_codes = np.repeat(np.arange(len(self.codes)), lengths)
+        self._keys = (all_ts - self._origin) + self._point_codes * self._span
+        self._rates = np.concatenate(rates)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def code_index(self, codes: npt.ArrayLike) -> npt.NDArray[np.int64]:
+        """Map currency codes to table indexes (-1 for unknown codes)."""
+        arr = np.asarray(codes)
+        idx = np.searchsorted(self.codes, arr)
+        idx = np.minimum(idx, len(self.codes) - 1)
+        return np.where(self.codes[idx] == arr, idx, -1).astype(np.int64)
+
+    def rates_at(
+        self, codes: npt.ArrayLike, at: npt.ArrayLike
+    ) -> npt.NDArray[np.float64]:
+        """Return rate_vs_usd for each (code, timestamp) pair, NaN when unknown."""
+        code_idx = self.code_index(codes)
+        offset = np.clip(to_epoch_array(at) - self._origin, -1, self._span - 1)
+        pos = np.searchsorted(self._keys, offset + code_idx * self._span, "right")
+        pos -= 1
+        hit = (code_idx >= 0) & (pos >= 0)
+        hit &= self._point_codes[np.maximum(pos, 0)] == code_idx
+        out = np.where(hit, self._rates[np.maximum(pos, 0)], np.nan)
+        out[code_idx == self._base_idx] = 1.0
+        return out
+
+    def convert(
+        self,
+        amounts: npt.ArrayLike,
+        source_codes: npt.ArrayLike,
+        target_codes: npt.ArrayLike,
+        at: npt.ArrayLike,
+    ) -> npt.NDArray[np.float64]:
+        """Convert ``amounts`` from ``source_codes`` to ``target_codes`` at ``at``."""
+        epochs = to_epoch_array(at)
+        source = self.rates_at(source_codes, epochs)
+        target = self.rates_at(target_codes, epochs)
+        return np.asarray(amounts, dtype=np.float64) * target / source
+
+
+def load_rate_table(session: Session, codes: Iterable[str]) -> RateTable:
+    """Build a ``RateTable`` for ``codes`` from the shared rate cache."""
+    return RateTable(
+        {code: CurrencyRate.history(session, code) for code in set(codes)}
+    )
+
+
+async def load_rate_table_async(
+    session: AsyncSession, codes: Iterable[str]
+) -> RateTable:
+    """Async counterpart of ``load_rate_table``."""
+    return RateTable(
+        {code: await CurrencyRate.history_async(session, code) for code in set(codes)}
+    )
@@ -1,20 +1,43 @@
 import logging
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import datetime
-from typing import AsyncGenerator, ClassVar, Optional
-
-import httpx
-import pycountry
-from pydantic import BaseModel, field_validator
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    ClassVar,
+    Iterable,
+)
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    Insert,
+    Integer,
+    Select,
+    String,
+    UniqueConstraint,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from sqlalchemy.sql import func
 
-from .base import Base
+from .base import ON_CONFLICT_INSERTS, Base
+from .rate_cache import RateCache, RateHistory
+
+if TYPE_CHECKING:
+    from .rate_provider import ERAPI as ERAPI
 
 logger = logging.getLogger(__name__)
 
 RATE_BASE: str = "USD"
+# Rows per multi-row INSERT; 3 bind params per row stays well under the
+# asyncpg/Postgres limit of 32767 parameters per statement.
+INGEST_BATCH_SIZE: int = 5_000
 
 class CurrencyRateProvider(ABC):
     """
@@ -23,104 +46,54 @@ class CurrencyRateProvider(ABC):
 
     @classmethod
     @abstractmethod
-    async def iter_rates(cls) -> AsyncGenerator["CurrencyRate", None]:
+    def iter_rates(cls) -> AsyncGenerator["CurrencyRate", None]:
         """
         Asynchronously yield CurrencyRate objects.
         """
         raise NotImplementedError("Subclasses must implement iter_rates.")
 
-
-# Pydantic model for open.er-api.com response
-class ERAPI(BaseModel, CurrencyRateProvider):
-    CURRENCY_EXCHANGE_API_URL: ClassVar[str] = "https://open.er-api.com/v6/latest/{base}"
-    SUCCESS_CODE: ClassVar[str] = "success"
-    
-    result: str
-    time_last_update_unix: Optional[datetime] = None
-    time_last_update_utc: Optional[str] = None
-    time_next_update_unix: Optional[datetime] = None
-    time_next_update_utc: Optional[str] = None
-    time_eol_unix: Optional[datetime] = None
-    base_code: str
-    rates: dict[str, float]
-
-
-    @field_validator(
-        "time_last_update_unix",
-        "time_next_update_unix",
-        "time_eol_unix",
-        mode="before",
-    )
-    @classmethod
-    def validate_unix_fields(cls, v: int) -> None | datetime:
-        if not isinstance(v, int):
-            raise ValueError("Invalid unix timestamp")
-        if v == 0:
-            return None
-        return datetime.fromtimestamp(v)
-
-    @field_validator("base_code")
     @classmethod
-    def validate_code(cls, v: str) -> str:
-        try:
-            pycountry.currencies.lookup(v)
-        except LookupError as err:
-            raise ValueError(f"Invalid currency code: {v}") from err
-        return v
+    def next_update(cls) -> datetime | None:
+        """
+        When the provider publishes its next snapshot (timezone-aware), as
+        announced with the rates last yielded by ``iter_rates``; None if the
+        provider does not say.
+        """
+        return None
 
-    @classmethod
-    async def make_request(cls, base: str = RATE_BASE) -> "ERAPI":
-        url = cls.CURRENCY_EXCHANGE_API_URL.format(base=base)
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            obj = cls.model_validate(data)
-            if obj.result != cls.SUCCESS_CODE:
-                raise ValueError(
-                    f"API returned error result: {obj.result}. {obj}"
-                )
-            if obj.base_code != base:
-                raise ValueError(
-                    f"API returned unexpected base code: {obj.base_code}, "
-                    f"expected {base}"
-                )
-            return obj
-    
-    @classmethod
-    async def iter_rates(cls) -> AsyncGenerator["CurrencyRate", None]:  # type: ignore[override]
-        erapi = await cls.make_request()
-        if not isinstance(erapi.time_last_update_unix, datetime):
-            raise ValueError(
-                f"Invalid time_last_update_unix value: {erapi.time_last_update_unix} "
-                f"({type(erapi.time_last_update_unix)})"
-            )
-        if not erapi.base_code == RATE_BASE:
-            raise ValueError(
-                f"API returned unexpected base code: {erapi.base_code}, "
-                f"expected {RATE_BASE}"
-            )
-        for code, rate in erapi.rates.items():
-            logger.debug(f"Checking currency code: {repr(code)}")
-            try:
-                code = cls.validate_code(code)
-            except ValueError as err:
-                logger.warning(
-                    f"Skipping invalid currency code: {repr(code)}. "
-                    f"Reason: {err}"
-                )
-                continue
-            obj = CurrencyRate()
-            obj.currency_code = code
-            obj.rate_vs_usd = rate
-            obj.timestamp = erapi.time_last_update_unix
-            yield obj
-    
+
+def __getattr__(name: str) -> Any:
+    # ERAPI (and with it httpx/pycountry) lives in .rate_provider and is only
+    # imported when a provider is actually used.
+    if name == "ERAPI":
+        from .rate_provider import ERAPI
+
+        return ERAPI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass
+class RateIngestResult:
+    """Outcome of a bulk rate ingestion."""
+
+    inserted: int = 0
+    skipped: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.skipped
 
 
 class CurrencyRate(Base):
     __tablename__ = "currency_rate"
-    RATE_PROVIDER: type[CurrencyRateProvider] = ERAPI
+    __table_args__ = (
+        UniqueConstraint(
+            "currency_code", "timestamp", name="uq_currency_rate_code_timestamp"
+        ),
+    )
+    # None means the default provider (ERAPI), imported on first use
+    RATE_PROVIDER: ClassVar[type[CurrencyRateProvider] | None] = None
+    RATE_CACHE: ClassVar[RateCache] = RateCache()
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     currency_code: Mapped[str] = mapped_column(
@@ -133,16 +106,144 @@ class CurrencyRate(Base):
     )
 
     @classmethod
-    async def update_all(cls, session: Session) -> list["CurrencyRate"]:
+    def history_statement(cls, code: str) -> Select:
+        """Select the full (timestamp, rate_vs_usd) history for one currency."""
+        return (
+            select(cls.timestamp, cls.rate_vs_usd)
+            .where(cls.currency_code == code)
+            .order_by(cls.timestamp)
+        )
+
+    @staticmethod
+    def database_key(session: Session | AsyncSession) -> str:
         """
-        Update all currency rates in the table using the external API and store
-        them in currency_rate.
+        ``RATE_CACHE`` key of the database behind ``session``: each tenant
+        database has its own currency_rate table.
         """
-        rates: list["CurrencyRate"] = []
-        async for rate in await cls.RATE_PROVIDER.iter_rates():
-            rates.append(rate)
-        session.add_all(rates)
-        await session.commit()  # type: ignore[func-returns-value]
-        logger.info(f"Currency rates updated successfully ({len(rates)} rates).")
-        return rates
+        return session.get_bind().engine.url.render_as_string(hide_password=True)
+
+    @classmethod
+    def history(cls, session: Session, code: str) -> RateHistory:
+        """Return the cached rate history for ``code``, loading it on first use."""
+        database = cls.database_key(session)
+        history = cls.RATE_CACHE.get(code, database)
+        if history is None:
+            # Taken before the query: an ingest committed meanwhile skips caching
+            generation = cls.RATE_CACHE.generation(database)
+            rows = session.execute(cls.history_statement(code)).all()
+            history = cls.RATE_CACHE.load(code, rows, database, generation)
+        return history
+
+    @classmethod
+    async def history_async(cls, session: AsyncSession, code: str) -> RateHistory:
+        """Async counterpart of ``history`` for request handlers."""
+        database = cls.database_key(session)
+        history = cls.RATE_CACHE.get(code, database)
+        if history is None:
+            generation = cls.RATE_CACHE.generation(database)
+            result = await session.execute(cls.history_statement(code))
+            history = cls.RATE_CACHE.load(code, result.all(), database, generation)
+        return history
 
+    @classmethod
+    def rate_at(
+        cls, session: Session, code: str, at: datetime | None = None
+    ) -> float | None:
+        """
+        Return the rate_vs_usd for ``code`` as of ``at`` (or the latest), served
+        from ``RATE_CACHE``.
+        """
+        return cls.history(session, code).rate_at(at)
+
+    @classmethod
+    async def rate_at_async(
+        cls, session: AsyncSession, code: str, at: datetime | None = None
+    ) -> float | None:
+        """Async counterpart of ``rate_at``."""
+        return (await cls.history_async(session, code)).rate_at(at)
+
+    @classmethod
+    def ingest_statement(cls, dialect_name: str) -> Insert:
+        """
+        Return an ``INSERT ... ON CONFLICT (currency_code, timestamp) DO NOTHING
+        RETURNING`` statement for the given dialect.
+        """
+        insert = ON_CONFLICT_INSERTS.get(dialect_name)
+        if insert is None:
+            raise NotImplementedError(
+                f"Bulk rate ingestion is not supported on {dialect_name!r}"
+            )
+        stmt = insert(cls).on_conflict_do_nothing(
+            index_elements=[cls.currency_code, cls.timestamp]
+        )
+        return stmt.returning(cls.currency_code, cls.timestamp, cls.rate_vs_usd)
+
+    @classmethod
+    async def ingest(
+        cls,
+        session: AsyncSession,
+        rates: AsyncIterable["CurrencyRate"] | Iterable["CurrencyRate"],
+        batch_size: int = INGEST_BATCH_SIZE,
+    ) -> RateIngestResult:
+        """
+        Bulk insert rates in multi-row batches, skipping rows whose
+        (currency_code, timestamp) already exists. Commits once at the end and
+        merges the inserted rows into ``RATE_CACHE``.
+        """
+        stmt = cls.ingest_statement(session.get_bind().dialect.name)
+        database = cls.database_key(session)
+        result = RateIngestResult()
+        inserted: list[tuple[str, datetime, float]] = []
+        batch: list[dict[str, object]] = []
+
+        async def flush() -> None:
+            rows = (await session.execute(stmt, batch)).all()
+            inserted.extend(rows)
+            result.inserted += len(rows)
+            result.skipped += len(batch) - len(rows)
+            batch.clear()
+
+        if isinstance(rates, AsyncIterable):
+            async for rate in rates:
+                batch.append(rate.as_insert_params())
+                if len(batch) >= batch_size:
+                    await flush()
+        else:
+            for rate in rates:
+                batch.append(rate.as_insert_params())
+                if len(batch) >= batch_size:
+                    await flush()
+        if batch:
+            await flush()
+        await session.commit()
+        cls.RATE_CACHE.extend(inserted, database)
+        return result
+
+    def as_insert_params(self) -> dict[str, object]:
+        return {
+            "currency_code": self.currency_code,
+            "rate_vs_usd": self.rate_vs_usd,
+            "timestamp": self.timestamp,
+        }
+
+    @classmethod
+    def rate_provider(cls) -> type[CurrencyRateProvider]:
+        if cls.RATE_PROVIDER is not None:
+            return cls.RATE_PROVIDER
+        from .rate_provider import ERAPI
+
+        return ERAPI
+
+    @classmethod
+    async def update_all(cls, session: AsyncSession) -> RateIngestResult:
+        """
+        Update all currency rates in the table using the external API and store
+        them in currency_rate. Rates already stored for the same snapshot
+        timestamp are skipped.
+        """
+        result = await cls.ingest(session, cls.rate_provider().iter_rates())
+        logger.info(
+            f"Currency rates updated successfully ({result.inserted} inserted, "
+            f"{result.skipped} already present)."
+        )
+        return result
@@ -0,0 +1,218 @@
+"""
+Append-only double-entry journal and materialized account balances.
+
+A ``JournalEntry`` and its ``JournalLine`` rows are written once: the session
+rejects updates and deletes (post a reversing entry instead) and refuses to
+flush an entry whose line amounts do not sum to zero. Amounts are signed in the
+account's currency, debits positive and credits negative.
+
+Balances are not kept on a shared row. Each flushed entry also inserts one
+``BalanceDelta`` per (account, month) it touches, so concurrent postings to the
+same account only ever insert. ``pyledger.journal.merge_balance_deltas`` later
+folds the deltas into ``AccountBalance`` (one row per account), and a balance
+read is that row plus the account's not yet merged deltas.
+
+The same merge keeps ``BalanceCheckpoint`` rows, the closing balance of each
+month an account has postings in; a back-dated delta also moves the closings of
+the months after it. A balance as of any date is then the last checkpoint
+before that month, plus pending deltas, plus that month's lines up to the date.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    event,
+)
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship, validates
+from sqlalchemy.sql import func
+
+from .account import Account
+from .base import Base, TableNames
+
+# Signed amount in the account currency; 4 decimals covers every ISO 4217 minor unit
+AMOUNT_TYPE = Numeric(18, 4)
+AMOUNT_QUANTUM = Decimal("0.0001")
+
+
+class JournalError(ValueError):
+    """A journal write that would break the ledger's invariants."""
+
+
+class UnbalancedEntry(JournalError):
+    """The lines of an entry do not sum to zero."""
+
+
+def to_amount(value: Decimal | int | str) -> Decimal:
+    """Normalize an amount to a ``Decimal`` at the column's scale."""
+    if isinstance(value, float):
+        raise TypeError("Use Decimal, int or str amounts, not float")
+    amount = Decimal(value)
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return amount.quantize(AMOUNT_QUANTUM)
+
+
+def period_of(day: date) -> date:
+    """The balance period (month) containing ``day``, as its first day."""
+    return day.replace(day=1)
+
+
+class JournalEntry(Base):
+    __tablename__ = TableNames.JOURNAL_ENTRY
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.COMPANY}.id"), nullable=False
+    )
+    effective_date: Mapped[date] = mapped_column(Date, nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    reference: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # Set on the entry that reverses (cancels) another one
+    reverses_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.JOURNAL_ENTRY}.id"), nullable=True
+    )
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    lines: Mapped[list["JournalLine"]] = relationship(
+        back_populates="entry", cascade="save-update, merge"
+    )
+
+    def check_balanced(self) -> None:
+        if len(self.lines) < 2:
+            raise UnbalancedEntry("A journal entry needs at least two lines")
+        total = sum((line.amount for line in self.lines), Decimal(0))
+        if total != 0:
+            raise UnbalancedEntry(f"Journal entry lines sum to {total}, not 0")
+
+
+class JournalLine(Base):
+    __tablename__ = TableNames.JOURNAL_LINE
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entry_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.JOURNAL_ENTRY}.id"), nullable=False
+    )
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.ACCOUNT}.id"), nullable=False
+    )
+    amount: Mapped[Decimal] = mapped_column(AMOUNT_TYPE, nullable=False)
+    memo: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Copy of the entry's date (set on flush) so per-account date ranges are
+    # one index range scan
+    effective_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    entry: Mapped[JournalEntry] = relationship(back_populates="lines")
+    account: Mapped[Account] = relationship()
+
+    @validates("amount")
+    def validate_amount(self, key: str, value: Decimal | int | str) -> Decimal:
+        return to_amount(value)
+
+
+class BalanceDelta(Base):
+    """Net movement of one account in one period from one posting (insert-only)."""
+
+    __tablename__ = TableNames.BALANCE_DELTA
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.ACCOUNT}.id"), nullable=False
+    )
+    period: Mapped[date] = mapped_column(Date, nullable=False)
+    amount: Mapped[Decimal] = mapped_column(AMOUNT_TYPE, nullable=False)
+
+    account: Mapped[Account] = relationship()
+
+
+class AccountBalance(Base):
+    """Merged balance of one account (see ``BalanceDelta``)."""
+
+    __tablename__ = TableNames.ACCOUNT_BALANCE
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.ACCOUNT}.id"), primary_key=True
+    )
+    balance: Mapped[Decimal] = mapped_column(AMOUNT_TYPE, nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class BalanceCheckpoint(Base):
+    """
+    Closing balance of an account at the end of ``period`` (a month, as its
+    first day): every merged delta of that month or earlier. Maintained by
+    ``merge_balance_deltas``; months without postings have no row.
+    """
+
+    __tablename__ = TableNames.BALANCE_CHECKPOINT
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(f"{TableNames.ACCOUNT}.id"), primary_key=True
+    )
+    period: Mapped[date] = mapped_column(Date, primary_key=True)
+    closing_balance: Mapped[Decimal] = mapped_column(AMOUNT_TYPE, nullable=False)
+
+
+Index(
+    "ix_journal_entry_company_date",
+    JournalEntry.company_id,
+    JournalEntry.effective_date,
+)
+Index("ix_journal_line_account", JournalLine.account_id, JournalLine.entry_id)
+Index(
+    "ix_journal_line_account_date",
+    JournalLine.account_id,
+    JournalLine.effective_date,
+)
+Index("ix_balance_delta_account", BalanceDelta.account_id, BalanceDelta.period)
+
+
+def delta_rows(
+    postings: Iterable[tuple[Any, date, Decimal]],
+) -> dict[tuple[Any, date], Decimal]:
+    """Net ``(account, effective_date, amount)`` postings per (account, period)."""
+    totals: dict[tuple[Any, date], Decimal] = defaultdict(Decimal)
+    for account, day, amount in postings:
+        totals[(account, period_of(day))] += amount
+    return {key: amount for key, amount in totals.items() if amount != 0}
+
+
+@event.listens_for(Session, "before_flush")
+def _check_journal_writes(session: Session, flush_context: Any, instances: Any) -> None:
+    for obj in session.deleted:
+        if isinstance(obj, (JournalEntry, JournalLine)):
+            raise JournalError(
+                "Journal entries are append-only; post a reversing entry instead"
+            )
+    for obj in session.dirty:
+        if isinstance(obj, (JournalEntry, JournalLine)) and session.is_modified(obj):
+            raise JournalError(
+                "Journal entries are append-only; post a reversing entry instead"
+            )
+
+    entries = [obj for obj in session.new if isinstance(obj, JournalEntry)]
+    postings = []
+    for obj in session.new:
+        if isinstance(obj, JournalLine) and (
+            obj.entry is None or obj.entry not in session.new
+        ):
+            raise JournalError("Journal lines can only be added with a new entry")
+    for entry in entries:
+        entry.check_balanced()
+        for line in entry.lines:
+            line.effective_date = entry.effective_date
+            # Unflushed accounts have no id yet; key the delta by the object
+            account = line.account_id if line.account_id is not None else line.account
+            postings.append((account, entry.effective_date, line.amount))
+    for (account, period), amount in delta_rows(postings).items():
+        if isinstance(account, Account):
+            session.add(BalanceDelta(account=account, period=period, amount=amount))
+        else:
+            session.add(BalanceDelta(account_id=account, period=period, amount=amount))
@@ -0,0 +1,80 @@
+"""
+Lazy proxy for Pydantic values loaded from ``PydanticTypeDecorator(lazy=True)``
+columns.
+
+A ``LazyModel`` keeps the JSON text exactly as the database returned it and
+runs ``model_validate_json`` only when an attribute is first read (or set). Rows
+whose value is never touched, e.g. on list endpoints, skip validation entirely,
+and ``raw_json()`` (used by ``pyledger.api.responses.RawJSONResponse``) returns
+the stored text unchanged until the value has been materialized.
+"""
+from typing import Any, Generic, Iterator, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LazyModel(Generic[T]):
+    """
+    Proxy for a ``T`` that is validated from ``raw`` on first attribute access.
+
+    Once materialized it delegates everything to the model instance, and
+    ``raw_json()`` re-serializes the instance: in-place changes cannot be seen
+    from here, so the stored text is only trusted while it was never parsed.
+    """
+
+    __slots__ = ("_model", "_raw", "_value")
+
+    _model: type[T]
+    _raw: str | bytes
+    _value: T | None
+
+    def __init__(self, model: type[T], raw: str | bytes) -> None:
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_value", None)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._value is not None
+
+    def materialize(self) -> T:
+        """Validate the raw JSON (once) and return the model instance."""
+        if self._value is None:
+            value = self._model.model_validate_json(self._raw)
+            object.__setattr__(self, "_value", value)
+        return self._value  # type: ignore[return-value]
+
+    def raw_json(self) -> str:
+        """The stored JSON if never materialized, else the model's current JSON."""
+        if self._value is None:
+            raw = self._raw
+            return raw.decode() if isinstance(raw, bytes) else raw
+        return self._value.model_dump_json()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.materialize(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.materialize(), name, value)
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return iter(self.materialize())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyModel):
+            other = other.materialize()
+        return self.materialize() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        if self._value is None:
+            return f"LazyModel[{self._model.__name__}]({self._raw!r})"
+        return f"LazyModel[{self._model.__name__}]({self._value!r})"
+
+
+def materialize(value: "T | LazyModel[T] | None") -> T | None:
+    """``value`` itself, or the validated model behind a ``LazyModel`` proxy."""
+    return value.materialize() if isinstance(value, LazyModel) else value
@@ -0,0 +1,153 @@
+"""
+Concurrent historical currency rate backfill.
+
+``RateBackfill`` fetches many rate snapshots (bases x dates) through one shared,
+connection-pooled ``httpx.AsyncClient`` with a fixed number of workers, retries
+transient failures with exponential backoff and full jitter, and streams each
+validated snapshot through a bounded queue into ``CurrencyRate.ingest`` so
+fetching and writing overlap and memory stays bounded.
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Iterable, Iterator
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..http import get_http_client
+from .currency_rate import RATE_BASE, CurrencyRate, RateIngestResult
+from .rate_provider import ERAPI
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class SnapshotRequest:
+    """One snapshot to fetch: ``base`` as of ``on`` (``None`` means latest)."""
+
+    base: str = RATE_BASE
+    on: date | None = None
+
+
+@dataclass
+class BackfillResult:
+    fetched: int = 0
+    ingest: RateIngestResult = field(default_factory=RateIngestResult)
+    failed: dict[SnapshotRequest, str] = field(default_factory=dict)
+
+
+def daily_requests(
+    start: date, end: date, bases: Iterable[str] = (RATE_BASE,)
+) -> Iterator[SnapshotRequest]:
+    """Yield one request per base per day from ``start`` to ``end`` inclusive."""
+    bases = list(bases)
+    day = start
+    while day <= end:
+        for base in bases:
+            yield SnapshotRequest(base=base, on=day)
+        day += timedelta(days=1)
+
+
+def is_retryable(err: Exception) -> bool:
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.status_code in RETRY_STATUS_CODES
+    return isinstance(err, httpx.TransportError)
+
+
+class RateBackfill:
+    def __init__(
+        self,
+        provider: type[ERAPI] = ERAPI,
+        concurrency: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        queue_size: int | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive, got {concurrency}")
+        self.provider = provider
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queue_size = queue_size or concurrency * 2
+
+    def retry_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) attempt."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    async def fetch(
+        self, request: SnapshotRequest, client: httpx.AsyncClient
+    ) -> ERAPI:
+        """Fetch one snapshot, retrying transport errors and 429/5xx responses."""
+        attempt = 0
+        while True:
+            try:
+                return await self.provider.make_request(
+                    request.base, request.on, client=client
+                )
+            except (httpx.HTTPStatusError, httpx.TransportError) as err:
+                if attempt >= self.retries or not is_retryable(err):
+                    raise
+                delay = self.retry_delay(attempt)
+                attempt += 1
+                logger.debug(
+                    f"Retrying {request} in {delay:.2f}s "
+                    f"(attempt {attempt}/{self.retries}): {err!r}"
+                )
+                await asyncio.sleep(delay)
+
+    async def run(
+        self,
+        session: AsyncSession,
+        requests: Iterable[SnapshotRequest],
+        client: httpx.AsyncClient | None = None,
+    ) -> BackfillResult:
+        """Fetch ``requests`` concurrently and ingest them as they arrive."""
+        client = client or get_http_client()
+        result = BackfillResult()
+        pending = iter(requests)
+        queue: asyncio.Queue[ERAPI | None] = asyncio.Queue(self.queue_size)
+
+        async def worker() -> None:
+            for request in pending:
+                try:
+                    snapshot = await self.fetch(request, client)
+                except (httpx.HTTPError, ValueError) as err:
+                    logger.warning(f"Failed to fetch {request}: {err}")
+                    result.failed[request] = str(err)
+                    continue
+                result.fetched += 1
+                await queue.put(snapshot)
+
+        async def writer() -> None:
+            while (snapshot := await queue.get()) is not None:
+                ingested = await CurrencyRate.ingest(
+                    session, snapshot.currency_rates()
+                )
+                result.ingest.inserted += ingested.inserted
+                result.ingest.skipped += ingested.skipped
+
+        async def produce() -> None:
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(self.concurrency):
+                    workers.create_task(worker())
+            await queue.put(None)
+
+        # A failing writer cancels the workers instead of leaving them blocked
+        # on a full queue.
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(produce())
+            tg.create_task(writer())
+        logger.info(
+            f"Backfill complete: {result.fetched} snapshots fetched, "
+            f"{result.ingest.inserted} rates inserted, "
+            f"{result.ingest.skipped} skipped, {len(result.failed)} failed."
+        )
+        return result
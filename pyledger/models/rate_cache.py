@@ -0,0 +1,200 @@
+"""
+In-process, point-in-time cache of currency rate history.
+
+Each currency's history is kept as two parallel sorted arrays (epoch seconds and
+rate_vs_usd), so "rate as of T" is a binary search instead of a database round
+trip. Histories are loaded lazily per database and currency and evicted
+least-recently-used once the total number of cached points exceeds
+``max_points``.
+"""
+import logging
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POINTS: int = 1_000_000
+
+
+def to_epoch(ts: datetime) -> float:
+    """Convert a (naive or aware) datetime to epoch seconds."""
+    return ts.timestamp()
+
+
+class RateHistory:
+    """Sorted timestamp/rate arrays for a single currency."""
+
+    __slots__ = ("timestamps", "rates")
+
+    def __init__(self, rows: Iterable[tuple[datetime, float]] = ()) -> None:
+        self.timestamps = array("d")
+        self.rates = array("d")
+        for ts, rate in sorted(rows, key=lambda row: to_epoch(row[0])):
+            self.timestamps.append(to_epoch(ts))
+            self.rates.append(rate)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add(self, ts: datetime, rate: float) -> bool:
+        """
+        Insert a point, keeping the arrays sorted. Returns False if a point with
+        the same timestamp is already present (its rate is replaced).
+        """
+        epoch = to_epoch(ts)
+        if not self.timestamps or epoch > self.timestamps[-1]:
+            self.timestamps.append(epoch)
+            self.rates.append(rate)
+            return True
+        idx = bisect_right(self.timestamps, epoch)
+        if idx and self.timestamps[idx - 1] == epoch:
+            self.rates[idx - 1] = rate
+            return False
+        self.timestamps.insert(idx, epoch)
+        self.rates.insert(idx, rate)
+        return True
+
+    def rate_at(self, at: datetime | None = None) -> float | None:
+        """Return the latest rate with timestamp <= ``at`` (or the latest overall)."""
+        if not self.timestamps:
+            return None
+        if at is None:
+            return self.rates[-1]
+        idx = bisect_right(self.timestamps, to_epoch(at))
+        return self.rates[idx - 1] if idx else None
+
+
+# (database, currency code): each tenant database has its own currency_rate
+RateKey = tuple[str, str]
+
+
+class RateCache:
+    """
+    LRU cache of ``RateHistory`` objects keyed by database and currency code.
+
+    The cache does not query the database itself; callers load rows on a miss
+    (see ``CurrencyRate.rate_at``) and hand them to ``load``. ``database`` is
+    the key of the database the rows came from (``CurrencyRate.database_key``),
+    so tenants never see each other's rates; ``max_points`` bounds all
+    databases together.
+
+    ``extend`` and ``invalidate`` bump the database's ``generation``. A caller
+    captures it before querying and passes it to ``load``, which then does not
+    cache rows read before a concurrent ingest (they would miss its rates for
+    good, as nothing expires).
+    """
+
+    def __init__(self, max_points: int = DEFAULT_MAX_POINTS) -> None:
+        if max_points < 1:
+            raise ValueError(f"max_points must be positive, got {max_points}")
+        self.max_points = max_points
+        self._histories: OrderedDict[RateKey, RateHistory] = OrderedDict()
+        self._points = 0
+        self._generations: dict[str, int] = {}
+        # Bumped by invalidating every database; part of each generation
+        self._cleared = 0
+
+    def __contains__(self, key: str | RateKey) -> bool:
+        """``code`` (of the unnamed database ``""``) or ``(database, code)``."""
+        return (("", key) if isinstance(key, str) else key) in self._histories
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+    @property
+    def points(self) -> int:
+        """Total number of cached rate points across all currencies."""
+        return self._points
+
+    def generation(self, database: str = "") -> int:
+        """Changes whenever ``database``'s rates are extended or invalidated."""
+        return self._cleared + self._generations.get(database, 0)
+
+    def get(self, code: str, database: str = "") -> RateHistory | None:
+        """Return the cached history for ``code`` (marking it recently used)."""
+        key = (database, code)
+        history = self._histories.get(key)
+        if history is not None:
+            self._histories.move_to_end(key)
+        return history
+
+    def load(
+        self,
+        code: str,
+        rows: Iterable[tuple[datetime, float]],
+        database: str = "",
+        generation: int | None = None,
+    ) -> RateHistory:
+        """
+        Replace the cached history for ``code`` with ``rows``, unless
+        ``generation`` (taken before reading them) is no longer current: then
+        the history is returned uncached and the next lookup reads again.
+        """
+        history = RateHistory(rows)
+        if generation is not None and generation != self.generation(database):
+            return history
+        key = (database, code)
+        self._drop(lambda k: k == key)
+        self._histories[key] = history
+        self._points += len(history)
+        self._evict(keep=key)
+        return history
+
+    def extend(
+        self, rows: Iterable[tuple[str, datetime, float]], database: str = ""
+    ) -> None:
+        """
+        Merge freshly committed ``(code, timestamp, rate)`` rows into histories
+        that are already loaded. Unloaded currencies pick the rows up on their
+        next lazy load.
+        """
+        self._bump(database)
+        for code, ts, rate in rows:
+            history = self._histories.get((database, code))
+            if history is not None and history.add(ts, rate):
+                self._points += 1
+        self._evict()
+
+    def invalidate(
+        self, codes: Iterable[str] | None = None, database: str | None = None
+    ) -> None:
+        """
+        Drop the given currencies (or all of them) of ``database``, or of every
+        database if None.
+        """
+        if database is None:
+            self._cleared += 1
+        else:
+            self._bump(database)
+        if codes is None and database is None:
+            self._histories.clear()
+            self._points = 0
+            return
+        wanted = None if codes is None else set(codes)
+        self._drop(
+            lambda key: (database is None or key[0] == database)
+            and (wanted is None or key[1] in wanted)
+        )
+
+    def _bump(self, database: str) -> None:
+        self._generations[database] = self._generations.get(database, 0) + 1
+
+    def _drop(self, matches: Callable[[RateKey], bool]) -> None:
+        for key in [key for key in self._histories if matches(key)]:
+            self._points -= len(self._histories.pop(key))
+
+    def _evict(self, keep: RateKey | None = None) -> None:
+        while self._points > self.max_points and len(self._histories) > 1:
+            key = next(iter(self._histories))
+            if key == keep:
+                self._histories.move_to_end(key)
+                key = next(iter(self._histories))
+            history = self._histories.pop(key)
+            self._points -= len(history)
+            logger.debug(
+                f"Evicted {key[1]} ({len(history)} points) of {key[0] or 'default'} "
+                "from rate cache."
+            )
@@ -0,0 +1,197 @@
+"""
+Currency rate providers.
+
+Kept apart from ``currency_rate`` so importing the models does not import
+``httpx`` or build the ISO code indexes; ``CurrencyRate.rate_provider`` imports this
+module the first time rates are fetched.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import AsyncGenerator, ClassVar, Iterator, Optional, Self
+
+import httpx
+from pydantic import AliasChoices, BaseModel, Field, field_validator, model_validator
+
+from .. import iso_codes
+from ..config import get_erapi_api_key
+from ..http import get_http_client
+from .currency_rate import RATE_BASE, CurrencyRate, CurrencyRateProvider
+from .rate_response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+# Pydantic model for open.er-api.com response
+class ERAPI(BaseModel, CurrencyRateProvider):
+    CURRENCY_EXCHANGE_API_URL: ClassVar[str] = "https://open.er-api.com/v6/latest/{base}"
+    # Dated snapshots are only served by the keyed exchangerate-api.com endpoint
+    CURRENCY_HISTORY_API_URL: ClassVar[str] = (
+        "https://v6.exchangerate-api.com/v6/{api_key}/history/"
+        "{base}/{year}/{month}/{day}"
+    )
+    SUCCESS_CODE: ClassVar[str] = "success"
+    RESPONSE_CACHE: ClassVar[ResponseCache | None] = ResponseCache()
+    # time_next_update_unix of the snapshot last fetched by iter_rates
+    NEXT_UPDATE: ClassVar[datetime | None] = None
+
+    result: str
+    time_last_update_unix: Optional[datetime] = None
+    time_last_update_utc: Optional[str] = None
+    time_next_update_unix: Optional[datetime] = None
+    time_next_update_utc: Optional[str] = None
+    time_eol_unix: Optional[datetime] = None
+    # Only present on history responses
+    year: Optional[int] = None
+    month: Optional[int] = None
+    day: Optional[int] = None
+    base_code: str
+    rates: dict[str, float] = Field(
+        validation_alias=AliasChoices("rates", "conversion_rates")
+    )
+
+
+    @field_validator(
+        "time_last_update_unix",
+        "time_next_update_unix",
+        "time_eol_unix",
+        mode="before",
+    )
+    @classmethod
+    def validate_unix_fields(cls, v: int) -> None | datetime:
+        if not isinstance(v, int):
+            raise ValueError("Invalid unix timestamp")
+        if v == 0:
+            return None
+        return datetime.fromtimestamp(v)
+
+    @field_validator("base_code")
+    @classmethod
+    def validate_code(cls, v: str) -> str:
+        if not iso_codes.is_currency(v):
+            raise ValueError(f"Invalid currency code: {v}")
+        return v
+
+    @model_validator(mode="after")
+    def default_history_timestamp(self) -> Self:
+        if self.time_last_update_unix is None and self.year and self.month:
+            self.time_last_update_unix = datetime(self.year, self.month, self.day or 1)
+        return self
+
+    @classmethod
+    def snapshot_url(cls, base: str = RATE_BASE, on: date | None = None) -> str:
+        """Return the URL of the latest (``on=None``) or a dated snapshot."""
+        if on is None:
+            return cls.CURRENCY_EXCHANGE_API_URL.format(base=base)
+        api_key = get_erapi_api_key()
+        if not api_key:
+            raise ValueError(
+                "Historical rates require an API key (ERAPI_API_KEY_FILE or "
+                "ERAPI_API_KEY)."
+            )
+        return cls.CURRENCY_HISTORY_API_URL.format(
+            api_key=api_key, base=base, year=on.year, month=on.month, day=on.day
+        )
+
+    @classmethod
+    def parse_snapshot(cls, body: str | bytes, base: str = RATE_BASE) -> "ERAPI":
+        """Validate a raw response body for a snapshot requested for ``base``."""
+        obj = cls.model_validate_json(body)
+        if obj.result != cls.SUCCESS_CODE:
+            raise ValueError(
+                f"API returned error result: {obj.result}. {obj}"
+            )
+        if obj.base_code != base:
+            raise ValueError(
+                f"API returned unexpected base code: {obj.base_code}, "
+                f"expected {base}"
+            )
+        return obj
+
+    @classmethod
+    async def make_request(
+        cls,
+        base: str = RATE_BASE,
+        on: date | None = None,
+        client: httpx.AsyncClient | None = None,
+    ) -> "ERAPI":
+        """
+        Fetch and validate one snapshot through ``client`` (default: the shared
+        pooled client from ``pyledger.http``).
+
+        Latest snapshots go through ``RESPONSE_CACHE``: they are served without a
+        network call until ``time_next_update_unix``, then revalidated with a
+        conditional request.
+        """
+        url = cls.snapshot_url(base, on)
+        cache = cls.RESPONSE_CACHE if on is None else None
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None and cached.is_fresh():
+            if cached.parsed is None:
+                cached.parsed = cls.parse_snapshot(cached.body, base)
+            return cached.parsed
+
+        client = client or get_http_client()
+        headers = cached.conditional_headers() if cached is not None else None
+        resp = await client.get(url, headers=headers)
+        if resp.status_code == 304 and cache is not None and cached is not None:
+            logger.debug(f"Rate snapshot not modified: {base}")
+            obj = cached.parsed or cls.parse_snapshot(cached.body, base)
+            cached.parsed = obj
+            cache.revalidated(cached)
+            return obj
+        resp.raise_for_status()
+        obj = cls.parse_snapshot(resp.content, base)
+        if cache is not None:
+            next_update = obj.time_next_update_unix
+            cache.put(
+                url,
+                resp,
+                next_update.timestamp() if next_update else None,
+                parsed=obj,
+            )
+        return obj
+
+    def currency_rates(self) -> Iterator["CurrencyRate"]:
+        """
+        Yield CurrencyRate objects for this snapshot, normalized to RATE_BASE
+        when the snapshot was fetched for a different base currency.
+        """
+        if not isinstance(self.time_last_update_unix, datetime):
+            raise ValueError(
+                f"Invalid time_last_update_unix value: {self.time_last_update_unix} "
+                f"({type(self.time_last_update_unix)})"
+            )
+        base_rate = self.rates.get(RATE_BASE)
+        if not base_rate:
+            raise ValueError(
+                f"Snapshot for base {self.base_code} has no {RATE_BASE} rate"
+            )
+        currencies = iso_codes.currencies()
+        for code, rate in self.rates.items():
+            if code not in currencies:
+                logger.warning(f"Skipping invalid currency code: {code!r}")
+                continue
+            obj = CurrencyRate()
+            obj.currency_code = code
+            obj.rate_vs_usd = rate / base_rate
+            obj.timestamp = self.time_last_update_unix
+            yield obj
+
+    @classmethod
+    async def iter_rates(cls) -> AsyncGenerator["CurrencyRate", None]:
+        erapi = await cls.make_request()
+        if not erapi.base_code == RATE_BASE:
+            raise ValueError(
+                f"API returned unexpected base code: {erapi.base_code}, "
+                f"expected {RATE_BASE}"
+            )
+        cls.NEXT_UPDATE = erapi.time_next_update_unix
+        for rate in erapi.currency_rates():
+            yield rate
+
+    @classmethod
+    def next_update(cls) -> datetime | None:
+        # The unix fields are parsed to naive local times (fromtimestamp)
+        if cls.NEXT_UPDATE is None:
+            return None
+        return cls.NEXT_UPDATE.astimezone(timezone.utc)
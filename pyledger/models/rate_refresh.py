@@ -0,0 +1,25 @@
+"""Fleet-wide currency rate refresh schedule (common DB), one row per provider."""
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TableNames
+
+
+class RateRefresh(Base):
+    """
+    When the provider's rates were last fetched and when its next snapshot is
+    due; written by whichever worker holds the refresh lock (see
+    ``pyledger.rate_refresh``) and read by the others.
+    """
+
+    __tablename__ = TableNames.RATE_REFRESH
+    # CurrencyRateProvider class name, e.g. "ERAPI"
+    provider: Mapped[str] = mapped_column(String(64), primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    next_update_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
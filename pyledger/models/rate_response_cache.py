@@ -0,0 +1,169 @@
+"""
+Schedule-aware cache for currency rate provider responses.
+
+Providers such as ERAPI publish when their next update is due
+(``time_next_update_unix``). Until then, a validated response is served from
+memory (or from disk, which is shared by every worker on the host) without any
+network call. Once it is due, the response is revalidated with a conditional
+request (``If-None-Match`` / ``If-Modified-Since``); a ``304 Not Modified``
+extends the cached entry by ``revalidate_interval`` instead of re-downloading.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from ..config import get_rate_cache_dir
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# How long to trust a response after a 304, or after a provider's scheduled
+# update time has passed without new data being published.
+DEFAULT_REVALIDATE_INTERVAL: float = 300.0
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: str
+    fresh_until: float
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = field(default_factory=time.time)
+    # Parsed provider object, kept in memory only
+    parsed: Any = field(default=None, compare=False)
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        return (now if now is not None else time.time()) < self.fresh_until
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data.pop("parsed")
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CachedResponse":
+        return cls(**json.loads(raw))
+
+
+class ResponseCache:
+    """
+    Two-level (memory, then disk) cache of validated provider responses.
+
+    ``directory`` defaults to ``config.get_rate_cache_dir()`` (``RATE_CACHE_DIR``),
+    read when used rather than at import; None keeps responses in memory only.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = "",
+        revalidate_interval: float = DEFAULT_REVALIDATE_INTERVAL,
+    ) -> None:
+        self._directory = directory
+        self.revalidate_interval = revalidate_interval
+        self._memory: dict[str, CachedResponse] = {}
+
+    @property
+    def directory(self) -> str | None:
+        return get_rate_cache_dir() if self._directory == "" else self._directory
+
+    def _path(self, url: str) -> str | None:
+        directory = self.directory
+        if directory is None:
+            return None
+        # Hash the URL so API keys embedded in it never end up in file names
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(directory, f"{digest}.json")
+
+    def _read_disk(self, url: str) -> CachedResponse | None:
+        path = self._path(url)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CachedResponse.from_json(f.read())
+        except (OSError, ValueError, TypeError) as err:
+            logger.warning(f"Ignoring unreadable rate cache file {path}: {err}")
+            return None
+        return entry if entry.url == url else None
+
+    def _write_disk(self, entry: CachedResponse) -> None:
+        path = self._path(entry.url)
+        if path is None:
+            return
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(entry.to_json())
+            os.replace(tmp, path)
+        except OSError as err:
+            logger.warning(f"Could not write rate cache file {path}: {err}")
+
+    def get(self, url: str) -> CachedResponse | None:
+        """
+        Return the freshest known entry for ``url``. A stale in-memory entry is
+        checked against disk, where another worker may have stored a newer one.
+        """
+        entry = self._memory.get(url)
+        if entry is not None and entry.is_fresh():
+            return entry
+        disk = self._read_disk(url)
+        if disk is not None and (entry is None or disk.fetched_at > entry.fetched_at):
+            self._memory[url] = disk
+            return disk
+        return entry
+
+    def put(
+        self,
+        url: str,
+        resp: "httpx.Response",
+        next_update: float | None,
+        parsed: Any = None,
+    ) -> CachedResponse:
+        """Store a validated response, fresh until the provider's next update."""
+        now = time.time()
+        fresh_until = now + self.revalidate_interval
+        if next_update is not None and next_update > fresh_until:
+            fresh_until = next_update
+        entry = CachedResponse(
+            url=url,
+            body=resp.text,
+            fresh_until=fresh_until,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            fetched_at=now,
+            parsed=parsed,
+        )
+        self._memory[url] = entry
+        self._write_disk(entry)
+        return entry
+
+    def revalidated(self, entry: CachedResponse) -> CachedResponse:
+        """Record a ``304 Not Modified`` for ``entry``."""
+        now = time.time()
+        entry.fetched_at = now
+        entry.fresh_until = now + self.revalidate_interval
+        self._memory[entry.url] = entry
+        self._write_disk(entry)
+        return entry
+
+    def clear(self) -> None:
+        """Drop in-memory entries (disk entries are left for other workers)."""
+        self._memory.clear()
@@ -0,0 +1,32 @@
+"""Tenant registry (common DB): maps a subdomain/header slug to a tenant database."""
+from sqlalchemy import Boolean, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TableNames
+
+
+class TenantRecord(Base):
+    __tablename__ = TableNames.TENANT
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Lower-case key used by resolvers (subdomain label or header value)
+    slug: Mapped[str] = mapped_column(String(63), unique=True, nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    db_name: Mapped[str | None] = mapped_column(String(63), nullable=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    @classmethod
+    async def lookup(cls, session: AsyncSession, slug: str) -> "TenantRecord | None":
+        """Return the active tenant registered under ``slug``, if any."""
+        result = await session.execute(
+            select(cls).where(cls.slug == slug.lower(), cls.is_active.is_(True))
+        )
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def list_active(cls, session: AsyncSession) -> "list[TenantRecord]":
+        """Return every active tenant, ordered by slug."""
+        result = await session.execute(
+            select(cls).where(cls.is_active.is_(True)).order_by(cls.slug)
+        )
+        return list(result.scalars())
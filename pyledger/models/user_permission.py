@@ -1,6 +1,6 @@
 from typing import Any, Self
 
-from sqlalchemy import ForeignKey, Integer, TypeDecorator
+from sqlalchemy import ColumnElement, ForeignKey, Index, Integer, TypeDecorator
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TableNames
@@ -99,4 +99,29 @@ class UserPermission(Base):
         PermissionType,
         nullable=False,
         default=Permission.from_mask(read=True),
-    )
\ No newline at end of file
+    )
+
+    @classmethod
+    def has_mask(cls, mask: int) -> ColumnElement[bool]:
+        """
+        SQL filter for grants holding every bit of ``mask``:
+        ``(permission & :mask) = :mask``.
+        """
+        return cls.permission.bitwise_and(int(mask)).self_group() == int(mask)
+
+
+# One grant per (user, company): the SQL mask filters (has_mask) test a single
+# row, and keyset pagination on company_id never sees a company twice
+Index(
+    "uq_user_permission_user_company",
+    UserPermission.user_id,
+    UserPermission.company_id,
+    unique=True,
+)
+# Serves per-user listings and mask filters from the index alone
+Index(
+    "ix_user_permission_user_company_permission",
+    UserPermission.user_id,
+    UserPermission.company_id,
+    UserPermission.permission,
+)
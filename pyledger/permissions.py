@@ -0,0 +1,274 @@
+"""Per-user permission maps for request authorization.
+
+``PermissionMap`` is a user's ``{company_id: Permission}`` grants, loaded in one
+query and compiled into a set of company ids per permission mask, so a single
+check is a dict probe and a batch check ("which of these 500 companies can this
+user write") is a set intersection. Maps are cached per (tenant, user) in a
+``PermissionCache`` (TTL, LRU, single-flight); writes to ``UserPermission``
+invalidate the user's entries when they are flushed and again when committed.
+That invalidation is local to the worker that wrote: other workers keep serving
+a revoked grant until their entry expires, so ``PERMISSION_CACHE_TTL`` (default
+5 seconds) is the bound on how long a revocation takes to apply fleet-wide.
+
+``get_permissions`` is the FastAPI dependency. It reads the authenticated user
+from ``request.state.user_id``, which the authentication layer is expected to
+set. ``require_permission(mask)`` builds a dependency that also checks the
+request's ``company_id`` parameter.
+
+For listings that should not load a whole map, ``accessible_company_ids`` /
+``accessible_companies`` push the mask test into SQL (``UserPermission.has_mask``)
+with keyset pagination on the company id, served by the
+``(user_id, company_id, permission)`` index; ``list_accessible_companies``
+returns one ``Page`` of them.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Annotated, Awaitable, Callable, Generic, Iterable, Mapping, TypeVar
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import Select, event, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapper, Session, object_session
+
+from .cache import SingleFlightCache
+from .db import get_session
+from .models.company import Company
+from .models.user_permission import Permission, UserPermission
+from .tenancy import Tenant, get_tenant
+
+# Every combination of the read/write/execute bits
+_MASKS = range(1, 8)
+# session.info key for the users whose grants changed in the open transaction
+_PENDING_KEY = "pyledger.permissions.pending"
+
+
+@dataclass(frozen=True)
+class PermissionMap:
+    """A user's grants, with the company ids allowed for each mask precomputed."""
+
+    user_id: int
+    grants: Mapping[int, Permission]
+    _allowed: Mapping[int, frozenset[int]] = field(repr=False)
+
+    @classmethod
+    def compile(
+        cls, user_id: int, rows: Iterable[tuple[int, int]]
+    ) -> "PermissionMap":
+        """Build from ``(company_id, permission)`` rows; duplicate rows are OR-ed."""
+        merged: dict[int, int] = {}
+        for company_id, permission in rows:
+            merged[company_id] = merged.get(company_id, 0) | int(permission)
+        allowed = {
+            mask: frozenset(c for c, p in merged.items() if p & mask == mask)
+            for mask in _MASKS
+        }
+        grants = {c: Permission(p) for c, p in merged.items()}
+        return cls(user_id=user_id, grants=grants, _allowed=allowed)
+
+    def get(self, company_id: int) -> Permission:
+        return self.grants.get(company_id, Permission(0))
+
+    def allows(self, company_id: int, mask: int) -> bool:
+        """Whether every bit of ``mask`` is granted on ``company_id``."""
+        return company_id in self._allowed[mask] if mask else True
+
+    def can_read(self, company_id: int) -> bool:
+        return company_id in self._allowed[Permission.READ_MASK]
+
+    def can_write(self, company_id: int) -> bool:
+        return company_id in self._allowed[Permission.WRITE_MASK]
+
+    def can_execute(self, company_id: int) -> bool:
+        return company_id in self._allowed[Permission.EXECUTE_MASK]
+
+    def companies(self, mask: int) -> frozenset[int]:
+        """All company ids on which every bit of ``mask`` is granted."""
+        if not mask:
+            return frozenset(self.grants)
+        return self._allowed[mask]
+
+    def filter(self, company_ids: Iterable[int], mask: int) -> frozenset[int]:
+        """The subset of ``company_ids`` on which ``mask`` is granted."""
+        return self.companies(mask).intersection(company_ids)
+
+
+async def load_permission_map(session: AsyncSession, user_id: int) -> PermissionMap:
+    """Load all of ``user_id``'s grants in one query."""
+    result = await session.execute(
+        select(UserPermission.company_id, UserPermission.permission).where(
+            UserPermission.user_id == user_id
+        )
+    )
+    return PermissionMap.compile(user_id, result.all())
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a keyset-paginated listing."""
+
+    items: list[T]
+    # Pass as ``after`` to fetch the next page; None on the last page
+    next_after: int | None = None
+
+
+def accessible_company_ids(
+    user_id: int, mask: int, after: int | None = None, limit: int | None = None
+) -> Select[int]:
+    """Ids of the companies on which ``user_id`` holds ``mask``, ascending."""
+    stmt = select(UserPermission.company_id).where(
+        UserPermission.user_id == user_id, UserPermission.has_mask(mask)
+    )
+    if after is not None:
+        stmt = stmt.where(UserPermission.company_id > after)
+    return stmt.order_by(UserPermission.company_id).limit(limit)
+
+
+def accessible_companies(
+    user_id: int, mask: int, after: int | None = None, limit: int | None = None
+) -> Select[Company]:
+    """
+    The companies on which ``user_id`` holds ``mask``, by ascending id. The
+    join is driven by the user's grants, so the cost follows the page size and
+    not the number of companies.
+    """
+    stmt = (
+        select(Company)
+        .join(UserPermission, UserPermission.company_id == Company.id)
+        .where(UserPermission.user_id == user_id, UserPermission.has_mask(mask))
+    )
+    if after is not None:
+        stmt = stmt.where(UserPermission.company_id > after)
+    return stmt.order_by(UserPermission.company_id).limit(limit)
+
+
+async def list_accessible_companies(
+    session: AsyncSession,
+    user_id: int,
+    mask: int,
+    after: int | None = None,
+    limit: int = 100,
+) -> Page[Company]:
+    """Fetch one page of ``accessible_companies`` (``limit`` items at most)."""
+    if limit < 1:
+        raise ValueError(f"limit must be positive, got {limit}")
+    stmt = accessible_companies(user_id, mask, after, limit + 1)
+    companies = list((await session.execute(stmt)).scalars())
+    if len(companies) > limit:
+        return Page(companies[:limit], next_after=companies[limit - 1].id)
+    return Page(companies)
+
+
+PermissionLoader = Callable[[], Awaitable[PermissionMap]]
+
+# Seconds a map is cached: how stale a revocation made by another worker can be
+DEFAULT_PERMISSION_TTL: float = 5.0
+
+
+class PermissionCache(SingleFlightCache[tuple[str, int], PermissionMap]):
+    """
+    Async TTL cache of ``PermissionMap`` per (tenant id, user id); see
+    ``SingleFlightCache``. A load that overlaps an invalidation is returned but
+    not cached, so a revoked grant cannot be stored back. Invalidation only
+    reaches this process: elsewhere an entry lives up to ``ttl`` seconds.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_PERMISSION_TTL, max_size: int = 10_000
+    ) -> None:
+        super().__init__(ttl, max_size=max_size)
+
+    async def get(
+        self, tenant_id: str, user_id: int, load: PermissionLoader
+    ) -> PermissionMap:
+        return await self.get_or_load((tenant_id, user_id), load)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        """Forget ``user_id``'s maps in every tenant (or all maps)."""
+        if user_id is None:
+            self.clear()
+        else:
+            self.discard_where(lambda key: key[1] == user_id)
+
+
+_cache: PermissionCache | None = None
+
+
+def get_permission_cache() -> PermissionCache:
+    global _cache
+    if _cache is None:
+        ttl = os.getenv("PERMISSION_CACHE_TTL")
+        _cache = PermissionCache(ttl=float(ttl) if ttl else DEFAULT_PERMISSION_TTL)
+    return _cache
+
+
+def invalidate_permissions(user_id: int | None = None) -> None:
+    """Invalidation hook: call after changing grants outside the ORM."""
+    if _cache is not None:
+        _cache.invalidate(user_id)
+
+
+@event.listens_for(UserPermission, "after_insert")
+@event.listens_for(UserPermission, "after_update")
+@event.listens_for(UserPermission, "after_delete")
+def _invalidate_user_permission(
+    mapper: Mapper[UserPermission], connection: Connection, target: UserPermission
+) -> None:
+    # A grant moved to another user changes both maps
+    user_ids = {target.user_id, *(inspect(target).attrs.user_id.history.deleted or ())}
+    for user_id in user_ids:
+        invalidate_permissions(user_id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_after_transaction(session: Session) -> None:
+    # Again once the change is visible (or discarded): a request that loaded the
+    # map between flush and commit may have cached the old grants
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_permissions(user_id)
+
+
+async def get_current_user_id(request: Request) -> int:
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return int(user_id)
+
+
+async def get_permissions(
+    user_id: Annotated[int, Depends(get_current_user_id)],
+    tenant: Annotated[Tenant, Depends(get_tenant)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> PermissionMap:
+    """Dependency returning the current user's (cached) ``PermissionMap``."""
+
+    async def load() -> PermissionMap:
+        return await load_permission_map(session, user_id)
+
+    return await get_permission_cache().get(tenant.id, user_id, load)
+
+
+def require_permission(mask: int) -> Callable[..., Awaitable[PermissionMap]]:
+    """
+    Dependency factory: 403 unless the user holds ``mask`` on the request's
+    ``company_id`` (path or query parameter), e.g.
+    ``Depends(require_permission(Permission.WRITE_MASK))``.
+    """
+
+    async def dependency(
+        company_id: int,
+        permissions: Annotated[PermissionMap, Depends(get_permissions)],
+    ) -> PermissionMap:
+        if not permissions.allows(company_id, mask):
+            raise HTTPException(status_code=403, detail="Permission denied")
+        return permissions
+
+    return dependency
+
@@ -0,0 +1,156 @@
+"""Opt-in per-request SQL statistics and N+1 detection.
+
+``collect_queries()`` records every statement executed in the current context
+(the request's task and anything it awaits, including SQLAlchemy's greenlets):
+how many, the time spent in the database, how often each statement *shape* ran
+and which ORM relationship loads were lazy. A shape is the SQL text with its
+parameter lists collapsed, so ``IN (?, ?)`` and ``IN (?, ?, ?)`` count as one.
+
+The same shape running ``N_PLUS_ONE_THRESHOLD`` or more times in one request
+usually means a lazy relationship (``User.companies``, ``Company.users``) read
+in a loop; ``QueryStats.suspects()`` lists those shapes.
+
+Listeners are installed once, on first use, for all engines and sessions, and
+do nothing outside a ``collect_queries()`` block. ``query_budget(n)`` turns the
+stats into an assertion for tests.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from sqlalchemy.orm import ORMExecuteState, Session
+
+# A shape executed this often in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD: int = 5
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+_installed = False
+
+_NUMBERED_PARAM = re.compile(r"\$\d+|%\(\w+\)s|(?<![:\w]):\w+")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUES_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements ran than a ``query_budget`` allowed."""
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """``statement`` with placeholders unified and parameter lists collapsed."""
+    shape = _NUMBERED_PARAM.sub("?", " ".join(statement.split()))
+    return _VALUES_LIST.sub("(?)", _PARAM_LIST.sub("?", shape))
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    # Seconds spent executing statements (cursor execute to its return)
+    db_time: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+    # "Class.relationship" -> lazy loads issued
+    lazy_loads: Counter[str] = field(default_factory=Counter)
+
+    def suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Statement shapes run ``threshold`` times or more, most frequent first."""
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        text = f"{self.count} queries, {self.db_time * 1000:.1f} ms in the database"
+        if self.lazy_loads:
+            loads = ", ".join(f"{k} x{n}" for k, n in self.lazy_loads.most_common())
+            text += f"; lazy loads: {loads}"
+        return text
+
+
+def current_stats() -> QueryStats | None:
+    """The stats being collected in this context, if any."""
+    return _current.get()
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """Collect statistics for the statements executed inside the block."""
+    install()
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Raise ``QueryBudgetExceeded`` if the block runs more than ``max_queries``."""
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        repeated = "".join(f"\n  {n}x {shape}" for shape, n in stats.suspects(2))
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries, budget {max_queries} "
+            f"({stats.summary()}){repeated}"
+        )
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    stats = _current.get()
+    starts = conn.info.get("query_stats_start")
+    if stats is None or not starts:
+        return
+    stats.count += 1
+    stats.db_time += time.perf_counter() - starts.pop()
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(context: Any) -> None:
+    starts = context.connection.info.get("query_stats_start")
+    if starts:
+        starts.pop()
+
+
+def _do_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    stats = _current.get()
+    if stats is None or orm_execute_state.lazy_loaded_from is None:
+        return
+    # The path ends at the relationship being loaded, e.g. User.user_permissions
+    prop = getattr(orm_execute_state.loader_strategy_path, "prop", None)
+    stats.lazy_loads[str(prop)] += 1
+
+
+def install() -> None:
+    """Register the (idle unless collecting) engine and session listeners."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+    _installed = True
@@ -0,0 +1,197 @@
+"""
+Scheduled currency rate refresh, fetched by one worker for the whole fleet.
+
+Every app worker runs a ``RateRefreshScheduler`` (``RATE_REFRESH=1``, started
+by the lifespan). A refresh on the common database:
+
+1. reads the provider's ``RateRefresh`` row without any lock: while its next
+   snapshot is not due, the worker only adopts the stored one;
+2. once due, ``pg_try_advisory_xact_lock(RATE_REFRESH_LOCK_KEY)`` elects the
+   fetching worker across every host (other dialects have no lock: one process
+   is assumed, and schedulers within a process take turns in ``_refreshing``).
+   It never waits: a worker that loses returns at once, holding no
+   connection, and re-reads the row ``LOCK_RETRY_DELAY`` later;
+3. the winner re-reads the row under the lock (the previous holder may just
+   have stored a snapshot) and, if still due, fetches and ingests the rates and
+   records the provider's announced next update (ERAPI's
+   ``time_next_update_unix``). The commit stores both and releases the lock.
+
+Only the winner keeps a transaction open across the HTTP fetch. The other
+workers find the row fresh and only drop the common database's entries of
+``CurrencyRate.RATE_CACHE``, so their next lookups load the new snapshot.
+"""
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .db import get_engine_manager
+from .models.currency_rate import CurrencyRate, CurrencyRateProvider, RateIngestResult
+from .models.rate_refresh import RateRefresh
+from .tenancy import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+# Transaction-level advisory lock key (the ASCII bytes of "pyledger")
+RATE_REFRESH_LOCK_KEY: int = 0x70796C6564676572
+# Refresh interval when the provider does not announce its next update
+DEFAULT_INTERVAL: timedelta = timedelta(hours=1)
+# Floor between two fetches, e.g. when the provider publishes late
+MIN_INTERVAL: timedelta = timedelta(minutes=5)
+# Delay before retrying a failed refresh
+RETRY_INTERVAL: timedelta = timedelta(minutes=1)
+# Delay before a worker that lost the refresh lock re-reads the schedule
+LOCK_RETRY_DELAY: timedelta = timedelta(seconds=5)
+
+# (database, provider) refreshes in progress in this process
+_refreshing: set[tuple[str, str]] = set()
+
+
+@dataclass
+class RefreshOutcome:
+    # Whether this worker fetched (else the stored snapshot was still fresh,
+    # or another worker is fetching and next_update is when to look again)
+    fetched: bool
+    next_update: datetime
+    result: RateIngestResult | None = None
+
+
+def lock_statement() -> Select:
+    """True if this transaction took the fleet-wide refresh lock (never waits)."""
+    return select(func.pg_try_advisory_xact_lock(RATE_REFRESH_LOCK_KEY))
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite returns DateTime(timezone=True) values naive (stored as UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class RateRefreshScheduler:
+    """
+    Refreshes the rates of ``provider`` (default ``CurrencyRate.rate_provider()``)
+    in the common database (default: the ``EngineManager``'s default tenant)
+    whenever they are due; see the module docstring.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession] | None = None,
+        provider: type[CurrencyRateProvider] | None = None,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.provider = provider
+        # refreshed_at of the latest snapshot this worker's cache reflects
+        self._seen: datetime | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def refresh(self, now: datetime | None = None) -> RefreshOutcome:
+        """Fetch the rates if due, else adopt the snapshot another worker stored."""
+        provider = self.provider or CurrencyRate.rate_provider()
+        sessionmaker = self.sessionmaker or get_engine_manager().get_sessionmaker(
+            DEFAULT_TENANT
+        )
+        now = now or datetime.now(timezone.utc)
+        async with sessionmaker() as session:
+            database = CurrencyRate.database_key(session)
+            state = await session.get(RateRefresh, provider.__name__)
+            if state is not None and _utc(state.next_update_at) > now:
+                return await self._adopt_stored(session, state, database)
+            await session.rollback()
+
+            key = (database, provider.__name__)
+            if key in _refreshing or not await self._try_lock(session):
+                await session.rollback()
+                logger.debug(
+                    f"Another worker is refreshing {provider.__name__} rates; "
+                    f"checking again in {LOCK_RETRY_DELAY}"
+                )
+                return RefreshOutcome(False, now + LOCK_RETRY_DELAY)
+            _refreshing.add(key)
+            try:
+                return await self._fetch(session, provider, database, now)
+            finally:
+                _refreshing.discard(key)
+
+    @staticmethod
+    async def _try_lock(session: AsyncSession) -> bool:
+        if session.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(await session.scalar(lock_statement()))
+
+    async def _fetch(
+        self,
+        session: AsyncSession,
+        provider: type[CurrencyRateProvider],
+        database: str,
+        now: datetime,
+    ) -> RefreshOutcome:
+        # Under the lock: the previous holder may just have stored a snapshot
+        state = await session.get(RateRefresh, provider.__name__)
+        if state is not None and _utc(state.next_update_at) > now:
+            return await self._adopt_stored(session, state, database)
+
+        rates = [rate async for rate in provider.iter_rates()]
+        next_update = max(
+            provider.next_update() or now + DEFAULT_INTERVAL, now + MIN_INTERVAL
+        )
+        if state is None:
+            state = RateRefresh(provider=provider.__name__)
+            session.add(state)
+        state.refreshed_at = now
+        state.next_update_at = next_update
+        # Commits the rates and the row together, releasing the lock
+        result = await CurrencyRate.ingest(session, rates)
+        self._seen = now
+        logger.info(
+            f"Currency rates refreshed from {provider.__name__} "
+            f"({result.inserted} inserted, {result.skipped} already present); "
+            f"next update {next_update.isoformat()}"
+        )
+        return RefreshOutcome(True, next_update, result)
+
+    async def _adopt_stored(
+        self, session: AsyncSession, state: RateRefresh, database: str
+    ) -> RefreshOutcome:
+        # Read before the rollback expires the row
+        refreshed_at = _utc(state.refreshed_at)
+        due = _utc(state.next_update_at)
+        await session.rollback()
+        self._adopt(refreshed_at, database)
+        return RefreshOutcome(False, due)
+
+    def _adopt(self, refreshed_at: datetime, database: str) -> None:
+        if refreshed_at != self._seen:
+            logger.info(
+                f"Picking up currency rates refreshed at {refreshed_at.isoformat()}"
+            )
+            CurrencyRate.RATE_CACHE.invalidate(database=database)
+            self._seen = refreshed_at
+
+    async def run(self) -> None:
+        """Refresh forever, sleeping until the next snapshot is due."""
+        while True:
+            try:
+                wake = (await self.refresh()).next_update
+            except Exception:
+                logger.exception(
+                    f"Currency rate refresh failed; retrying in {RETRY_INTERVAL}"
+                )
+                wake = datetime.now(timezone.utc) + RETRY_INTERVAL
+            delay = (wake - datetime.now(timezone.utc)).total_seconds()
+            await asyncio.sleep(max(delay, 1.0))
+
+    def start(self) -> None:
+        """Run the scheduler in a background task of the running loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="rate-refresh")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
@@ -0,0 +1,21 @@
+"""
+Controlled warm-up of ISO reference data.
+
+The ``pyledger.iso_codes`` indexes are built from ``pycountry``'s JSON databases
+on first use, which would otherwise happen inside the first request that
+validates an address or company settings. The app lifespan calls
+``warm_reference_data`` (in a worker thread, overlapping the schema check)
+unless ``STARTUP_WARMUP=0``; CLI scripts skip it and build only what they use.
+"""
+import time
+
+from . import iso_codes
+
+
+def warm_reference_data() -> float:
+    """Build the ISO code indexes used by validators; return seconds taken."""
+    start = time.perf_counter()
+    iso_codes.countries()
+    iso_codes.currencies()
+    iso_codes.languages()
+    return time.perf_counter() - start
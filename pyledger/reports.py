@@ -0,0 +1,124 @@
+"""Financial statements built on ``pyledger.journal.balances_as_of``.
+
+Amounts are presented with each account's normal sign (liabilities, equity and
+income positive when in credit) and totalled per currency; accounts in
+different currencies are never added together.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .journal import balances_as_of
+from .models.account import Account, AccountType
+
+BALANCE_SHEET_TYPES = (AccountType.ASSET, AccountType.LIABILITY, AccountType.EQUITY)
+PROFIT_AND_LOSS_TYPES = (AccountType.INCOME, AccountType.EXPENSE)
+
+
+@dataclass(frozen=True)
+class ReportLine:
+    account_id: int
+    name: str
+    type: AccountType
+    currency_code: str
+    amount: Decimal
+
+
+@dataclass
+class Report:
+    lines: list[ReportLine] = field(default_factory=list)
+
+    def total(self, *types: AccountType) -> dict[str, Decimal]:
+        """Sum of the lines of ``types`` (all lines if none), per currency."""
+        totals: dict[str, Decimal] = defaultdict(Decimal)
+        for line in self.lines:
+            if not types or line.type in types:
+                totals[line.currency_code] += line.amount
+        return dict(totals)
+
+
+@dataclass
+class BalanceSheet(Report):
+    """Assets, liabilities and equity at the end of ``day``."""
+
+    day: date = date.min
+    # Income less expenses since inception, per currency (part of equity)
+    retained_earnings: dict[str, Decimal] = field(default_factory=dict)
+
+
+@dataclass
+class ProfitAndLoss(Report):
+    """Income and expenses for ``start`` .. ``end`` (inclusive)."""
+
+    start: date = date.min
+    end: date = date.min
+
+    @property
+    def net_income(self) -> dict[str, Decimal]:
+        income = self.total(AccountType.INCOME)
+        expenses = self.total(AccountType.EXPENSE)
+        return {
+            currency: income.get(currency, Decimal(0))
+            - expenses.get(currency, Decimal(0))
+            for currency in income.keys() | expenses.keys()
+        }
+
+
+async def _company_accounts(
+    session: AsyncSession, company_id: int, types: tuple[AccountType, ...]
+) -> list[Account]:
+    result = await session.execute(
+        select(Account)
+        .where(Account.company_id == company_id, Account.type.in_(types))
+        .order_by(Account.type, Account.name)
+    )
+    return list(result.scalars())
+
+
+def _line(account: Account, balance: Decimal) -> ReportLine:
+    return ReportLine(
+        account.id,
+        account.name,
+        account.type,
+        account.currency_code,
+        balance * account.normal_sign,
+    )
+
+
+async def balance_sheet(
+    session: AsyncSession, company_id: int, day: date
+) -> BalanceSheet:
+    accounts = await _company_accounts(
+        session, company_id, BALANCE_SHEET_TYPES + PROFIT_AND_LOSS_TYPES
+    )
+    balances = await balances_as_of(session, [a.id for a in accounts], day)
+    report = BalanceSheet(day=day)
+    retained: dict[str, Decimal] = defaultdict(Decimal)
+    for account in accounts:
+        if account.type in PROFIT_AND_LOSS_TYPES:
+            # Debit-positive: income reduces it, so credit-normal presentation
+            retained[account.currency_code] -= balances[account.id]
+        else:
+            report.lines.append(_line(account, balances[account.id]))
+    report.retained_earnings = dict(retained)
+    return report
+
+
+async def profit_and_loss(
+    session: AsyncSession, company_id: int, start: date, end: date
+) -> ProfitAndLoss:
+    if end < start:
+        raise ValueError(f"Report end {end} is before its start {start}")
+    accounts = await _company_accounts(session, company_id, PROFIT_AND_LOSS_TYPES)
+    ids = [a.id for a in accounts]
+    closing = await balances_as_of(session, ids, end)
+    opening = await balances_as_of(session, ids, start - timedelta(days=1))
+    return ProfitAndLoss(
+        lines=[_line(a, closing[a.id] - opening[a.id]) for a in accounts],
+        start=start,
+        end=end,
+    )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Backfill currency rate snapshots into currency_rate.
+
+Without ``--start`` the latest snapshot is fetched for each ``--base``; with
+``--start``/``--end`` one dated snapshot per base per day is fetched (requires
+``ERAPI_API_KEY_FILE`` or ``ERAPI_API_KEY``).
+
+Usage:
+    python -m pyledger.scripts.backfill_rates --start 2025-01-01 --end 2025-12-31
+    python -m pyledger.scripts.backfill_rates --base USD --base EUR
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from pyledger.db import get_engine, get_engine_manager
+from pyledger.http import close_http_client
+from pyledger.models.currency_rate import RATE_BASE
+from pyledger.models.rate_backfill import (
+    RateBackfill,
+    SnapshotRequest,
+    daily_requests,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(args: argparse.Namespace) -> int:
+    bases = args.base or [RATE_BASE]
+    if args.start:
+        requests = daily_requests(args.start, args.end or date.today(), bases)
+    else:
+        requests = (SnapshotRequest(base=base) for base in bases)
+    runner = RateBackfill(concurrency=args.concurrency, retries=args.retries)
+    engine = get_engine()
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            result = await runner.run(session, requests)
+    finally:
+        await close_http_client()
+        await get_engine_manager().dispose_all()
+    for request, err in result.failed.items():
+        logger.error("Failed: %s (%s)", request, err)
+    return 1 if result.failed else 0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Backfill currency rate snapshots")
+    p.add_argument("--start", type=date.fromisoformat, help="First day (ISO date)")
+    p.add_argument("--end", type=date.fromisoformat, help="Last day (default today)")
+    p.add_argument(
+        "--base",
+        action="append",
+        help=f"Base currency (repeatable, default {RATE_BASE})",
+    )
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--retries", type=int, default=3)
+    args = p.parse_args()
+    raise SystemExit(asyncio.run(backfill(args)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,20 +1,38 @@
-"""Create company and user tables using SQLAlchemy models.
+"""Create (or migrate) the tables in the common DB.
+
+This is the explicit full schema path: it applies any pending migrations, which
+for a fresh database creates every table. The app itself only checks the stored
+schema version at startup (see ``pyledger.migrations.prepare_schema``).
 
 Usage:
     python -m pyledger.scripts.create_company_user_tables
 """
 import asyncio
+import logging
 
-from sqlalchemy.ext.asyncio import AsyncEngine
+from pyledger.db import get_engine_manager
+from pyledger.migrations import migrate_database
+from pyledger.tenancy import DEFAULT_TENANT
 
-from pyledger.db import get_engine
-from pyledger.models import Base
+logger = logging.getLogger(__name__)
 
 
 async def main() -> None:
-    engine: AsyncEngine = get_engine()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    manager = get_engine_manager()
+    try:
+        result = await migrate_database(DEFAULT_TENANT, manager)
+    finally:
+        await manager.dispose_all()
+    if result.error is not None:
+        raise SystemExit(f"Schema creation failed: {result.error}")
+    logger.info(
+        "Schema %s (version %s -> %s) in %.1f ms",
+        result.status,
+        result.current,
+        result.target,
+        result.duration * 1000,
+    )
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
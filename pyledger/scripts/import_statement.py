@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Import a bank/card statement (CSV or OFX) into an account, streaming the file.
+
+The format is taken from the file extension unless ``--format`` is given.
+Progress is logged after every batch; the JSON result (inserted, skipped,
+batches) is printed at the end. Re-running an import skips the lines already
+stored.
+
+Usage:
+    python -m pyledger.scripts.import_statement statement.csv --account-id 3
+    python -m pyledger.scripts.import_statement march.ofx --account-id 3 --tenant acme
+    python -m pyledger.scripts.import_statement export.csv --account-id 3 \\
+        --columns Date,Amount,Payee --date-format %d/%m/%Y --delimiter ";"
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from pyledger.bank_import import (
+    IMPORT_BATCH_SIZE,
+    CsvFormat,
+    ImportResult,
+    StatementError,
+    import_statement,
+    parse_csv,
+    parse_ofx,
+)
+from pyledger.db import get_engine_manager, lookup_tenant
+from pyledger.tenancy import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+
+def csv_format(args: argparse.Namespace) -> CsvFormat:
+    names = args.columns.split(",")
+    if len(names) not in (3, 4):
+        raise SystemExit("--columns takes date,amount,description[,id]")
+    return CsvFormat(
+        date=names[0],
+        amount=names[1],
+        description=names[2],
+        fit_id=names[3] if len(names) == 4 else None,
+        date_format=args.date_format,
+        delimiter=args.delimiter,
+    )
+
+
+async def run(args: argparse.Namespace) -> int:
+    path = Path(args.path)
+    kind = args.format or path.suffix.lstrip(".").lower()
+    if kind not in ("csv", "ofx", "qfx"):
+        logger.error("Unknown statement format %r; pass --format", kind)
+        return 1
+    manager = get_engine_manager()
+    started = time.perf_counter()
+
+    def progress(result: ImportResult) -> None:
+        logger.info(
+            "%d lines (%d new) in %.1fs",
+            result.total,
+            result.inserted,
+            time.perf_counter() - started,
+        )
+
+    try:
+        tenant = DEFAULT_TENANT
+        if args.tenant != DEFAULT_TENANT.id:
+            found = await lookup_tenant(args.tenant)
+            if found is None:
+                logger.error("Unknown or inactive tenant %r", args.tenant)
+                return 1
+            tenant = found
+        with open(path, newline="", encoding=args.encoding) as f:
+            lines = parse_csv(f, csv_format(args)) if kind == "csv" else parse_ofx(f)
+            async with manager.get_sessionmaker(tenant)() as session:
+                result = await import_statement(
+                    session,
+                    args.account_id,
+                    lines,
+                    batch_size=args.batch_size,
+                    on_progress=progress,
+                )
+    except StatementError as e:
+        logger.error("Import failed: %s", e)
+        return 1
+    finally:
+        await manager.dispose_all()
+    sys.stdout.write(json.dumps(asdict(result), indent=2) + "\n")
+    return 0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Import a CSV/OFX statement")
+    p.add_argument("path")
+    p.add_argument("--account-id", type=int, required=True)
+    p.add_argument("--tenant", default=DEFAULT_TENANT.id)
+    p.add_argument("--format", choices=("csv", "ofx"))
+    p.add_argument("--encoding", default="utf-8-sig")
+    p.add_argument("--columns", default="date,amount,description")
+    p.add_argument("--date-format", default="%Y-%m-%d")
+    p.add_argument("--delimiter", default=",")
+    p.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = p.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Fold pending journal balance deltas into the materialized account balances.
+
+Merges the common DB and every active tenant DB once, or repeatedly every
+``--interval`` seconds. Postings never wait for this: balance reads add the
+deltas not merged yet, so the interval only bounds how many that is.
+
+Usage:
+    python -m pyledger.scripts.merge_balances
+    python -m pyledger.scripts.merge_balances --interval 5
+"""
+import argparse
+import asyncio
+import logging
+
+from pyledger.db import get_engine_manager, list_tenants
+from pyledger.journal import MERGE_BATCH_SIZE, merge_balance_deltas
+from pyledger.tenancy import DEFAULT_TENANT, Tenant
+
+logger = logging.getLogger(__name__)
+
+
+async def merge_once(batch_size: int) -> int:
+    manager = get_engine_manager()
+    databases: dict[str, Tenant] = {"": DEFAULT_TENANT}
+    for tenant in await list_tenants():
+        databases.setdefault(tenant.db_name or "", tenant)
+    merged = 0
+    for tenant in databases.values():
+        try:
+            async with manager.get_sessionmaker(tenant)() as session:
+                merged += await merge_balance_deltas(session, batch_size)
+        except Exception:
+            logger.exception("Merging balances failed for tenant %r", tenant.id)
+    return merged
+
+
+async def run(args: argparse.Namespace) -> int:
+    try:
+        while True:
+            merged = await merge_once(args.batch_size)
+            logger.info("Merged %d balance deltas", merged)
+            if not args.interval:
+                return 0
+            await asyncio.sleep(args.interval)
+    finally:
+        await get_engine_manager().dispose_all()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Merge pending account balance deltas")
+    p.add_argument(
+        "--interval", type=float, default=0, help="Repeat every N seconds (0: once)"
+    )
+    p.add_argument("--batch-size", type=int, default=MERGE_BATCH_SIZE)
+    args = p.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
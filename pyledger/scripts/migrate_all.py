@@ -1,18 +1,65 @@
 #!/usr/bin/env python3
-"""Stub: iterate configured tenants and run migrations (placeholder)."""
+"""Migrate the common DB, then every active tenant DB concurrently.
 
-def main() -> None:
-    # TODO: load tenant list from config or common DB
-    tenants = ["example_tenant"]
-    import logging
+Tenants already at the target schema version are skipped after a single version
+query. A JSON summary (counts, slowest tenants, errors) is written to stdout or
+``--summary``; the exit status is 1 if any tenant failed.
 
-    logger = logging.getLogger(__name__)
-    for t in tenants:
-        logger.info("STUB: migrate tenant %s", t)
+Usage:
+    python -m pyledger.scripts.migrate_all --concurrency 16
+    python -m pyledger.scripts.migrate_all --summary migrate-summary.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
 
+from pyledger.db import get_engine_manager, list_tenants
+from pyledger.migrations import TARGET_VERSION, migrate_all, migrate_database
+from pyledger.tenancy import DEFAULT_TENANT, Tenant
+
+logger = logging.getLogger(__name__)
+
+
+async def run(args: argparse.Namespace) -> int:
+    manager = get_engine_manager()
+    try:
+        # The tenant registry lives in the common DB, so it goes first
+        common = await migrate_database(DEFAULT_TENANT, manager, args.target)
+        if common.error is not None:
+            logger.error("Common DB migration failed: %s", common.error)
+            sys.stdout.write(json.dumps(common.to_dict(), indent=2) + "\n")
+            return 1
+        tenants: dict[str, Tenant] = {}
+        for tenant in await list_tenants():
+            # Several registry entries may share a database; migrate it once
+            tenants.setdefault(tenant.db_name or "", tenant)
+        tenants.pop("", None)
+        summary = await migrate_all(
+            tenants.values(), args.concurrency, manager, args.target
+        )
+    finally:
+        await manager.dispose_all()
+    report = {"common": common.to_dict(), **summary.to_dict(args.slowest)}
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    return 1 if summary.failed else 0
 
-if __name__ == "__main__":
-    import logging
 
+def main() -> None:
+    p = argparse.ArgumentParser(description="Migrate the common and all tenant DBs")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--target", type=int, default=TARGET_VERSION)
+    p.add_argument("--slowest", type=int, default=10, help="Slowest tenants to list")
+    p.add_argument("--summary", help="Write the JSON summary here instead of stdout")
+    args = p.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     main()
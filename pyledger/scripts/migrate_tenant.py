@@ -1,18 +1,51 @@
 #!/usr/bin/env python3
-"""Stub: run migrations for a single tenant (placeholder)."""
+"""Run migrations for a single tenant (or the common DB with ``default``).
 
+Prints the tenant's JSON result (current/target version, applied migrations,
+duration, error); the exit status is 1 on failure.
+
+Usage:
+    python -m pyledger.scripts.migrate_tenant acme
+"""
 import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from pyledger.db import get_engine_manager, lookup_tenant
+from pyledger.migrations import TARGET_VERSION, migrate_database
+from pyledger.tenancy import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+
+async def run(args: argparse.Namespace) -> int:
+    manager = get_engine_manager()
+    try:
+        if args.name == DEFAULT_TENANT.id:
+            tenant = DEFAULT_TENANT
+        else:
+            found = await lookup_tenant(args.name)
+            if found is None:
+                logger.error("Unknown or inactive tenant %r", args.name)
+                return 1
+            tenant = found
+        result = await migrate_database(tenant, manager, args.target)
+    finally:
+        await manager.dispose_all()
+    sys.stdout.write(json.dumps(result.to_dict(), indent=2) + "\n")
+    return 1 if result.error is not None else 0
 
 
 def main() -> None:
-    p = argparse.ArgumentParser(description="Run migrations for a tenant (placeholder)")
-    p.add_argument("name", help="Tenant name")
+    p = argparse.ArgumentParser(description="Run migrations for a tenant")
+    p.add_argument("name", help="Tenant slug (`default` for the common DB)")
+    p.add_argument("--target", type=int, default=TARGET_VERSION)
     args = p.parse_args()
-    import logging
-
-    logger = logging.getLogger(__name__)
-    logger.info("STUB: migrate tenant %s", args.name)
+    raise SystemExit(asyncio.run(run(args)))
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
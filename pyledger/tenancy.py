@@ -1,26 +1,46 @@
 """Tenancy primitives and middleware (single-tenant default).
 
-For now we provide a `SingleTenantResolver` that always returns a default tenant.
-Later we'll add SubdomainResolver and an EngineManager that maps tenant -> engine.
+`SingleTenantResolver` always returns a default tenant. `SubdomainResolver` and
+`HeaderResolver` map a request to a tenant registered in the common DB; their
+lookups go through a `TenantCache` (TTL, negative caching, single-flight) so the
+common DB is only hit on a miss. The `EngineManager` in `pyledger.db` maps each
+resolved tenant to its own engine.
 """
+import os
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 
-from fastapi import Request
+from fastapi import HTTPException, Request
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper
 
+from .cache import SingleFlightCache
+from .models.tenant import TenantRecord
 
-@dataclass
+
+@dataclass(frozen=True)
 class Tenant:
     id: str
+    # Database on the configured server; None means the default DB_NAME
     db_name: Optional[str] = None
 
 
+DEFAULT_TENANT = Tenant(id="default")
+
+TenantLookup = Callable[[str], Awaitable[Optional[Tenant]]]
+
+
 class TenantResolver:
     """Interface/protocol for tenant resolution."""
 
     async def resolve(self, request: Request) -> Tenant:
         raise NotImplementedError
 
+    def invalidate(self, key: str | None = None) -> None:
+        """Forget cached resolutions for ``key`` (or all keys)."""
+
 
 class SingleTenantResolver(TenantResolver):
     """Simple resolver for single-tenant mode.
@@ -29,17 +49,147 @@ class SingleTenantResolver(TenantResolver):
     """
 
     def __init__(self, tenant_id: str = "default"):
-        self.tenant_id = tenant_id
+        self.tenant = Tenant(id=tenant_id)
 
     async def resolve(self, request: Request) -> Tenant:
-        # Future: inspect subdomain/header/path to map to tenant
-        return Tenant(id=self.tenant_id)
+        return self.tenant
+
+
+class TenantCache(SingleFlightCache[str, Optional[Tenant]]):
+    """
+    Async TTL cache for tenant lookups (see ``SingleFlightCache``).
+
+    Misses (unknown keys) are cached for ``negative_ttl``. A lookup that
+    overlaps an invalidation is not cached, so a tenant added or renamed
+    meanwhile is not hidden until the entry expires.
+    """
+
+    def __init__(
+        self,
+        lookup: TenantLookup,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        max_size: int = 10_000,
+    ) -> None:
+        super().__init__(ttl, negative_ttl, max_size)
+        self.lookup = lookup
+
+    async def get(self, key: str) -> Optional[Tenant]:
+        return await self.get_or_load(key, lambda: self.lookup(key))
+
+    def invalidate(self, key: str | None = None) -> None:
+        if key is None:
+            self.clear()
+        else:
+            self.discard(key)
+
+
+class CachedTenantResolver(TenantResolver, ABC):
+    """Base for resolvers that map a request key to a tenant via a lookup."""
+
+    def __init__(self, lookup: TenantLookup, **cache_options: Any) -> None:
+        self.cache = TenantCache(lookup, **cache_options)
+
+    @abstractmethod
+    def key_for(self, request: Request) -> str | None:
+        """Extract the (lower-case) tenant key from the request."""
+
+    async def resolve(self, request: Request) -> Tenant:
+        key = self.key_for(request)
+        if not key:
+            raise HTTPException(status_code=400, detail="Tenant not specified")
+        tenant = await self.cache.get(key)
+        if tenant is None:
+            raise HTTPException(status_code=404, detail="Unknown tenant")
+        return tenant
+
+    def invalidate(self, key: str | None = None) -> None:
+        self.cache.invalidate(key.lower() if key else None)
+
+
+class SubdomainResolver(CachedTenantResolver):
+    """Resolve `<tenant>.<base_domain>` hosts (the label left of base_domain)."""
+
+    def __init__(self, base_domain: str, lookup: TenantLookup, **cache_options: Any):
+        super().__init__(lookup, **cache_options)
+        self.suffix = "." + base_domain.lower().strip(".")
+
+    def key_for(self, request: Request) -> str | None:
+        host = request.headers.get("host", "").split(":", 1)[0].lower()
+        if not host.endswith(self.suffix):
+            return None
+        return host[: -len(self.suffix)].rsplit(".", 1)[-1] or None
+
+
+class HeaderResolver(CachedTenantResolver):
+    """Resolve the tenant from a request header (default `X-Tenant`)."""
+
+    def __init__(
+        self, lookup: TenantLookup, header: str = "X-Tenant", **cache_options: Any
+    ):
+        super().__init__(lookup, **cache_options)
+        self.header = header
+
+    def key_for(self, request: Request) -> str | None:
+        value = request.headers.get(self.header)
+        return value.strip().lower() if value else None
+
+
+_resolver: TenantResolver = SingleTenantResolver()
+
+
+def get_tenant_resolver() -> TenantResolver:
+    return _resolver
+
+
+def set_tenant_resolver(resolver: TenantResolver) -> None:
+    global _resolver
+    _resolver = resolver
+
+
+def resolver_from_env(lookup: TenantLookup) -> TenantResolver:
+    """
+    Build the resolver selected by `TENANT_RESOLVER` (`single`, `subdomain` or
+    `header`), configured by `TENANT_BASE_DOMAIN`, `TENANT_HEADER`,
+    `TENANT_CACHE_TTL` and `TENANT_NEGATIVE_CACHE_TTL`.
+    """
+    kind = os.getenv("TENANT_RESOLVER", "single").lower()
+    cache_options = {
+        "ttl": float(os.getenv("TENANT_CACHE_TTL", "300")),
+        "negative_ttl": float(os.getenv("TENANT_NEGATIVE_CACHE_TTL", "30")),
+    }
+    if kind == "subdomain":
+        base_domain = os.getenv("TENANT_BASE_DOMAIN")
+        if not base_domain:
+            raise ValueError("TENANT_RESOLVER=subdomain requires TENANT_BASE_DOMAIN")
+        return SubdomainResolver(base_domain, lookup, **cache_options)
+    if kind == "header":
+        header = os.getenv("TENANT_HEADER", "X-Tenant")
+        return HeaderResolver(lookup, header=header, **cache_options)
+    if kind == "single":
+        return SingleTenantResolver(os.getenv("TENANT_ID", "default"))
+    raise ValueError(f"Unknown TENANT_RESOLVER: {kind!r}")
+
+
+def invalidate_tenant(key: str | None = None) -> None:
+    """Invalidation hook: call when a tenant is added, renamed or removed."""
+    _resolver.invalidate(key)
+
+
+@event.listens_for(TenantRecord, "after_insert")
+@event.listens_for(TenantRecord, "after_update")
+@event.listens_for(TenantRecord, "after_delete")
+def _invalidate_tenant_record(
+    mapper: Mapper[TenantRecord], connection: Connection, target: TenantRecord
+) -> None:
+    # Covers renames too: drop both the previous and the current slug
+    for slug in inspect(target).attrs.slug.history.deleted or ():
+        invalidate_tenant(slug)
+    invalidate_tenant(target.slug)
 
 
 async def get_tenant(request: Request) -> Tenant:
-    # Default resolver instance for now
-    resolver = SingleTenantResolver()
-    tenant = await resolver.resolve(request)
+    tenant = await _resolver.resolve(request)
     # Attach to request.state for handlers/middleware that need it
     request.state.tenant = tenant
     return tenant
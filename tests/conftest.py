@@ -1,8 +1,56 @@
 import logging
+from typing import AsyncGenerator, Awaitable, Callable, ContextManager, Iterator
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from pyledger import query_stats
+from pyledger.models import Base, CurrencyRate
+from pyledger.models.rate_cache import RateCache
 
 # Set up basic logging configuration for all tests
 logging.basicConfig(
     level=logging.DEBUG, 
     format="%(levelname)s %(name)s %(message)s",
     force=True
-)
\ No newline at end of file
+)
+
+
+@pytest.fixture
+async def async_session() -> AsyncGenerator[AsyncSession, None]:
+    """AsyncSession bound to a fresh in-memory SQLite database with all tables."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], ContextManager[query_stats.QueryStats]]:
+    """
+    ``with query_budget(3): ...`` fails the test if the block (e.g. an endpoint
+    call through ``ASGITransport``) executes more than 3 SQL statements.
+    """
+    return query_stats.query_budget
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_cache() -> Iterator[RateCache]:
+    """An empty ``CurrencyRate.RATE_CACHE`` for each test, restored afterwards."""
+    original = CurrencyRate.RATE_CACHE
+    CurrencyRate.RATE_CACHE = RateCache()
+    yield CurrencyRate.RATE_CACHE
+    CurrencyRate.RATE_CACHE = original
+
+
+@pytest.fixture
+def count_rows() -> Callable[[AsyncSession], Awaitable[int]]:
+    """``await count_rows(session)``: the number of ``currency_rate`` rows."""
+
+    async def count(session: AsyncSession) -> int:
+        return (await session.execute(select(func.count(CurrencyRate.id)))).scalar_one()
+
+    return count
@@ -0,0 +1,214 @@
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Iterable, Iterator
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.bank_import import (
+    CsvFormat,
+    ImportResult,
+    StatementError,
+    StatementLine,
+    import_statement,
+    parse_csv,
+    parse_ofx,
+)
+from pyledger.models import Account, BankTransaction, Company
+from pyledger.models.account import AccountKind, AccountType
+
+CSV = """\
+date,amount,description
+2026-01-02,-4.50,Coffee
+2026-01-02,-4.50,Coffee
+2026-01-03,1000,Payroll
+2026-01-04,"-1,5",Fee
+"""
+
+OFX_SGML = """\
+OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260105120000[-5:EST]
+<TRNAMT>-12.34
+<FITID>A1
+<NAME>Hardware &amp; Co
+<MEMO>Screws
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260106<TRNAMT>50,00<FITID>A2<NAME>Refund
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+OFX_XML = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<?OFX OFXHEADER="200" VERSION="220"?>
+<OFX><BANKTRANLIST>
+  <STMTTRN><DTPOSTED>20260107</DTPOSTED><TRNAMT>-1.00</TRNAMT>
+    <FITID>B1</FITID><NAME>Bus</NAME><MEMO>Bus</MEMO></STMTTRN>
+</BANKTRANLIST></OFX>
+"""
+
+
+def chunks(text: str, size: int) -> Iterator[str]:
+    return (text[i : i + size] for i in range(0, len(text), size))
+
+
+def statement(days: int, per_day: int = 3) -> list[StatementLine]:
+    return [
+        StatementLine(date(2026, 1, 1 + d), Decimal(f"-{i + 1}.00"), f"Shop {i}")
+        for d in range(days)
+        for i in range(per_day)
+    ]
+
+
+async def make_account(session: AsyncSession) -> int:
+    company = Company(name="Acme")
+    session.add(company)
+    await session.flush()
+    account = Account(
+        company_id=company.id,
+        name="Checking",
+        type=AccountType.ASSET,
+        kind=AccountKind.BANK,
+        currency_code="USD",
+    )
+    session.add(account)
+    await session.commit()
+    return account.id
+
+
+async def stored(session: AsyncSession) -> int:
+    return (
+        await session.execute(select(func.count(BankTransaction.id)))
+    ).scalar_one()
+
+
+def test_parse_csv() -> None:
+    lines = list(parse_csv(CSV.replace('"-1,5"', "-1.5").splitlines()))
+    assert lines[0] == StatementLine(date(2026, 1, 2), Decimal("-4.5"), "Coffee")
+    assert [line.amount for line in lines] == [
+        Decimal("-4.50"),
+        Decimal("-4.50"),
+        Decimal(1000),
+        Decimal("-1.50"),
+    ]
+
+    fmt = CsvFormat(
+        date="Date",
+        amount="Amt",
+        description="Payee",
+        fit_id="Id",
+        date_format="%d/%m/%Y",
+        delimiter=";",
+    )
+    text = "Date;Amt;Payee;Id\n31/01/2026;12.5;Shop;X9\n"
+    assert list(parse_csv(text.splitlines(), fmt)) == [
+        StatementLine(date(2026, 1, 31), Decimal("12.5"), "Shop", "X9")
+    ]
+
+    with pytest.raises(StatementError, match="Line 5: Invalid amount"):
+        list(parse_csv(CSV.splitlines()))
+    with pytest.raises(StatementError, match="missing column 'amount'"):
+        list(parse_csv(["date,value", "2026-01-01,1"]))
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_parse_ofx(size: int) -> None:
+    hardware = "Hardware & Co Screws"
+    assert list(parse_ofx(chunks(OFX_SGML, size))) == [
+        StatementLine(date(2026, 1, 5), Decimal("-12.34"), hardware, "A1"),
+        StatementLine(date(2026, 1, 6), Decimal("50.00"), "Refund", "A2"),
+    ]
+    assert list(parse_ofx(chunks(OFX_XML, size))) == [
+        StatementLine(date(2026, 1, 7), Decimal("-1.00"), "Bus", "B1"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_deduplicates(async_session: AsyncSession) -> None:
+    account_id = await make_account(async_session)
+    csv_lines = CSV.replace('"-1,5"', "-1.5").splitlines()
+
+    first = await import_statement(async_session, account_id, parse_csv(csv_lines))
+    assert (first.inserted, first.skipped) == (4, 0)
+    # Both identical coffees are kept, and found again on re-import
+    again = await import_statement(async_session, account_id, parse_csv(csv_lines))
+    assert (again.inserted, again.skipped) == (0, 4)
+
+    ofx = await import_statement(async_session, account_id, parse_ofx([OFX_SGML]))
+    assert ofx.inserted == 2
+    assert await stored(async_session) == 6
+
+    # A later statement overlapping the first one adds only the new day
+    overlap = csv_lines[:3] + ["2026-01-09,-7,Lunch"]
+    result = await import_statement(async_session, account_id, parse_csv(overlap))
+    assert (result.inserted, result.skipped) == (1, 2)
+
+    with pytest.raises(StatementError, match="does not exist"):
+        await import_statement(async_session, 999, [])
+
+
+@pytest.mark.asyncio
+async def test_import_batches_with_backpressure(async_session: AsyncSession) -> None:
+    account_id = await make_account(async_session)
+    consumed = 0
+    max_ahead = 0
+    progress: list[int] = []
+
+    def tracked(lines: Iterable[StatementLine]) -> Iterator[StatementLine]:
+        nonlocal consumed, max_ahead
+        for line in lines:
+            consumed += 1
+            max_ahead = max(max_ahead, consumed - len(progress) * 10)
+            yield line
+
+    def on_progress(result: ImportResult) -> None:
+        progress.append(result.total)
+
+    result = await import_statement(
+        async_session,
+        account_id,
+        tracked(statement(days=20)),
+        batch_size=10,
+        queue_size=1,
+        on_progress=on_progress,
+    )
+    assert (result.inserted, result.batches) == (60, 6)
+    assert progress == [10, 20, 30, 40, 50, 60]
+    # The parser never ran more than a few batches ahead of the writer
+    assert max_ahead <= 3 * 10 + 1
+
+    async def async_lines() -> AsyncIterator[StatementLine]:
+        for line in statement(days=25):
+            yield line
+
+    result = await import_statement(
+        async_session, account_id, async_lines(), batch_size=7
+    )
+    assert (result.inserted, result.skipped) == (15, 60)
+
+
+@pytest.mark.asyncio
+async def test_parse_error_keeps_committed_batches(
+    async_session: AsyncSession,
+) -> None:
+    account_id = await make_account(async_session)
+    good = "\n".join(f"2026-02-{d:02d},-{d},Item" for d in range(1, 21))
+    text = f"date,amount,description\n{good}\n2026-02-21,oops,Broken\n"
+
+    with pytest.raises(StatementError, match="Line 22"):
+        await import_statement(
+            async_session, account_id, parse_csv(text.splitlines()), batch_size=5
+        )
+    assert await stored(async_session) == 20
+
+    fixed = text.replace("oops", "-21")
+    result = await import_statement(
+        async_session, account_id, parse_csv(fixed.splitlines()), batch_size=5
+    )
+    assert (result.inserted, result.skipped) == (1, 20)
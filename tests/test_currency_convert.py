@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from pyledger.models.currency_convert import RateTable, to_epoch_array
+from pyledger.models.rate_cache import RateHistory
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def table() -> RateTable:
+    days = [T0 + timedelta(days=d) for d in range(3)]
+    return RateTable(
+        {
+            "EUR": RateHistory(zip(days, [0.90, 0.92, 0.94], strict=True)),
+            "CAD": RateHistory(zip(days, [1.30, 1.32, 1.34], strict=True)),
+            "JPY": RateHistory(),
+        }
+    )
+
+
+def at(*offsets_hours: float) -> np.ndarray:
+    base = np.datetime64(T0.replace(tzinfo=None), "s")
+    return base + (np.array(offsets_hours) * 3600).astype("timedelta64[s]")
+
+
+def test_to_epoch_array_accepts_datetime64_and_seconds() -> None:
+    expected = T0.timestamp()
+    assert to_epoch_array(at(0))[0] == expected
+    assert to_epoch_array([expected])[0] == expected
+
+
+def test_rates_at_matches_rate_history(table: RateTable) -> None:
+    rates = table.rates_at(
+        ["EUR", "EUR", "CAD", "CAD", "USD", "JPY", "XXX"],
+        at(0, 30, 23.5, 1000, -50, 10, 10),
+    )
+    np.testing.assert_allclose(
+        rates, [0.90, 0.92, 1.30, 1.34, 1.0, np.nan, np.nan]
+    )
+
+
+def test_rates_before_first_point_are_nan(table: RateTable) -> None:
+    rates = table.rates_at(["EUR", "CAD"], at(-1, -1))
+    assert np.isnan(rates).all()
+
+
+def test_convert_cross_currency(table: RateTable) -> None:
+    out = table.convert(
+        amounts=[100.0, 100.0, 100.0, 100.0],
+        source_codes=["EUR", "USD", "CAD", "EUR"],
+        target_codes=["CAD", "EUR", "CAD", "XXX"],
+        at=at(25, 25, 25, 25),
+    )
+    np.testing.assert_allclose(
+        out, [100 * 1.32 / 0.92, 92.0, 100.0, np.nan]
+    )
+
+
+def test_convert_large_batch_matches_scalar_lookup(table: RateTable) -> None:
+    rng = np.random.default_rng(0)
+    n = 10_000
+    codes = np.array(["EUR", "CAD", "USD"])
+    src = codes[rng.integers(0, 3, n)]
+    tgt = codes[rng.integers(0, 3, n)]
+    hours = rng.uniform(0, 72, n)
+    out = table.convert(np.ones(n), src, tgt, at(*hours))
+    histories = {
+        "EUR": [0.90, 0.92, 0.94],
+        "CAD": [1.30, 1.32, 1.34],
+        "USD": [1.0, 1.0, 1.0],
+    }
+    day = (hours // 24).astype(int)
+    expected = [
+        histories[t][d] / histories[s][d] for s, t, d in zip(src, tgt, day, strict=True)
+    ]
+    np.testing.assert_allclose(out, expected)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Awaitable, Callable
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.models import CurrencyRate
+from pyledger.models.rate_cache import RateCache
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+CountRows = Callable[[AsyncSession], Awaitable[int]]
+
+
+def snapshot(day: int, codes: tuple[str, ...] = ("EUR", "CAD")) -> list[CurrencyRate]:
+    return [
+        CurrencyRate(
+            currency_code=code,
+            rate_vs_usd=1.0 + day / 100,
+            timestamp=T0 + timedelta(days=day),
+        )
+        for code in codes
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ingest_skips_duplicates(
+    async_session: AsyncSession, count_rows: CountRows
+) -> None:
+    first = await CurrencyRate.ingest(async_session, snapshot(0) + snapshot(1))
+    assert (first.inserted, first.skipped) == (4, 0)
+
+    second = await CurrencyRate.ingest(async_session, snapshot(1) + snapshot(2))
+    assert (second.inserted, second.skipped) == (2, 2)
+    assert second.total == 4
+    assert await count_rows(async_session) == 6
+
+
+@pytest.mark.asyncio
+async def test_ingest_batches_async_iterable(
+    async_session: AsyncSession, count_rows: CountRows
+) -> None:
+    async def backfill() -> AsyncGenerator[CurrencyRate, None]:
+        for day in range(25):
+            for rate in snapshot(day):
+                yield rate
+
+    result = await CurrencyRate.ingest(async_session, backfill(), batch_size=7)
+    assert (result.inserted, result.skipped) == (50, 0)
+    assert await count_rows(async_session) == 50
+
+
+@pytest.mark.asyncio
+async def test_ingest_merges_into_loaded_cache(
+    async_session: AsyncSession, fresh_rate_cache: RateCache
+) -> None:
+    await CurrencyRate.ingest(async_session, snapshot(0))
+    assert await CurrencyRate.rate_at_async(async_session, "EUR") == 1.0
+    await CurrencyRate.ingest(async_session, snapshot(3))
+    assert (CurrencyRate.database_key(async_session), "EUR") in fresh_rate_cache
+    assert await CurrencyRate.rate_at_async(async_session, "EUR") == 1.03
+
+
+def test_ingest_statement_rejects_unknown_dialect() -> None:
+    with pytest.raises(NotImplementedError):
+        CurrencyRate.ingest_statement("mssql")
@@ -1,5 +1,6 @@
 import json
 import os
+from datetime import date
 from typing import Optional, AsyncGenerator
 
 import httpx
@@ -35,7 +36,12 @@ async def test_erapi_iter_rates_with_fixture(erapi_fixture: dict) -> None:
 
     class MockERAPI(ERAPI):
         @classmethod
-        async def make_request(cls, base: str = "USD") -> "ERAPI":
+        async def make_request(
+            cls,
+            base: str = "USD",
+            on: Optional[date] = None,
+            client: Optional[httpx.AsyncClient] = None,
+        ) -> "ERAPI":
             # Use the fixture only if base is USD, else fallback to real request
             if base == "USD":
                 return cls.model_validate(erapi_fixture)
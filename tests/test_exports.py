@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date
+from pathlib import Path
+from typing import AsyncGenerator, AsyncIterator
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.types import Message
+
+from pyledger import permissions
+from pyledger.api.exports import router
+from pyledger.api.streaming import ExportFormat, ExportResponse, stream_rows
+from pyledger.db import get_session
+from pyledger.journal import post_entry
+from pyledger.models import Account, Base, Company, User, UserPermission
+from pyledger.models.account import AccountType
+from pyledger.models.user_permission import Permission
+
+
+async def seed_journal(session: AsyncSession, entries: int) -> tuple[int, int]:
+    user = User(username="u", email="u@example.com", password_hash="x")
+    company = Company(name="Acme")
+    session.add_all([user, company])
+    await session.flush()
+    bank, sales = (
+        Account(company_id=company.id, name=n, type=t, currency_code="EUR")
+        for n, t in (("Bank", AccountType.ASSET), ("Sales", AccountType.INCOME))
+    )
+    session.add_all([bank, sales])
+    await session.flush()
+    for i in range(entries):
+        await post_entry(
+            session,
+            company.id,
+            [(bank.id, i + 1), (sales.id, -(i + 1))],
+            effective_date=date(2026, 1 + i % 12, 1),
+            description=f"Sale, #{i}",
+        )
+    await session.commit()
+    return user.id, company.id
+
+
+def export_app(session: AsyncSession) -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def authenticate(request: Request, call_next):  # type: ignore[no-untyped-def]
+        if "x-user" in request.headers:
+            request.state.user_id = int(request.headers["x-user"])
+        response: Response = await call_next(request)
+        return response
+
+    async def session_override() -> AsyncGenerator[AsyncSession, None]:
+        yield session
+
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_session] = session_override
+    return app
+
+
+@pytest.mark.asyncio
+async def test_export_journal(
+    async_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(permissions, "_cache", None)
+    user_id, company_id = await seed_journal(async_session, 30)
+    url = f"/api/companies/{company_id}/journal/export"
+    headers = {"x-user": str(user_id)}
+    transport = ASGITransport(app=export_app(async_session))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get(url, headers=headers)).status_code == 403
+        async_session.add(
+            UserPermission(
+                user_id=user_id, company_id=company_id, permission=Permission(4)
+            )
+        )
+        await async_session.commit()
+
+        r = await ac.get(url, headers=headers)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "text/csv; charset=utf-8"
+        assert 'filename="journal-' in r.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(r.text)))
+        assert len(rows) == 60
+        assert rows[0]["description"] == "Sale, #0"
+        assert [row["effective_date"] for row in rows] == sorted(
+            row["effective_date"] for row in rows
+        )
+
+        r = await ac.get(
+            url,
+            headers=headers,
+            params={"format": "ndjson", "start": "2026-03-01", "end": "2026-03-31"},
+        )
+        assert r.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert len(lines) == 6
+        assert {line["effective_date"] for line in lines} == {"2026-03-01"}
+        assert lines[0]["account"] == "Bank" and lines[0]["amount"] == "3.0000"
+        assert rows[0]["amount"] == "1.0000"
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_in_batches(async_session: AsyncSession) -> None:
+    await seed_journal(async_session, 0)
+    numbers = select(func.count(Account.id).label("n"), literal("x").label("s"))
+    chunks = [c async for c in stream_rows(async_session, numbers, ExportFormat.CSV)]
+    assert chunks == [b"n,s\r\n", b"2,x\r\n"]
+
+    await async_session.execute(
+        insert(Company), [{"name": f"C{i}"} for i in range(95)]
+    )
+    stmt = select(Company.id, Company.name).order_by(Company.id)
+    chunks = [
+        c
+        async for c in stream_rows(async_session, stmt, ExportFormat.NDJSON, 10)
+    ]
+    assert len(chunks) == 10
+    assert sum(chunk.count(b"\n") for chunk in chunks) == 96
+
+
+async def run_until_disconnect(
+    response: ExportResponse, disconnect_after: int
+) -> list[bytes]:
+    """Serve ``response``; the client disconnects after that many chunks."""
+    bodies: list[bytes] = []
+    gone = asyncio.Event()
+
+    async def receive() -> Message:
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            bodies.append(message["body"])
+            if len(bodies) >= disconnect_after:
+                gone.set()
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}, "path": "/export"}
+    await asyncio.wait_for(response(scope, receive, send), timeout=5)
+    return bodies
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_pending_fetch() -> None:
+    closed = asyncio.Event()
+
+    async def slow_query() -> AsyncIterator[bytes]:
+        try:
+            yield b"header\n"
+            await asyncio.sleep(3600)  # a fetch that would take an hour
+            yield b"never\n"
+        finally:
+            closed.set()
+
+    bodies = await run_until_disconnect(ExportResponse(slow_query()), 1)
+    assert bodies == [b"header\n"]
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_streaming(tmp_path: Path) -> None:
+    # A file database: the interrupted connection is discarded
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'export.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Company), [{"name": f"C{i}"} for i in range(1000)])
+    async with async_sessionmaker(engine)() as session:
+        stmt = select(Company.id, Company.name).order_by(Company.id)
+        response = ExportResponse(
+            stream_rows(session, stmt, ExportFormat.CSV, batch_size=10)
+        )
+        bodies = await run_until_disconnect(response, 3)
+        assert 3 <= len(bodies) < 20
+    # The pool replaced the discarded connection
+    async with async_sessionmaker(engine)() as session:
+        assert await session.scalar(select(func.count(Company.id))) == 1000
+    await engine.dispose()
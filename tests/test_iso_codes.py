@@ -0,0 +1,57 @@
+import pycountry
+import pytest
+from pydantic import ValidationError
+
+from pyledger import iso_codes
+from pyledger.models.address import AddressSchema
+from pyledger.models.company_settings import CompanySettingsSchema
+
+
+@pytest.mark.parametrize(
+    ("index", "database"),
+    [
+        (iso_codes.countries, pycountry.countries),
+        (iso_codes.currencies, pycountry.currencies),
+        (iso_codes.languages, pycountry.languages),
+    ],
+)
+def test_index_accepts_what_pycountry_lookup_accepts(index, database) -> None:  # type: ignore[no-untyped-def]
+    values = {"", "zz", "FAKE", "123", "xx-yy"}
+    # A sample keeps the (linear) pycountry lookups fast for languages
+    records = list(database)
+    for record in records[:: max(1, len(records) // 300)]:
+        for value in record._fields.values():
+            if isinstance(value, str):
+                values.update({value, value.upper(), value.lower()})
+    for value in values:
+        try:
+            database.lookup(value)
+            expected = True
+        except LookupError:
+            expected = False
+        assert (value in index()) is expected, value
+
+
+def test_canonical_codes() -> None:
+    assert iso_codes.countries().canonical("can") == "CA"
+    assert iso_codes.countries().canonical("Canada") == "CA"
+    assert iso_codes.currencies().canonical("usd") == "USD"
+    assert iso_codes.languages().canonical("en") == "eng"
+    assert iso_codes.currencies().canonical("nope") is None
+    assert iso_codes.currencies().canonical(None) is None
+    assert "USD" in iso_codes.currencies().codes
+    assert not iso_codes.is_currency(None)
+
+
+def test_schema_validators_use_index() -> None:
+    assert AddressSchema(country_code="ca").country_code == "ca"
+    settings = CompanySettingsSchema(
+        default_language_code="fr", default_currency_code="eur"
+    )
+    assert settings.default_currency_code == "eur"
+    with pytest.raises(ValidationError, match="Invalid country code"):
+        AddressSchema(country_code="ZZ")
+    with pytest.raises(ValidationError, match="Invalid language code"):
+        CompanySettingsSchema(default_language_code="xx-yy")
+    with pytest.raises(ValidationError, match="Invalid currency code"):
+        CompanySettingsSchema(default_currency_code="FAKE")
@@ -0,0 +1,290 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.journal import (
+    Posting,
+    account_balance,
+    account_balances,
+    balance_as_of,
+    balances_as_of,
+    merge_balance_deltas,
+    post_entry,
+    reverse_entry,
+)
+from pyledger.migrations import _balance_checkpoints
+from pyledger.models import (
+    Account,
+    AccountBalance,
+    BalanceCheckpoint,
+    BalanceDelta,
+    Company,
+    JournalEntry,
+    JournalLine,
+)
+from pyledger.models.account import AccountKind, AccountType
+from pyledger.models.journal import JournalError, UnbalancedEntry, to_amount
+
+
+async def setup_accounts(session: AsyncSession) -> tuple[Company, Account, Account]:
+    company = Company(name="Acme")
+    bank = Account(
+        name="Bank", type=AccountType.ASSET, kind=AccountKind.BANK, currency_code="USD"
+    )
+    sales = Account(name="Sales", type=AccountType.INCOME, currency_code="USD")
+    session.add(company)
+    await session.flush()
+    bank.company_id = sales.company_id = company.id
+    session.add_all([bank, sales])
+    await session.commit()
+    return company, bank, sales
+
+
+async def delta_count(session: AsyncSession) -> int:
+    return (await session.execute(select(func.count(BalanceDelta.id)))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_post_and_read_balances(async_session: AsyncSession) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+    for day, amount in ((date(2026, 1, 5), "100.50"), (date(2026, 2, 1), "20")):
+        await post_entry(
+            async_session,
+            company.id,
+            [Posting(bank.id, amount), (sales.id, f"-{amount}")],
+            effective_date=day,
+            description="Sale",
+        )
+    await async_session.commit()
+
+    assert await account_balance(async_session, bank.id) == Decimal("120.50")
+    assert await account_balances(async_session, [bank.id, sales.id, 999]) == {
+        bank.id: Decimal("120.50"),
+        sales.id: Decimal("-120.50"),
+        999: Decimal(0),
+    }
+    periods = await async_session.execute(
+        select(BalanceDelta.period).where(BalanceDelta.account_id == bank.id)
+    )
+    assert sorted(periods.scalars()) == [date(2026, 1, 1), date(2026, 2, 1)]
+    assert sales.normal_sign == -1 and bank.normal_sign == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_must_balance(async_session: AsyncSession) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+    with pytest.raises(UnbalancedEntry):
+        await post_entry(async_session, company.id, [(bank.id, 10), (sales.id, -9)])
+    with pytest.raises(UnbalancedEntry):
+        await post_entry(async_session, company.id, [(bank.id, 0)])
+    with pytest.raises(JournalError, match="do not exist"):
+        await post_entry(async_session, company.id, [(bank.id, 1), (999, -1)])
+    eur = Account(
+        company_id=company.id, name="EUR", type=AccountType.ASSET, currency_code="EUR"
+    )
+    async_session.add(eur)
+    await async_session.flush()
+    with pytest.raises(JournalError, match="same currency"):
+        await post_entry(async_session, company.id, [(bank.id, 1), (eur.id, -1)])
+    with pytest.raises(ValueError):
+        Account(name="X", type=AccountType.ASSET, currency_code="ZZZ")
+
+    # Checked on flush as well, for entries built directly with the ORM
+    async_session.add(
+        JournalEntry(
+            company_id=company.id,
+            effective_date=date(2026, 1, 1),
+            lines=[JournalLine(account_id=bank.id, amount=5)],
+        )
+    )
+    with pytest.raises(UnbalancedEntry):
+        await async_session.flush()
+
+
+@pytest.mark.asyncio
+async def test_journal_is_append_only(async_session: AsyncSession) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+    entry = await post_entry(async_session, company.id, [(bank.id, 5), (sales.id, -5)])
+    await async_session.commit()
+    entry_id, bank_id, sales_id = entry.id, bank.id, sales.id
+
+    entry.lines[0].amount = Decimal(6)
+    with pytest.raises(JournalError, match="append-only"):
+        await async_session.flush()
+    await async_session.rollback()
+
+    await async_session.delete(entry)
+    with pytest.raises(JournalError, match="append-only"):
+        await async_session.flush()
+    await async_session.rollback()
+
+    async_session.add(JournalLine(entry_id=entry_id, account_id=bank_id, amount=1))
+    with pytest.raises(JournalError):
+        await async_session.flush()
+    await async_session.rollback()
+
+    reversal = await reverse_entry(async_session, entry_id)
+    await async_session.commit()
+    assert reversal.reverses_id == entry_id
+    assert await account_balances(async_session, [bank_id, sales_id]) == {
+        bank_id: 0,
+        sales_id: 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_merge_deltas(async_session: AsyncSession) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+    for i in range(1, 8):
+        await post_entry(
+            async_session,
+            company.id,
+            [(bank.id, i), (sales.id, -i)],
+            effective_date=date(2026, i, 1),
+        )
+    await async_session.commit()
+    assert await delta_count(async_session) == 14
+
+    assert await merge_balance_deltas(async_session, batch_size=4) == 14
+    assert await delta_count(async_session) == 0
+    merged = await async_session.get(AccountBalance, bank.id)
+    assert merged is not None and merged.balance == Decimal(28)
+
+    postings = [(bank.id, "0.25"), (sales.id, "-0.25")]
+    await post_entry(async_session, company.id, postings)
+    await async_session.commit()
+    assert await account_balance(async_session, bank.id) == Decimal("28.25")
+    assert await merge_balance_deltas(async_session) == 2
+    assert await account_balance(async_session, bank.id) == Decimal("28.25")
+    assert await account_balance(async_session, sales.id) == Decimal("-28.25")
+    assert await merge_balance_deltas(async_session) == 0
+
+
+@pytest.mark.asyncio
+async def test_orm_entries_with_new_accounts(async_session: AsyncSession) -> None:
+    company = Company(name="Globex")
+    async_session.add(company)
+    await async_session.flush()
+    cash = Account(name="Cash", type=AccountType.ASSET, currency_code="CAD")
+    equity = Account(name="Equity", type=AccountType.EQUITY, currency_code="CAD")
+    cash.company_id = equity.company_id = company.id
+    async_session.add(
+        JournalEntry(
+            company_id=company.id,
+            effective_date=date(2026, 3, 31),
+            lines=[
+                JournalLine(account=cash, amount=1000),
+                JournalLine(account=equity, amount=-1000),
+            ],
+        )
+    )
+    await async_session.commit()
+    assert await account_balance(async_session, equity.id) == Decimal(-1000)
+
+
+async def brute_force_as_of(
+    session: AsyncSession, account_id: int, day: date
+) -> Decimal:
+    total = await session.scalar(
+        select(func.sum(JournalLine.amount))
+        .join(JournalEntry)
+        .where(JournalLine.account_id == account_id, JournalEntry.effective_date <= day)
+    )
+    return to_amount(total or 0)
+
+
+@pytest.mark.asyncio
+async def test_balances_as_of_with_back_dated_entries(
+    async_session: AsyncSession,
+) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+
+    async def post(day: date, amount: int) -> None:
+        await post_entry(
+            async_session,
+            company.id,
+            [(bank.id, amount), (sales.id, -amount)],
+            effective_date=day,
+        )
+        await async_session.commit()
+
+    await post(date(2026, 1, 10), 10)
+    await post(date(2026, 3, 5), 100)
+    await merge_balance_deltas(async_session)
+    await post(date(2026, 2, 20), 5)  # back-dated, not merged yet
+    assert await balance_as_of(async_session, bank.id, date(2026, 3, 4)) == 15
+    await merge_balance_deltas(async_session)
+
+    closings = await async_session.execute(
+        select(BalanceCheckpoint.period, BalanceCheckpoint.closing_balance)
+        .where(BalanceCheckpoint.account_id == bank.id)
+        .order_by(BalanceCheckpoint.period)
+    )
+    assert dict(closings.all()) == {
+        date(2026, 1, 1): 10,
+        date(2026, 2, 1): 15,
+        date(2026, 3, 1): 115,
+    }
+    await post(date(2025, 12, 31), 1)
+    await post(date(2026, 3, 20), 1000)
+    expected = {
+        date(2025, 12, 30): 0,
+        date(2025, 12, 31): 1,
+        date(2026, 1, 9): 1,
+        date(2026, 2, 19): 11,
+        date(2026, 2, 20): 16,
+        date(2026, 3, 10): 116,
+        date(2026, 3, 20): 1116,
+        date(2027, 1, 1): 1116,
+    }
+    for merge in (False, True):
+        if merge:
+            await merge_balance_deltas(async_session)
+        for day, balance in expected.items():
+            assert await balances_as_of(async_session, [bank.id, sales.id], day) == {
+                bank.id: balance,
+                sales.id: -balance,
+            }
+    assert await account_balance(async_session, bank.id) == 1116
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_match_journal(async_session: AsyncSession) -> None:
+    company, bank, sales = await setup_accounts(async_session)
+    rng = random.Random(3)
+    days = [date(2025, 1, 1) + timedelta(days=rng.randrange(500)) for _ in range(60)]
+    for i, day in enumerate(days):
+        amount = Decimal(rng.randrange(-10_000, 10_000)) / 100
+        await post_entry(
+            async_session,
+            company.id,
+            [(bank.id, amount), (sales.id, -amount)],
+            effective_date=day,
+        )
+        await async_session.commit()
+        if i % 7 == 0:
+            await merge_balance_deltas(async_session, batch_size=3)
+
+    probes = sorted(set(days))[::5] + [date(2024, 12, 31), date(2026, 12, 31)]
+    for day in probes:
+        assert await balance_as_of(
+            async_session, bank.id, day
+        ) == await brute_force_as_of(async_session, bank.id, day)
+
+    # The migration rebuilds the same closings from the journal
+    before = (await async_session.execute(select(BalanceCheckpoint))).scalars().all()
+    snapshot = {(c.account_id, c.period): c.closing_balance for c in before}
+    await async_session.execute(delete(BalanceCheckpoint))
+    await async_session.run_sync(lambda s: _balance_checkpoints(s.connection()))
+    rebuilt = await async_session.execute(
+        select(
+            BalanceCheckpoint.account_id,
+            BalanceCheckpoint.period,
+            BalanceCheckpoint.closing_balance,
+        )
+    )
+    assert {(a, p): c for a, p, c in rebuilt} == snapshot
@@ -0,0 +1,109 @@
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from pyledger.models import Company
+from pyledger.models.address import AddressSchema, AddressType
+from pyledger.models.base import json_contains, json_field
+from pyledger.models.company_settings import (
+    CompanySettingsSchema,
+    CompanySettingsType,
+)
+
+PG = postgresql.dialect()  # type: ignore[no-untyped-call]
+
+
+def pg(stmt: Any) -> str:
+    return str(stmt.compile(dialect=PG))
+
+
+def test_decorator_reads_model_from_generic_argument() -> None:
+    assert AddressType.__pydantic_model__ is AddressSchema
+    assert CompanySettingsType.__pydantic_model__ is CompanySettingsSchema
+
+
+def test_postgres_uses_jsonb() -> None:
+    dialect = PG
+    column_type = CompanySettingsType()
+    assert "JSONB" in pg(CreateTable(Company.__table__))  # type: ignore[arg-type]
+    settings = CompanySettingsSchema(default_currency_code="EUR")
+    bound = column_type.process_bind_param(settings, dialect)
+    assert isinstance(bound, dict) and bound["default_currency_code"] == "EUR"
+    assert column_type.process_result_value(bound, dialect) == settings
+
+
+def test_postgres_sql_and_indexes() -> None:
+    stmt = select(Company.id).where(
+        json_field(Company.settings, "default_currency_code") == "EUR",
+        json_contains(Company.settings, invoice_prefix="INV"),
+    )
+    sql = pg(stmt)
+    assert "(company.settings ->> 'default_currency_code')" in sql
+    assert "company.settings @> CAST(" in sql
+    ddl = {
+        str(index.name): pg(CreateIndex(index))
+        for index in Company.__table__.indexes  # type: ignore[attr-defined]
+    }
+    assert ddl["ix_company_default_currency"].endswith(
+        "ON company ((settings ->> 'default_currency_code'))"
+    )
+    assert "USING gin (settings)" in ddl["ix_company_settings_gin"]
+
+
+def test_field_names_are_validated() -> None:
+    with pytest.raises(ValueError, match="no field 'nope'"):
+        json_field(Company.settings, "nope")
+    with pytest.raises(TypeError):
+        json_field(Company.name, "default_currency_code")
+    with pytest.raises(ValueError):
+        json_contains(Company.settings)
+
+
+@pytest.mark.asyncio
+async def test_filter_in_database(async_session: AsyncSession) -> None:
+    async_session.add_all(
+        [
+            Company(
+                name="Acme",
+                settings=CompanySettingsSchema(
+                    default_currency_code="EUR", invoice_prefix="AC"
+                ),
+                address=AddressSchema(city="Paris", country_code="FR"),
+            ),
+            Company(
+                name="Globex",
+                settings=CompanySettingsSchema(default_currency_code="USD"),
+                address=AddressSchema(country_code="US"),
+            ),
+            Company(name="Initech"),
+        ]
+    )
+    await async_session.commit()
+
+    async def names(*where: object) -> list[str]:
+        result = await async_session.execute(
+            select(Company.name).where(*where).order_by(Company.name)  # type: ignore[arg-type]
+        )
+        return list(result.scalars())
+
+    assert await names(
+        json_field(Company.settings, "default_currency_code") == "EUR"
+    ) == ["Acme"]
+    # A different field in an otherwise identical statement (compiled cache)
+    assert await names(json_field(Company.address, "country_code") == "US") == [
+        "Globex"
+    ]
+    acme = json_contains(
+        Company.settings, default_currency_code="EUR", invoice_prefix="AC"
+    )
+    assert await names(acme) == ["Acme"]
+    assert await names(json_contains(Company.settings, invoice_prefix="XX")) == []
+
+    company = (
+        await async_session.execute(select(Company).where(Company.name == "Acme"))
+    ).scalar_one()
+    assert company.address == AddressSchema(city="Paris", country_code="FR")
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from pyledger.api.responses import RawJSONResponse, dumps
+from pyledger.models import Company
+from pyledger.models.address import AddressSchema, AddressType
+from pyledger.models.company_settings import (
+    CompanySettingsSchema,
+    CompanySettingsType,
+)
+from pyledger.models.lazy_model import LazyModel
+
+PG = postgresql.dialect()  # type: ignore[no-untyped-call]
+
+
+async def load(session: AsyncSession, name: str) -> Company:
+    session.expunge_all()
+    stmt = select(Company).where(Company.name == name)
+    return (await session.execute(stmt)).scalar_one()
+
+
+def test_postgres_selects_lazy_columns_as_text() -> None:
+    sql = str(select(Company).compile(dialect=PG))
+    assert "CAST(company.settings AS TEXT) AS settings" in sql
+    column = Company.__table__.c.address
+    assert AddressType().column_expression(column) is column
+
+    column_type = CompanySettingsType(lazy=True)
+    value = column_type.process_result_value('{"invoice_prefix": "INV"}', PG)
+    assert isinstance(value, LazyModel) and not value.is_loaded
+    # Unchanged proxies are written back as the stored document
+    assert column_type.process_bind_param(value, PG) == {"invoice_prefix": "INV"}
+    # Dicts (non-lazy drivers) are still validated eagerly
+    assert column_type.process_result_value({"invoice_prefix": "X"}, PG) == (
+        CompanySettingsSchema(invoice_prefix="X")
+    )
+
+
+def test_validation_is_deferred() -> None:
+    value = LazyModel(AddressSchema, '{"country_code": "XX"}')
+    assert value.raw_json() == '{"country_code": "XX"}'
+    with pytest.raises(ValidationError):
+        value.materialize()
+
+
+@pytest.mark.asyncio
+async def test_lazy_load_and_passthrough(async_session: AsyncSession) -> None:
+    async_session.add(
+        Company(
+            name="Acme",
+            address=AddressSchema(city="Paris", country_code="FR"),
+            settings=CompanySettingsSchema(default_currency_code="EUR"),
+        )
+    )
+    await async_session.commit()
+
+    company = await load(async_session, "Acme")
+    address = company.address
+    assert isinstance(address, LazyModel) and not address.is_loaded
+    stored = AddressSchema(city="Paris", country_code="FR").model_dump_json()
+    body = dumps({"id": company.id, "address": address, "tags": ("a",)})
+    assert body == f'{{"id":{company.id},"address":{stored},"tags":["a"]}}'.encode()
+    assert not address.is_loaded
+
+    assert address.city == "Paris"
+    assert address.is_loaded
+    assert address == AddressSchema(city="Paris", country_code="FR")
+    assert AddressSchema(city="Paris", country_code="FR") == address
+
+    # Changes made through the proxy are serialized and persisted
+    address.city = "Lyon"
+    assert json.loads(RawJSONResponse({"a": address}).body)["a"]["city"] == "Lyon"
+    flag_modified(company, "address")
+    await async_session.commit()
+    assert (await load(async_session, "Acme")).address == AddressSchema(
+        city="Lyon", country_code="FR"
+    )
+
+
+@pytest.mark.asyncio
+async def test_unread_proxy_is_written_back_unchanged(
+    async_session: AsyncSession,
+) -> None:
+    async_session.add(
+        Company(name="Globex", settings=CompanySettingsSchema(invoice_prefix="G"))
+    )
+    await async_session.commit()
+
+    company = await load(async_session, "Globex")
+    company.name = "Globex Corp"
+    flag_modified(company, "settings")
+    await async_session.commit()
+    company = await load(async_session, "Globex Corp")
+    assert company.settings == CompanySettingsSchema(invoice_prefix="G")
+    settings = company.get_settings()
+    assert type(settings) is CompanySettingsSchema
+    assert settings.invoice_prefix == "G"
+    assert company.get_address() is None
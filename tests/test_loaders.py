@@ -0,0 +1,163 @@
+import asyncio
+from typing import Annotated, AsyncGenerator, Callable, ContextManager
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.db import get_session
+from pyledger.loaders import DataLoader, Loaders, get_loaders
+from pyledger.models import Company, User, UserPermission
+from pyledger.query_stats import QueryStats
+
+Budget = Callable[[int], ContextManager[QueryStats]]
+
+
+@pytest.mark.asyncio
+async def test_data_loader_batches_and_caches() -> None:
+    calls: list[list[int]] = []
+
+    async def squares(keys: list[int]) -> list[int]:
+        calls.append(keys)
+        return [k * k for k in keys]
+
+    loader: DataLoader[int, int] = DataLoader(squares, max_batch_size=3)
+    assert await asyncio.gather(*(loader.load(k) for k in (1, 2, 2, 3, 4))) == [
+        1,
+        4,
+        4,
+        9,
+        16,
+    ]
+    assert calls == [[1, 2, 3], [4]]
+    assert await loader.load_many([4, 1]) == [16, 1]
+    assert len(calls) == 2
+
+    loader.prime(5, 0)
+    loader.clear(1)
+    assert await loader.load_many([1, 5]) == [1, 0]
+    assert calls[-1] == [1]
+
+
+@pytest.mark.asyncio
+async def test_data_loader_failures_are_not_cached() -> None:
+    fail = True
+
+    async def flaky(keys: list[int]) -> list[int]:
+        if fail:
+            raise RuntimeError("db down")
+        return keys
+
+    loader: DataLoader[int, int] = DataLoader(flaky)
+    results = await asyncio.gather(
+        loader.load(1), loader.load(2), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+    fail = False
+    assert await loader.load_many([1, 2]) == [1, 2]
+
+    async def short(keys: list[int]) -> list[int]:
+        return []
+
+    with pytest.raises(ValueError, match="0 values for 1 keys"):
+        await DataLoader(short).load(1)
+
+
+@pytest.mark.asyncio
+async def test_data_loader_clear_before_dispatch() -> None:
+    async def identity(keys: list[int]) -> list[int]:
+        return keys
+
+    loader: DataLoader[int, int] = DataLoader(identity)
+    first, second = loader.load(1), loader.load(2)
+    loader.clear(1)
+    loader.clear()
+    assert [await asyncio.wait_for(f, 1) for f in (first, second)] == [1, 2]
+    assert await loader.load(1) == 1
+
+
+async def seed(session: AsyncSession, users: int, companies: int) -> None:
+    session.add_all(
+        User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x")
+        for i in range(users)
+    )
+    session.add_all(Company(name=f"C{i}") for i in range(companies))
+    await session.flush()
+    # User i works for companies i and i + 1 (mod companies)
+    session.add_all(
+        UserPermission(user_id=u + 1, company_id=(u + offset) % companies + 1)
+        for u in range(users)
+        for offset in (0, 1)
+    )
+    await session.commit()
+    session.expunge_all()
+
+
+def users_app(session: AsyncSession) -> FastAPI:
+    app = FastAPI()
+
+    async def session_override() -> AsyncGenerator[AsyncSession, None]:
+        yield session
+
+    @app.get("/users")
+    async def list_users(
+        session: Annotated[AsyncSession, Depends(get_session)],
+        loaders: Annotated[Loaders, Depends(get_loaders)],
+    ) -> list[dict[str, object]]:
+        users = list(await session.scalars(select(User).order_by(User.id)))
+        companies = await asyncio.gather(
+            *(loaders.companies_of_user(user.id) for user in users)
+        )
+        return [
+            {"user": user.username, "companies": [c.name for c in cs]}
+            for user, cs in zip(users, companies, strict=True)
+        ]
+
+    @app.get("/companies/{company_id}/users")
+    async def company_users(
+        company_id: int, loaders: Annotated[Loaders, Depends(get_loaders)]
+    ) -> list[str]:
+        company, users = await asyncio.gather(
+            loaders.companies.load(company_id), loaders.users_of_company(company_id)
+        )
+        assert company is not None
+        return [f"{company.name}:{user.username}" for user in users]
+
+    app.dependency_overrides[get_session] = session_override
+    return app
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("users", [3, 40])
+async def test_listing_runs_constant_queries(
+    async_session: AsyncSession, query_budget: Budget, users: int
+) -> None:
+    await seed(async_session, users, 5)
+    transport = ASGITransport(app=users_app(async_session))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        # The users, their grants, the companies
+        with query_budget(3):
+            r = await ac.get("/users")
+        async_session.expunge_all()
+        # The company and its grants, the users
+        with query_budget(3):
+            by_company = await ac.get("/companies/2/users")
+    listing = r.json()
+    assert len(listing) == users
+    assert listing[0] == {"user": "u0", "companies": ["C0", "C1"]}
+    assert listing[2] == {"user": "u2", "companies": ["C2", "C3"]}
+    assert by_company.json()[:2] == ["C1:u0", "C1:u1"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_grants_list_a_company_once(
+    async_session: AsyncSession,
+) -> None:
+    await seed(async_session, 1, 2)
+    loaders = Loaders(async_session)
+    grant = UserPermission(user_id=1, company_id=1)
+    loaders.permissions_by_user.prime(1, [grant, grant])
+    companies = await loaders.companies_of_user(1)
+    assert [c.name for c in companies] == ["C0"]
@@ -0,0 +1,116 @@
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from pyledger import metrics
+from pyledger.app import create_app
+from pyledger.config import PoolSettings
+from pyledger.db import EngineManager, get_session
+from pyledger.metrics import Registry, observe_pools, statement_type
+from pyledger.tenancy import Tenant
+
+
+def test_render_text_format() -> None:
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("path",), (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, '/a"b')
+    gauge = registry.gauge("open", "Open things.")
+    gauge.set(2)
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{path="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{path="/a\\"b",le="1"} 3',
+        'latency_seconds_bucket{path="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{path="/a\\"b"} 3.65',
+        'latency_seconds_count{path="/a\\"b"} 4',
+        "# HELP open Open things.",
+        "# TYPE open gauge",
+        "open 2",
+    ]
+    with pytest.raises(ValueError):
+        latency.observe(1.0)
+    with pytest.raises(ValueError):
+        registry.gauge("open", "Again.")
+
+
+def test_statement_type() -> None:
+    assert statement_type("  select 1") == "SELECT"
+    assert statement_type("WITH x AS (SELECT 1) SELECT * FROM x") == "WITH"
+    assert statement_type("PRAGMA foreign_keys") == "OTHER"
+    assert statement_type("") == "OTHER"
+
+
+async def fake_session() -> AsyncGenerator[object, None]:
+    class Dummy:
+        async def execute(self, *args: object, **kwargs: object) -> None:
+            return None
+
+    yield Dummy()
+
+
+@pytest.mark.asyncio
+async def test_request_latency_by_route(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    app = create_app()
+    app.dependency_overrides[get_session] = fake_session
+    health = ("GET", "/api/health", "200")
+    missing = ("GET", "<unmatched>", "404")
+    before = metrics.REQUEST_DURATION.count(*health)
+    before_missing = metrics.REQUEST_DURATION.count(*missing)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for _ in range(3):
+            assert (await ac.get("/api/health")).status_code == 200
+        assert (await ac.get("/api/nope/123")).status_code == 404
+        assert (await ac.get("/api/metrics")).status_code == 401
+        wrong = {"Authorization": "Bearer nope"}
+        assert (await ac.get("/api/metrics", headers=wrong)).status_code == 401
+        r = await ac.get(
+            "/api/metrics", headers={"Authorization": "Bearer scrape-secret"}
+        )
+        monkeypatch.delenv("METRICS_TOKEN")
+        assert (await ac.get("/api/metrics")).status_code == 404
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.REQUEST_DURATION.count(*health) == before + 3
+    assert metrics.REQUEST_DURATION.count(*missing) == before_missing + 1
+    assert (
+        'pyledger_http_request_duration_seconds_count{method="GET",'
+        'route="/api/health",status="200"}'
+    ) in r.text
+
+
+@pytest.mark.asyncio
+async def test_engine_query_and_pool_metrics(tmp_path: Path) -> None:
+    manager = EngineManager(
+        url_factory=lambda t: f"sqlite+aiosqlite:///{tmp_path / t.id}.db",
+        settings=PoolSettings(tenant_pool_size=2, max_overflow=1),
+        metrics=True,
+    )
+    tenant = Tenant(id="metrics-test")
+    selects = metrics.QUERY_DURATION.count(tenant.id, "SELECT")
+    checkouts = metrics.POOL_CHECKOUT_DURATION.count(tenant.id)
+
+    async with manager.get_engine(tenant).connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        await conn.execute(text("SELECT 2"))
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+        observe_pools(manager.items())
+        assert metrics.POOL_CHECKED_OUT.get(tenant.id) == 1
+        assert metrics.POOL_SIZE.get(tenant.id) == 2
+        assert metrics.POOL_WAITING.get(tenant.id) == 0
+
+    assert metrics.QUERY_DURATION.count(tenant.id, "SELECT") == selects + 2
+    assert metrics.POOL_CHECKOUT_DURATION.count(tenant.id) == checkouts + 1
+    await manager.dispose_all()
+    observe_pools(manager.items())
+    assert metrics.POOL_CHECKED_OUT.get(tenant.id) is None
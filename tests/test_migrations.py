@@ -0,0 +1,342 @@
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+
+from pyledger import migrations
+from pyledger.config import PoolSettings
+from pyledger.db import EngineManager
+from pyledger.migrations import (
+    TARGET_VERSION,
+    Migration,
+    SchemaOutOfDate,
+    current_version,
+    lock_statement,
+    migrate_all,
+    migrate_database,
+    prepare_schema,
+    read_schema_state,
+    schema_fingerprint,
+    upgrade,
+)
+from pyledger.models import Base
+from pyledger.tenancy import Tenant
+
+ALL_VERSIONS = [m.version for m in migrations.MIGRATIONS]
+
+
+def make_manager(tmp_path: Path, **settings: Any) -> EngineManager:
+    def url_factory(tenant: Tenant) -> str:
+        return f"sqlite+aiosqlite:///{tmp_path / (tenant.db_name or 'default')}.db"
+
+    return EngineManager(
+        url_factory=url_factory,
+        settings=PoolSettings(**{"pool_size": 1, "max_overflow": 1, **settings}),
+    )
+
+
+def tenants(n: int) -> list[Tenant]:
+    return [Tenant(id=f"t{i}", db_name=f"t{i}") for i in range(n)]
+
+
+async def version_of(manager: EngineManager, tenant: Tenant) -> int | None:
+    async with manager.get_engine(tenant).connect() as conn:
+        return await conn.run_sync(current_version)
+
+
+@pytest.mark.asyncio
+async def test_migrate_database_then_skip(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="acme", db_name="acme")
+    first = await migrate_database(tenant, manager)
+    assert first.status == "migrated"
+    assert first.current is None
+    assert first.applied == ALL_VERSIONS
+    async with manager.get_engine(tenant).connect() as conn:
+        tables = await conn.run_sync(lambda c: inspect(c).get_table_names())
+    assert {"company", "user", "schema_version"} <= set(tables)
+
+    second = await migrate_database(tenant, manager)
+    assert second.status == "current"
+    assert second.current == TARGET_VERSION
+    assert second.applied == []
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_migrate_all_applies_new_migration_and_reports(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = make_manager(tmp_path)
+    summary = await migrate_all(tenants(6), concurrency=3, manager=manager)
+    assert summary.count("migrated") == 6
+    assert len(manager) == 0  # engines are released once each tenant is done
+
+    def broken(conn: Connection) -> None:
+        if conn.engine.url.database and conn.engine.url.database.endswith("t2.db"):
+            raise RuntimeError("boom")
+
+    extra = Migration(TARGET_VERSION + 1, "Test step", broken)
+    monkeypatch.setattr(migrations, "MIGRATIONS", (*migrations.MIGRATIONS, extra))
+    summary = await migrate_all(
+        tenants(7), concurrency=3, manager=manager, target=extra.version
+    )
+    report = summary.to_dict(slowest=3)
+    assert (report["total"], report["migrated"], report["failed"]) == (7, 6, 1)
+    assert [e["tenant"] for e in report["errors"]] == ["t2"]
+    assert "boom" in report["errors"][0]["error"]
+    assert len(report["slowest"]) == 3
+    durations = [r["duration"] for r in report["slowest"]]
+    assert durations == sorted(durations, reverse=True)
+
+    # The failed tenant's transaction rolled back; the others moved on
+    assert await version_of(manager, Tenant(id="t2", db_name="t2")) == TARGET_VERSION
+    assert await version_of(manager, Tenant(id="t3", db_name="t3")) == extra.version
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_migrate_all_caps_concurrency_at_connection_budget(
+    tmp_path: Path,
+) -> None:
+    # Four connections shared by two workers
+    manager = make_manager(tmp_path, max_connections=4, workers=2)
+    active = peak = 0
+    original: Callable[..., Any] = migrations.migrate_database
+
+    async def tracking(*args: Any, **kwargs: Any) -> Any:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            active -= 1
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(migrations, "migrate_database", tracking)
+        summary = await migrate_all(tenants(5), concurrency=10, manager=manager)
+    assert summary.count("migrated") == 5
+    assert peak <= manager.budget.limit == 2
+    assert manager.budget.open <= 2
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_migrate_all_rejects_bad_concurrency(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        await migrate_all([], concurrency=0, manager=make_manager(tmp_path))
+
+
+@pytest.mark.asyncio
+async def test_prepare_schema_modes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="acme", db_name="acme")
+    await prepare_schema("skip", tenant, manager)
+    with pytest.raises(SchemaOutOfDate):
+        await prepare_schema("check", tenant, manager)
+    with pytest.raises(ValueError):
+        await prepare_schema("create", tenant, manager)
+
+    await prepare_schema("migrate", tenant, manager)
+    assert await version_of(manager, tenant) == TARGET_VERSION
+    async with manager.get_engine(tenant).connect() as conn:
+        _, fingerprint = await conn.run_sync(read_schema_state)
+    assert fingerprint == schema_fingerprint()
+
+    caplog.clear()
+    await prepare_schema("check", tenant, manager)
+    assert "add a migration" not in caplog.text
+    monkeypatch.setattr(migrations, "schema_fingerprint", lambda: "changed")
+    await prepare_schema("check", tenant, manager)
+    assert "add a migration" in caplog.text
+    await manager.dispose_all()
+
+
+def describe_schema(conn: Connection) -> dict[str, Any]:
+    inspector = inspect(conn)
+    return {
+        table: (
+            {
+                (c["name"], str(c["type"]), c["nullable"])
+                for c in inspector.get_columns(table)
+            },
+            {tuple(u["column_names"]) for u in inspector.get_unique_constraints(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+            {fk["referred_table"] for fk in inspector.get_foreign_keys(table)},
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+@pytest.mark.filterwarnings("ignore:Skipped unsupported reflection")
+def test_migrations_build_the_model_schema() -> None:
+    # Step 1 is frozen, so later model changes need their own steps
+    migrated, modelled = create_engine("sqlite://"), create_engine("sqlite://")
+    with migrated.begin() as conn:
+        upgrade(conn)
+        assert current_version(conn) == TARGET_VERSION
+    Base.metadata.create_all(modelled)
+    with migrated.connect() as a, modelled.connect() as b:
+        assert describe_schema(a) == describe_schema(b)
+
+
+def test_upgrade_locks_before_reading_the_version() -> None:
+    pg = postgresql.dialect()  # type: ignore[no-untyped-call]
+    assert "pg_advisory_xact_lock" in str(lock_statement().compile(dialect=pg))
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        upgrade(conn)
+        # Another worker finished first: the re-read version leaves nothing to do
+        assert upgrade(conn) == []
+
+
+@pytest.mark.asyncio
+async def test_existing_create_all_database_is_adopted(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="legacy", db_name="legacy")
+    async with manager.get_engine(tenant).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    result = await migrate_database(tenant, manager)
+    assert (result.current, result.applied) == (None, ALL_VERSIONS)
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_company_json_columns_added_to_existing_database(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="old", db_name="old")
+    async with manager.get_engine(tenant).begin() as conn:
+        await conn.run_sync(upgrade, 1)
+        await conn.execute(text("DROP TABLE company"))
+        await conn.execute(
+            text(
+                "CREATE TABLE company (id INTEGER PRIMARY KEY, "
+                "name VARCHAR(255) NOT NULL UNIQUE, created_at DATETIME, "
+                "updated_at DATETIME)"
+            )
+        )
+    result = await migrate_database(tenant, manager)
+    assert (result.current, result.applied) == (1, ALL_VERSIONS[1:])
+    async with manager.get_engine(tenant).connect() as conn:
+        columns = await conn.run_sync(
+            lambda c: {col["name"] for col in inspect(c).get_columns("company")}
+        )
+        indexes = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )
+        index_names = set(indexes.scalars())
+    assert {"address", "settings"} <= columns
+    assert {"ix_company_default_currency", "ix_company_country"} <= index_names
+    assert "ix_company_settings_gin" not in index_names  # Postgres only
+    assert "ix_user_permission_user_company_permission" in index_names
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_grants_merged_before_unique_index(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="old", db_name="old")
+    async with manager.get_engine(tenant).begin() as conn:
+        await conn.run_sync(upgrade, 2)
+        await conn.execute(
+            text(
+                "INSERT INTO user (id, username, email, password_hash, is_active, "
+                "is_admin) VALUES (1, 'u', 'u@example.com', 'x', 1, 0)"
+            )
+        )
+        await conn.execute(text("INSERT INTO company (id, name) VALUES (1, 'Acme')"))
+        # READ and WRITE split across two rows, plus a plain duplicate
+        await conn.execute(
+            text(
+                "INSERT INTO user_permission (id, user_id, company_id, permission) "
+                "VALUES (1, 1, 1, 4), (2, 1, 1, 2), (3, 1, 1, 4)"
+            )
+        )
+    result = await migrate_database(tenant, manager)
+    assert result.applied == ALL_VERSIONS[2:]
+    async with manager.get_engine(tenant).connect() as conn:
+        rows = await conn.execute(
+            text("SELECT id, permission FROM user_permission ORDER BY id")
+        )
+        assert [tuple(row) for row in rows] == [(1, 6)]
+        with pytest.raises(IntegrityError):
+            await conn.execute(
+                text(
+                    "INSERT INTO user_permission (user_id, company_id, permission) "
+                    "VALUES (1, 1, 1)"
+                )
+            )
+    await manager.dispose_all()
+
+
+@pytest.mark.asyncio
+async def test_journal_line_dates_and_checkpoints_backfilled(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    tenant = Tenant(id="old", db_name="old")
+    async with manager.get_engine(tenant).begin() as conn:
+        await conn.run_sync(upgrade, 5)
+        await conn.execute(text("DROP TABLE journal_line"))
+        await conn.execute(
+            text(
+                "CREATE TABLE journal_line (id INTEGER PRIMARY KEY, "
+                "entry_id INTEGER NOT NULL, account_id INTEGER NOT NULL, "
+                "amount NUMERIC(18, 4) NOT NULL, memo VARCHAR(255))"
+            )
+        )
+        await conn.execute(text("INSERT INTO company (id, name) VALUES (1, 'Acme')"))
+        await conn.execute(
+            text(
+                "INSERT INTO account (id, company_id, name, type, currency_code) "
+                "VALUES (1, 1, 'Bank', 'asset', 'USD'), "
+                "(2, 1, 'Sales', 'income', 'USD')"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO journal_entry (id, company_id, effective_date) "
+                "VALUES (1, 1, '2026-01-05'), (2, 1, '2026-03-01')"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO journal_line (entry_id, account_id, amount) VALUES "
+                "(1, 1, 10), (1, 2, -10), (2, 1, 4), (2, 2, -4)"
+            )
+        )
+        # Entry 2 not merged yet
+        await conn.execute(
+            text(
+                "INSERT INTO balance_delta (account_id, period, amount) VALUES "
+                "(1, '2026-03-01', 4), (2, '2026-03-01', -4)"
+            )
+        )
+    result = await migrate_database(tenant, manager)
+    assert (result.current, result.applied) == (5, [6, 7])
+    async with manager.get_engine(tenant).connect() as conn:
+        dates = await conn.execute(
+            text("SELECT DISTINCT effective_date FROM journal_line ORDER BY 1")
+        )
+        assert dates.scalars().all() == ["2026-01-05", "2026-03-01"]
+        closings = await conn.execute(
+            text(
+                "SELECT account_id, period, closing_balance FROM balance_checkpoint "
+                "ORDER BY account_id"
+            )
+        )
+        assert [tuple(row) for row in closings] == [
+            (1, "2026-01-01", 10),
+            (2, "2026-01-01", -10),
+        ]
+        indexes = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )
+        assert "ix_journal_line_account_date" in set(indexes.scalars())
+    await manager.dispose_all()
@@ -0,0 +1,283 @@
+import asyncio
+from typing import Annotated, AsyncGenerator, Awaitable, Callable, Iterator
+
+import pytest
+from fastapi import Depends, FastAPI, Request, Response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateIndex
+
+from pyledger import permissions
+from pyledger.db import get_session
+from pyledger.models import Company, User, UserPermission
+from pyledger.models.user_permission import Permission
+from pyledger.permissions import (
+    DEFAULT_PERMISSION_TTL,
+    PermissionCache,
+    PermissionMap,
+    accessible_company_ids,
+    get_permission_cache,
+    get_permissions,
+    list_accessible_companies,
+    load_permission_map,
+    require_permission,
+)
+
+RW = Permission.from_mask(read=True, write=True)
+R = Permission.from_mask(read=True)
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch: pytest.MonkeyPatch) -> Iterator[PermissionCache]:
+    monkeypatch.setattr(permissions, "_cache", None)
+    yield get_permission_cache()
+
+
+def counting_loader(
+    permission_map: PermissionMap, delay: float = 0.0
+) -> tuple[list[int], Callable[[], Awaitable[PermissionMap]]]:
+    calls: list[int] = []
+
+    async def load() -> PermissionMap:
+        calls.append(permission_map.user_id)
+        await asyncio.sleep(delay)
+        return permission_map
+
+    return calls, load
+
+
+def test_compiled_map_checks() -> None:
+    pm = PermissionMap.compile(
+        1, [(10, RW), (11, R), (12, Permission.from_mask(execute=True)), (11, 2)]
+    )
+    assert pm.get(11) == RW and str(pm.get(11)) == "rw-"
+    assert pm.get(99) == 0
+    assert pm.can_write(10) and pm.can_read(10) and not pm.can_execute(10)
+    assert pm.allows(12, Permission.EXECUTE_MASK)
+    assert not pm.allows(12, Permission.READ_MASK | Permission.EXECUTE_MASK)
+    assert pm.allows(99, 0)
+    ids = range(0, 500)
+    assert pm.filter(ids, Permission.WRITE_MASK) == {10, 11}
+    assert pm.filter(ids, RW) == {10, 11}
+    assert pm.companies(0) == {10, 11, 12}
+
+
+@pytest.mark.asyncio
+async def test_cache_single_flight_ttl_and_invalidation() -> None:
+    pm = PermissionMap.compile(1, [(10, RW)])
+    calls, load = counting_loader(pm, delay=0.01)
+    cache = PermissionCache()
+    results = await asyncio.gather(*(cache.get("t", 1, load) for _ in range(20)))
+    assert all(r is pm for r in results)
+    assert calls == [1]
+
+    await cache.get("other", 1, load)
+    cache.invalidate(2)
+    await cache.get("t", 1, load)
+    assert len(calls) == 2
+    cache.invalidate(1)
+    await cache.get("t", 1, load)
+    await cache.get("other", 1, load)
+    assert len(calls) == 4
+
+    calls, load = counting_loader(pm)
+    expired = PermissionCache(ttl=0)
+    await expired.get("t", 1, load)
+    await expired.get("t", 1, load)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_invalidation_is_not_cached() -> None:
+    pm = PermissionMap.compile(1, [(10, RW)])
+    calls, load = counting_loader(pm, delay=0.01)
+    cache = PermissionCache()
+    pending = asyncio.create_task(cache.get("t", 1, load))
+    await asyncio.sleep(0)
+    cache.invalidate(1)
+    assert await pending is pm
+    await cache.get("t", 1, load)
+    assert len(calls) == 2
+
+
+async def seed(session: AsyncSession) -> tuple[User, list[Company]]:
+    user = User(username="ann", email="ann@example.com", password_hash="x")
+    companies = [Company(name=f"C{i}") for i in range(3)]
+    session.add_all([user, *companies])
+    await session.flush()
+    session.add_all(
+        [
+            UserPermission(user_id=user.id, company_id=companies[0].id, permission=RW),
+            UserPermission(user_id=user.id, company_id=companies[1].id),
+        ]
+    )
+    await session.commit()
+    return user, companies
+
+
+@pytest.mark.asyncio
+async def test_permission_writes_invalidate_cache(
+    async_session: AsyncSession, fresh_cache: PermissionCache
+) -> None:
+    user, companies = await seed(async_session)
+    loads = 0
+
+    async def load() -> PermissionMap:
+        nonlocal loads
+        loads += 1
+        return await load_permission_map(async_session, user.id)
+
+    pm = await fresh_cache.get("default", user.id, load)
+    assert pm.filter([c.id for c in companies], Permission.WRITE_MASK) == {
+        companies[0].id
+    }
+    assert pm.can_read(companies[1].id) and not pm.can_write(companies[1].id)
+    await fresh_cache.get("default", user.id, load)
+    assert loads == 1
+
+    grant = UserPermission(user_id=user.id, company_id=companies[2].id, permission=RW)
+    async_session.add(grant)
+    await async_session.commit()
+    pm = await fresh_cache.get("default", user.id, load)
+    assert loads == 2 and pm.can_write(companies[2].id)
+
+    grant.permission = R
+    await async_session.commit()
+    pm = await fresh_cache.get("default", user.id, load)
+    assert loads == 3 and not pm.can_write(companies[2].id)
+
+    await async_session.delete(grant)
+    await async_session.commit()
+    pm = await fresh_cache.get("default", user.id, load)
+    assert loads == 4 and companies[2].id not in pm.grants
+
+
+@pytest.mark.asyncio
+async def test_waiter_retries_cancelled_load(fresh_cache: PermissionCache) -> None:
+    loads = 0
+
+    async def load() -> PermissionMap:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        return PermissionMap.compile(1, [(10, Permission.READ_MASK)])
+
+    leader = asyncio.create_task(fresh_cache.get("default", 1, load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(fresh_cache.get("default", 1, load))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert (await waiter).can_read(10)
+    assert leader.cancelled()
+    assert loads == 2
+
+
+def test_default_ttl_bounds_cross_worker_staleness(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(permissions, "_cache", None)
+    monkeypatch.delenv("PERMISSION_CACHE_TTL", raising=False)
+    assert get_permission_cache().ttl == DEFAULT_PERMISSION_TTL <= 5
+
+
+@pytest.mark.asyncio
+async def test_dependencies(
+    async_session: AsyncSession, fresh_cache: PermissionCache
+) -> None:
+    user, companies = await seed(async_session)
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def authenticate(
+        request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        if "x-user" in request.headers:
+            request.state.user_id = int(request.headers["x-user"])
+        return await call_next(request)
+
+    @app.put("/companies/{company_id}")
+    async def update(
+        company_id: int,
+        pm: Annotated[
+            PermissionMap, Depends(require_permission(Permission.WRITE_MASK))
+        ],
+    ) -> dict[str, str]:
+        return {"permission": str(pm.get(company_id))}
+
+    @app.get("/writable")
+    async def writable(
+        pm: Annotated[PermissionMap, Depends(get_permissions)],
+    ) -> list[int]:
+        return sorted(pm.filter((c.id for c in companies), Permission.WRITE_MASK))
+
+    async def session_override() -> AsyncGenerator[AsyncSession, None]:
+        yield async_session
+
+    app.dependency_overrides[get_session] = session_override
+    headers = {"x-user": str(user.id)}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.put(f"/companies/{companies[0].id}", headers=headers)
+        assert r.status_code == 200 and r.json() == {"permission": "rw-"}
+        r = await ac.put(f"/companies/{companies[1].id}", headers=headers)
+        assert r.status_code == 403
+        r = await ac.get("/writable", headers=headers)
+        assert r.json() == [companies[0].id]
+        assert (await ac.get("/writable")).status_code == 401
+
+
+def test_mask_filter_sql_and_index() -> None:
+    pg = postgresql.dialect()  # type: ignore[no-untyped-call]
+    sql = str(
+        accessible_company_ids(7, Permission.WRITE_MASK, after=40, limit=20).compile(
+            dialect=pg, compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "(user_permission.permission & 2) = 2" in sql
+    assert "user_permission.company_id > 40" in sql
+    assert sql.endswith("ORDER BY user_permission.company_id \n LIMIT 20")
+    index = next(
+        i
+        for i in UserPermission.__table__.indexes  # type: ignore[attr-defined]
+        if i.name == "ix_user_permission_user_company_permission"
+    )
+    assert str(CreateIndex(index).compile(dialect=pg)).endswith(
+        "ON user_permission (user_id, company_id, permission)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_paginated_accessible_companies(async_session: AsyncSession) -> None:
+    user = User(username="bob", email="bob@example.com", password_hash="x")
+    async_session.add(user)
+    await async_session.flush()
+    await async_session.execute(insert(Company), [{"name": f"C{i}"} for i in range(25)])
+    grants = [
+        {"user_id": user.id, "company_id": i, "permission": int(i % 3 and RW or R)}
+        for i in range(1, 26)
+    ]
+    await async_session.execute(insert(UserPermission), grants)
+    await async_session.commit()
+    expected = [g["company_id"] for g in grants if g["permission"] == RW]
+
+    seen: list[int] = []
+    after = None
+    for _ in range(10):
+        page = await list_accessible_companies(
+            async_session, user.id, Permission.WRITE_MASK, after=after, limit=5
+        )
+        assert len(page.items) <= 5
+        seen.extend(c.id for c in page.items)
+        if page.next_after is None:
+            break
+        after = page.next_after
+    assert seen == expected
+
+    everything = await list_accessible_companies(
+        async_session, user.id, Permission.READ_MASK, limit=100
+    )
+    assert len(everything.items) == 25 and everything.next_after is None
+    with pytest.raises(ValueError):
+        await list_accessible_companies(async_session, user.id, 2, limit=0)
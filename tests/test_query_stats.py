@@ -0,0 +1,118 @@
+import logging
+from typing import Annotated, AsyncGenerator, Callable, ContextManager
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from pyledger.api.query_stats import QueryStatsMiddleware
+from pyledger.db import get_session
+from pyledger.models import Company, User, UserPermission
+from pyledger.query_stats import (
+    QueryBudgetExceeded,
+    QueryStats,
+    collect_queries,
+    statement_shape,
+)
+
+Budget = Callable[[int], ContextManager[QueryStats]]
+
+
+async def seed_users(session: AsyncSession, n: int) -> None:
+    for i in range(n):
+        user = User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x")
+        company = Company(name=f"C{i}")
+        session.add_all([user, company])
+        await session.flush()
+        session.add(UserPermission(user_id=user.id, company_id=company.id))
+    await session.commit()
+    session.expunge_all()
+
+
+def company_names(users: list[User]) -> list[list[str]]:
+    return [[company.name for company in user.companies] for user in users]
+
+
+def test_statement_shape() -> None:
+    assert statement_shape("SELECT a FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT a\n  FROM t WHERE id IN (?)"
+    )
+    assert statement_shape("SELECT 1 WHERE x = $1 AND y IN ($2, $3)") == (
+        "SELECT 1 WHERE x = ? AND y IN (?)"
+    )
+    assert statement_shape("INSERT INTO t (a) VALUES (?), (?), (?)") == (
+        "INSERT INTO t (a) VALUES (?)"
+    )
+    assert statement_shape("SELECT '{}'::jsonb") == "SELECT '{}'::jsonb"
+
+
+@pytest.mark.asyncio
+async def test_lazy_relationships_are_n_plus_one(
+    async_session: AsyncSession, query_budget: Budget
+) -> None:
+    await seed_users(async_session, 6)
+    with collect_queries() as stats:
+        users = list(await async_session.scalars(select(User)))
+        names = await async_session.run_sync(lambda _: company_names(users))
+    assert names == [[f"C{i}"] for i in range(6)]
+    # One query for the users, then per user its permissions and its company
+    assert stats.count == 13
+    assert stats.lazy_loads == {
+        "User.user_permissions": 6,
+        "UserPermission.company": 6,
+    }
+    assert [n for _, n in stats.suspects()] == [6, 6]
+    assert stats.db_time > 0
+    async_session.expunge_all()
+
+    stmt = select(User).options(
+        selectinload(User.user_permissions).selectinload(UserPermission.company)
+    )
+    with query_budget(3):
+        users = list(await async_session.scalars(stmt))
+        assert company_names(users) == names
+    async_session.expunge_all()
+    with pytest.raises(QueryBudgetExceeded, match="7 queries, budget 3"):
+        with query_budget(3):
+            users = list(await async_session.scalars(select(User).limit(3)))
+            await async_session.run_sync(lambda _: company_names(users))
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_repeated_statements(
+    async_session: AsyncSession, caplog: pytest.LogCaptureFixture
+) -> None:
+    await seed_users(async_session, 5)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    async def session_override() -> AsyncGenerator[AsyncSession, None]:
+        yield async_session
+
+    @app.get("/users")
+    async def users(
+        session: Annotated[AsyncSession, Depends(get_session)],
+    ) -> dict[str, int]:
+        users = list(await session.scalars(select(User)))
+
+        def count_grants(sync_session: Session) -> int:
+            return sum(len(user.user_permissions) for user in users)
+
+        grants = await session.run_sync(count_grants)
+        session.expunge_all()
+        return {"users": len(users), "grants": grants}
+
+    app.dependency_overrides[get_session] = session_override
+    transport = ASGITransport(app=app)
+    with caplog.at_level(logging.WARNING, logger="pyledger.api.query_stats"):
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.get("/users")
+    assert r.json() == {"users": 5, "grants": 5}
+    assert r.headers["x-query-count"] == "6"
+    assert float(r.headers["x-db-time-ms"]) > 0
+    assert r.headers["x-query-warning"].startswith("possible N+1: 1 statement(s)")
+    assert "Possible N+1 in GET /users" in caplog.text
+    assert "lazy loads: User.user_permissions x5" in caplog.text
@@ -0,0 +1,175 @@
+import copy
+import json
+import os
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, ClassVar, Iterator
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.models import CurrencyRate
+from pyledger.models.currency_rate import ERAPI
+from pyledger.models.rate_backfill import RateBackfill, SnapshotRequest, daily_requests
+from pyledger.models.rate_response_cache import ResponseCache
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(__file__), "resources", "erapi_fixture.json"
+)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local stand-in for the ERAPI latest/history endpoints."""
+
+    fixture: dict[str, Any]
+    fail_counts: dict[str, int]
+    client_ports: set[int]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.client_ports.add(self.client_address[1])
+        remaining = self.server.fail_counts.get(self.path, 0)
+        if remaining:
+            self.server.fail_counts[self.path] = remaining - 1
+            self.send_json(503, {"result": "error"})
+            return
+        parts = self.path.strip("/").split("/")
+        fixture = self.server.fixture
+        if parts[:2] == ["v6", "latest"] and parts[2] in fixture["rates"]:
+            payload = rebase(fixture, parts[2])
+        elif parts[0] == "history" and parts[1] in fixture["rates"]:
+            year, month, day = (int(p) for p in parts[2:5])
+            payload = rebase(fixture, parts[1])
+            for key in ("time_last_update_unix", "time_next_update_unix"):
+                payload.pop(key)
+            payload["conversion_rates"] = {
+                code: rate * (1 + day / 100)
+                for code, rate in payload.pop("rates").items()
+            }
+            payload.update(year=year, month=month, day=day)
+        else:
+            self.send_json(404, {"result": "error", "error-type": "unknown"})
+            return
+        self.send_json(200, payload)
+
+
+def rebase(fixture: dict[str, Any], base: str) -> dict[str, Any]:
+    payload = copy.deepcopy(fixture)
+    base_rate = float(fixture["rates"][base])
+    payload["base_code"] = base
+    payload["rates"] = {
+        code: float(rate) / base_rate for code, rate in fixture["rates"].items()
+    }
+    return payload
+
+
+@pytest.fixture
+def server() -> Iterator[StandInServer]:
+    with open(FIXTURE_PATH) as f:
+        fixture = json.load(f)
+    srv = StandInServer(("127.0.0.1", 0), StandInHandler)
+    srv.fixture = fixture
+    srv.fail_counts = {}
+    srv.client_ports = set()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def provider(
+    server: StandInServer, monkeypatch: pytest.MonkeyPatch
+) -> type[ERAPI]:
+    monkeypatch.setenv("ERAPI_API_KEY", "test-key")
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class LocalERAPI(ERAPI):
+        RESPONSE_CACHE: ClassVar[ResponseCache | None] = None
+        CURRENCY_EXCHANGE_API_URL: ClassVar[str] = f"{url}/v6/latest/{{base}}"
+        CURRENCY_HISTORY_API_URL: ClassVar[str] = (
+            f"{url}/history/{{base}}/{{year}}/{{month}}/{{day}}"
+        )
+
+    return LocalERAPI
+
+
+@pytest.mark.asyncio
+async def test_backfill_history_pooled_and_deduplicated(
+    async_session: AsyncSession,
+    server: StandInServer,
+    provider: type[ERAPI],
+    count_rows: Callable[[AsyncSession], Awaitable[int]],
+) -> None:
+    requests = list(
+        daily_requests(date(2025, 3, 1), date(2025, 3, 10), bases=["USD", "EUR"])
+    )
+    runner = RateBackfill(provider=provider, concurrency=4)
+    async with httpx.AsyncClient() as client:
+        result = await runner.run(async_session, requests, client=client)
+
+    assert result.fetched == 20
+    assert not result.failed
+    codes = sum(1 for _ in provider.model_validate(server.fixture).currency_rates())
+    # EUR-based snapshots normalize to the same USD rates/timestamps
+    assert result.ingest.inserted == 10 * codes
+    assert result.ingest.skipped == 10 * codes
+    assert await count_rows(async_session) == 10 * codes
+    assert len(server.client_ports) <= runner.concurrency
+
+    rate = await CurrencyRate.rate_at_async(async_session, "EUR")
+    eur = float(server.fixture["rates"]["EUR"])
+    assert rate == pytest.approx(eur)
+
+
+@pytest.mark.asyncio
+async def test_backfill_retries_transient_errors(
+    async_session: AsyncSession, server: StandInServer, provider: type[ERAPI]
+) -> None:
+    server.fail_counts["/v6/latest/USD"] = 2
+    runner = RateBackfill(provider=provider, retries=3, backoff=0.001)
+    async with httpx.AsyncClient() as client:
+        result = await runner.run(async_session, [SnapshotRequest()], client=client)
+    assert result.fetched == 1
+    assert not result.failed
+    assert server.fail_counts["/v6/latest/USD"] == 0
+
+
+@pytest.mark.asyncio
+async def test_backfill_records_failures(
+    async_session: AsyncSession, server: StandInServer, provider: type[ERAPI]
+) -> None:
+    server.fail_counts["/v6/latest/USD"] = 5
+    runner = RateBackfill(provider=provider, retries=1, backoff=0.001)
+    requests = [SnapshotRequest(), SnapshotRequest("EUR", date(2025, 1, 1))]
+    requests.append(SnapshotRequest("ZZZ"))
+    async with httpx.AsyncClient() as client:
+        result = await runner.run(async_session, requests, client=client)
+    assert result.fetched == 1
+    assert set(result.failed) == {SnapshotRequest(), SnapshotRequest("ZZZ")}
+    assert server.fail_counts["/v6/latest/USD"] == 3
+
+
+def test_history_requires_api_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ERAPI_API_KEY", raising=False)
+    monkeypatch.delenv("ERAPI_API_KEY_FILE", raising=False)
+    with pytest.raises(ValueError):
+        ERAPI.snapshot_url("USD", date(2025, 1, 1))
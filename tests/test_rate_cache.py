@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncGenerator, Iterator
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from pyledger.models import Base, Currency, CurrencyRate
+from pyledger.models.currency_rate import CurrencyRateProvider
+from pyledger.models.rate_cache import RateCache
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def session() -> Iterator[Session]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        for code in ("USD", "EUR", "CAD"):
+            s.add(Currency(code=code, name=code))
+        for day in range(5):
+            s.add(
+                CurrencyRate(
+                    currency_code="EUR",
+                    rate_vs_usd=0.9 + day / 100,
+                    timestamp=T0 + timedelta(days=day),
+                )
+            )
+            s.add(
+                CurrencyRate(
+                    currency_code="CAD",
+                    rate_vs_usd=1.3 + day / 100,
+                    timestamp=T0 + timedelta(days=day),
+                )
+            )
+        s.commit()
+        yield s
+    engine.dispose()
+
+
+def count_queries(session: Session) -> list[str]:
+    statements: list[str] = []
+
+    def before_execute(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    event.listen(session.get_bind(), "before_cursor_execute", before_execute)
+    return statements
+
+
+def test_get_rate_point_in_time(session: Session) -> None:
+    eur = session.get(Currency, "EUR")
+    assert eur is not None
+    assert eur.get_rate(session) == pytest.approx(0.94)
+    assert eur.get_rate(session, T0 + timedelta(days=2, hours=3)) == pytest.approx(
+        0.92
+    )
+    assert eur.get_rate(session, T0 + timedelta(days=1)) == pytest.approx(0.91)
+    assert eur.get_rate(session, T0 - timedelta(seconds=1)) is None
+
+
+def test_history_loaded_once(session: Session) -> None:
+    statements = count_queries(session)
+    for day in range(10):
+        CurrencyRate.rate_at(session, "EUR", T0 + timedelta(days=day))
+    assert len(statements) == 1
+    # Currencies without rows are cached too (no repeated misses)
+    assert CurrencyRate.rate_at(session, "USD") is None
+    assert CurrencyRate.rate_at(session, "USD") is None
+    assert len(statements) == 2
+
+
+def test_lru_eviction(session: Session, fresh_rate_cache: RateCache) -> None:
+    fresh_rate_cache.max_points = 6
+    CurrencyRate.rate_at(session, "EUR")
+    CurrencyRate.rate_at(session, "CAD")
+    database = CurrencyRate.database_key(session)
+    assert (database, "EUR") not in fresh_rate_cache
+    assert (database, "CAD") in fresh_rate_cache
+    assert fresh_rate_cache.points == 5
+
+
+def test_extend_refreshes_loaded_history(fresh_rate_cache: RateCache) -> None:
+    fresh_rate_cache.load("EUR", [(T0, 0.9)])
+    fresh_rate_cache.extend(
+        [
+            ("EUR", T0 + timedelta(days=1), 0.95),
+            ("EUR", T0 - timedelta(days=1), 0.85),
+            ("GBP", T0, 0.8),
+        ]
+    )
+    history = fresh_rate_cache.get("EUR")
+    assert history is not None
+    assert list(history.rates) == [0.85, 0.9, 0.95]
+    assert "GBP" not in fresh_rate_cache
+    assert fresh_rate_cache.points == 3
+
+
+def test_databases_cached_separately(session: Session, tmp_path: Path) -> None:
+    other = create_engine(f"sqlite:///{tmp_path / 'tenant.db'}")
+    Base.metadata.create_all(other)
+    with Session(other) as tenant:
+        tenant.add(Currency(code="EUR", name="EUR"))
+        tenant.add(CurrencyRate(currency_code="EUR", rate_vs_usd=0.5, timestamp=T0))
+        tenant.commit()
+        assert CurrencyRate.rate_at(session, "EUR") == pytest.approx(0.94)
+        assert CurrencyRate.rate_at(tenant, "EUR") == pytest.approx(0.5)
+        assert CurrencyRate.rate_at(session, "EUR") == pytest.approx(0.94)
+
+        CurrencyRate.RATE_CACHE.invalidate(database=CurrencyRate.database_key(tenant))
+        assert (CurrencyRate.database_key(session), "EUR") in CurrencyRate.RATE_CACHE
+        assert (CurrencyRate.database_key(tenant), "EUR") not in CurrencyRate.RATE_CACHE
+    other.dispose()
+
+
+@pytest.mark.asyncio
+async def test_update_all_refreshes_cache(
+    async_session: AsyncSession, fresh_rate_cache: RateCache
+) -> None:
+    new_ts = T0 + timedelta(days=30)
+
+    class StubProvider(CurrencyRateProvider):
+        @classmethod
+        async def iter_rates(cls) -> AsyncGenerator[CurrencyRate, None]:
+            yield CurrencyRate(currency_code="EUR", rate_vs_usd=0.99, timestamp=new_ts)
+
+    async_session.add(CurrencyRate(currency_code="EUR", rate_vs_usd=0.9, timestamp=T0))
+    await async_session.commit()
+    assert await CurrencyRate.rate_at_async(async_session, "EUR") == 0.9
+
+    original = CurrencyRate.RATE_PROVIDER
+    CurrencyRate.RATE_PROVIDER = StubProvider
+    try:
+        await CurrencyRate.update_all(async_session)
+    finally:
+        CurrencyRate.RATE_PROVIDER = original
+    history = fresh_rate_cache.get("EUR", CurrencyRate.database_key(async_session))
+    assert history is not None
+    assert history.rate_at() == pytest.approx(0.99)
+    assert history.rate_at(new_ts - timedelta(seconds=1)) == pytest.approx(0.9)
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_ingest_not_cached(
+    tmp_path: Path, fresh_rate_cache: RateCache
+) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rates.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as reader, sessionmaker() as writer:
+        reader.add(Currency(code="EUR", name="EUR"))
+        reader.add(CurrencyRate(currency_code="EUR", rate_vs_usd=1.0, timestamp=T0))
+        await reader.commit()
+        execute = reader.execute
+
+        async def execute_then_ingest(*args: Any, **kwargs: Any) -> Any:
+            # The history was read; a new rate is committed before it is cached
+            result = await execute(*args, **kwargs)
+            new = CurrencyRate(
+                currency_code="EUR", rate_vs_usd=2.0, timestamp=T0 + timedelta(days=1)
+            )
+            await CurrencyRate.ingest(writer, [new])
+            return result
+
+        reader.execute = execute_then_ingest  # type: ignore[method-assign]
+        at = T0 + timedelta(days=2)
+        assert await CurrencyRate.rate_at_async(reader, "EUR", at) == 1.0
+        del reader.execute
+        assert (CurrencyRate.database_key(reader), "EUR") not in fresh_rate_cache
+        assert await CurrencyRate.rate_at_async(reader, "EUR", at) == 2.0
+        assert (CurrencyRate.database_key(reader), "EUR") in fresh_rate_cache
+    await engine.dispose()
+
+
+def test_generation_changes_on_extend_and_invalidate(
+    fresh_rate_cache: RateCache,
+) -> None:
+    start = fresh_rate_cache.generation("a")
+    fresh_rate_cache.extend([], "a")
+    assert fresh_rate_cache.generation("a") == start + 1
+    assert fresh_rate_cache.generation("b") == 0
+    fresh_rate_cache.invalidate()
+    assert fresh_rate_cache.generation("b") == 1
+    fresh_rate_cache.load("EUR", [(T0, 0.9)], "b", generation=0)
+    assert ("b", "EUR") not in fresh_rate_cache
+    fresh_rate_cache.load("EUR", [(T0, 0.9)], "b", generation=1)
+    assert ("b", "EUR") in fresh_rate_cache
@@ -0,0 +1,180 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from pyledger.models import Base, CurrencyRate, RateRefresh
+from pyledger.models.currency_rate import CurrencyRateProvider
+from pyledger.models.rate_cache import RateCache
+from pyledger.models.rate_provider import ERAPI
+from pyledger.rate_refresh import (
+    LOCK_RETRY_DELAY,
+    MIN_INTERVAL,
+    RateRefreshScheduler,
+    lock_statement,
+)
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+FIXTURE = Path(__file__).parent / "resources" / "erapi_fixture.json"
+
+
+class StubProvider(CurrencyRateProvider):
+    """Publishes a snapshot at ``SNAPSHOT`` and the next one a day later."""
+
+    SNAPSHOT: datetime = T0
+    fetches: int = 0
+
+    @classmethod
+    async def iter_rates(cls) -> AsyncGenerator[CurrencyRate, None]:
+        cls.fetches += 1
+        for code, rate in (("EUR", 0.9), ("GBP", 0.8)):
+            yield CurrencyRate(
+                currency_code=code, rate_vs_usd=rate, timestamp=cls.SNAPSHOT
+            )
+
+    @classmethod
+    def next_update(cls) -> datetime | None:
+        return cls.SNAPSHOT + timedelta(days=1)
+
+
+@pytest.fixture(autouse=True)
+def reset_stub_provider() -> None:
+    StubProvider.SNAPSHOT, StubProvider.fetches = T0, 0
+
+
+@pytest.fixture
+async def sessionmaker(
+    tmp_path: Path,
+) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    """The common DB shared by the "workers" of a test."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'common.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_refresh_fetches_only_when_due(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    worker = RateRefreshScheduler(sessionmaker, StubProvider)
+    first = await worker.refresh(now=T0 + timedelta(minutes=1))
+    assert first.fetched and first.result is not None
+    assert first.result.inserted == 2
+    assert first.next_update == T0 + timedelta(days=1)
+
+    later = await worker.refresh(now=T0 + timedelta(hours=6))
+    assert not later.fetched
+    assert later.next_update == T0 + timedelta(days=1)
+    assert StubProvider.fetches == 1
+
+    StubProvider.SNAPSHOT = T0 + timedelta(days=1)
+    due = await worker.refresh(now=T0 + timedelta(days=1, seconds=5))
+    assert due.fetched and StubProvider.fetches == 2
+    async with sessionmaker() as session:
+        assert await session.scalar(select(func.count(CurrencyRate.id))) == 4
+        state = await session.get(RateRefresh, "StubProvider")
+    assert state is not None
+    # SQLite reads the stored UTC value back naive
+    assert state.next_update_at == datetime(2026, 3, 3, 12, 0)
+
+
+@pytest.mark.asyncio
+async def test_other_workers_invalidate_instead_of_fetching(
+    sessionmaker: async_sessionmaker[AsyncSession], fresh_rate_cache: RateCache
+) -> None:
+    fetcher = RateRefreshScheduler(sessionmaker, StubProvider)
+    follower = RateRefreshScheduler(sessionmaker, StubProvider)
+    async with sessionmaker() as session:
+        eur = (CurrencyRate.database_key(session), "EUR")
+    await fetcher.refresh(now=T0)
+    assert not (await follower.refresh(now=T0)).fetched
+
+    # The follower's requests cache EUR; then the fetcher stores a new snapshot
+    async with sessionmaker() as session:
+        assert await CurrencyRate.rate_at_async(session, "EUR") == 0.9
+    StubProvider.SNAPSHOT = T0 + timedelta(days=1)
+    assert (await fetcher.refresh(now=T0 + timedelta(days=1))).fetched
+    assert eur in fresh_rate_cache  # the fetcher extends its own cache
+
+    outcome = await follower.refresh(now=T0 + timedelta(days=1, seconds=1))
+    assert not outcome.fetched
+    assert eur not in fresh_rate_cache
+    assert StubProvider.fetches == 2
+
+    # Nothing new since: the follower keeps its cache
+    async with sessionmaker() as session:
+        await CurrencyRate.rate_at_async(session, "EUR")
+    await follower.refresh(now=T0 + timedelta(days=1, hours=1))
+    assert eur in fresh_rate_cache
+
+
+@pytest.mark.asyncio
+async def test_one_fetch_when_workers_refresh_together(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    started, release = asyncio.Event(), asyncio.Event()
+
+    class SlowProvider(StubProvider):
+        @classmethod
+        async def iter_rates(cls) -> AsyncGenerator[CurrencyRate, None]:
+            started.set()
+            await release.wait()
+            async for rate in super().iter_rates():
+                yield rate
+
+    fetcher = RateRefreshScheduler(sessionmaker, SlowProvider)
+    other = RateRefreshScheduler(sessionmaker, SlowProvider)
+    fetching = asyncio.create_task(fetcher.refresh(now=T0))
+    await started.wait()
+    # Due but being fetched: look again shortly instead of waiting on the lock
+    lost = await asyncio.wait_for(other.refresh(now=T0), 1)
+    assert not lost.fetched and lost.next_update == T0 + LOCK_RETRY_DELAY
+
+    release.set()
+    assert (await fetching).fetched
+    retry = await other.refresh(now=T0 + LOCK_RETRY_DELAY)
+    assert not retry.fetched and retry.next_update == T0 + timedelta(days=1)
+    assert SlowProvider.fetches == 1
+
+    # Refreshing at the same instant: exactly one of the two fetches
+    SlowProvider.SNAPSHOT = T0 + timedelta(days=1)
+    late = T0 + timedelta(days=1, seconds=1)
+    outcomes = await asyncio.gather(fetcher.refresh(now=late), other.refresh(now=late))
+    assert [o.fetched for o in outcomes].count(True) == 1
+    assert SlowProvider.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_next_update_from_erapi_with_floor(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    snapshot = json.loads(FIXTURE.read_text())
+
+    class FixtureERAPI(ERAPI):
+        @classmethod
+        async def make_request(cls, *args: Any, **kwargs: Any) -> ERAPI:
+            return cls.model_validate(snapshot)
+
+    announced = datetime.fromtimestamp(snapshot["time_next_update_unix"], timezone.utc)
+    worker = RateRefreshScheduler(sessionmaker, FixtureERAPI)
+    outcome = await worker.refresh(now=announced - timedelta(hours=1))
+    assert FixtureERAPI.next_update() == announced
+    assert outcome.next_update == announced
+
+    # Past the announced time but nothing newer published: retry after the floor
+    late = announced + timedelta(seconds=10)
+    assert (await worker.refresh(now=late)).next_update == late + MIN_INTERVAL
+
+
+def test_lock_statement_on_postgres() -> None:
+    pg = postgresql.dialect()  # type: ignore[no-untyped-call]
+    sql = str(lock_statement().compile(dialect=pg))
+    assert "pg_try_advisory_xact_lock" in sql
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, ClassVar
+
+import httpx
+import pytest
+
+from pyledger.models.currency_rate import ERAPI
+from pyledger.models.rate_response_cache import ResponseCache
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(__file__), "resources", "erapi_fixture.json"
+)
+ETAG = '"snapshot-1"'
+
+
+class FakeProvider:
+    """MockTransport handler that honours If-None-Match."""
+
+    def __init__(self, next_update: float) -> None:
+        with open(FIXTURE_PATH) as f:
+            self.payload: dict[str, Any] = json.load(f)
+        self.payload["time_next_update_unix"] = int(next_update)
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == ETAG:
+            return httpx.Response(304)
+        return httpx.Response(200, json=self.payload, headers={"ETag": ETAG})
+
+
+def make_provider(cache: ResponseCache) -> type[ERAPI]:
+    class CachedERAPI(ERAPI):
+        RESPONSE_CACHE: ClassVar[ResponseCache | None] = cache
+
+    return CachedERAPI
+
+
+@pytest.mark.asyncio
+async def test_served_from_memory_until_next_update(tmp_path: Path) -> None:
+    fake = FakeProvider(next_update=time.time() + 3600)
+    provider = make_provider(ResponseCache(str(tmp_path)))
+    async with httpx.AsyncClient(transport=httpx.MockTransport(fake)) as client:
+        first = await provider.make_request(client=client)
+        for _ in range(10):
+            assert await provider.make_request(client=client) is first
+    assert len(fake.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_revalidates_with_etag_when_due(tmp_path: Path) -> None:
+    fake = FakeProvider(next_update=time.time() - 60)
+    cache = ResponseCache(str(tmp_path), revalidate_interval=0)
+    provider = make_provider(cache)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(fake)) as client:
+        first = await provider.make_request(client=client)
+        second = await provider.make_request(client=client)
+    assert len(fake.requests) == 2
+    assert fake.requests[1].headers["If-None-Match"] == ETAG
+    assert second.rates == first.rates
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_shared_between_workers(tmp_path: Path) -> None:
+    fake = FakeProvider(next_update=time.time() + 3600)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(fake)) as client:
+        await make_provider(ResponseCache(str(tmp_path))).make_request(client=client)
+        # A second worker process starts with an empty memory cache
+        other = make_provider(ResponseCache(str(tmp_path)))
+        snapshot = await other.make_request(client=client)
+        # The disk entry is parsed once, then served parsed from memory
+        assert await other.make_request(client=client) is snapshot
+    assert len(fake.requests) == 1
+    assert snapshot.base_code == "USD"
+    assert not any(
+        "open.er-api.com" in name or "v6" in name for name in os.listdir(tmp_path)
+    )
+
+
+@pytest.mark.asyncio
+async def test_invalid_responses_are_not_cached(tmp_path: Path) -> None:
+    fake = FakeProvider(next_update=time.time() + 3600)
+    fake.payload["result"] = "error"
+    provider = make_provider(ResponseCache(str(tmp_path)))
+    async with httpx.AsyncClient(transport=httpx.MockTransport(fake)) as client:
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await provider.make_request(client=client)
+    assert len(fake.requests) == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_dir_read_on_use(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ResponseCache()
+    monkeypatch.setenv("RATE_CACHE_DIR", str(tmp_path))
+    assert cache.directory == str(tmp_path)
+    assert ResponseCache(None).directory is None
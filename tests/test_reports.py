@@ -0,0 +1,75 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.journal import merge_balance_deltas, post_entry
+from pyledger.models import Account, Company
+from pyledger.models.account import AccountType
+from pyledger.reports import balance_sheet, profit_and_loss
+
+
+@pytest.mark.asyncio
+async def test_balance_sheet_and_profit_and_loss(async_session: AsyncSession) -> None:
+    company = Company(name="Acme")
+    async_session.add(company)
+    await async_session.flush()
+    accounts = {
+        name: Account(
+            company_id=company.id, name=name, type=type_, currency_code="USD"
+        )
+        for name, type_ in (
+            ("Bank", AccountType.ASSET),
+            ("Loan", AccountType.LIABILITY),
+            ("Capital", AccountType.EQUITY),
+            ("Sales", AccountType.INCOME),
+            ("Rent", AccountType.EXPENSE),
+        )
+    }
+    async_session.add_all(accounts.values())
+    await async_session.flush()
+    ids = {name: account.id for name, account in accounts.items()}
+
+    async def post(day: date, debit: str, credit: str, amount: int) -> None:
+        await post_entry(
+            async_session,
+            company.id,
+            [(ids[debit], amount), (ids[credit], -amount)],
+            effective_date=day,
+        )
+
+    await post(date(2026, 1, 2), "Bank", "Capital", 1000)
+    await post(date(2026, 1, 15), "Bank", "Loan", 500)
+    await post(date(2026, 2, 3), "Bank", "Sales", 300)
+    await post(date(2026, 2, 28), "Rent", "Bank", 120)
+    await post(date(2026, 3, 10), "Bank", "Sales", 50)
+    await async_session.commit()
+    await merge_balance_deltas(async_session)
+    await post(date(2026, 2, 10), "Bank", "Sales", 7)  # back-dated, pending
+    await async_session.commit()
+
+    sheet = await balance_sheet(async_session, company.id, date(2026, 2, 28))
+    amounts = {line.name: line.amount for line in sheet.lines}
+    assert amounts == {"Bank": 1687, "Loan": 500, "Capital": 1000}
+    assert sheet.retained_earnings == {"USD": Decimal(187)}
+    assets = sheet.total(AccountType.ASSET)
+    claims = sheet.total(AccountType.LIABILITY, AccountType.EQUITY)
+    assert assets == {"USD": claims["USD"] + sheet.retained_earnings["USD"]}
+
+    pnl = await profit_and_loss(
+        async_session, company.id, date(2026, 2, 1), date(2026, 3, 31)
+    )
+    assert {line.name: line.amount for line in pnl.lines} == {
+        "Sales": 357,
+        "Rent": 120,
+    }
+    assert pnl.net_income == {"USD": Decimal(237)}
+    january = await profit_and_loss(
+        async_session, company.id, date(2026, 1, 1), date(2026, 1, 31)
+    )
+    assert january.net_income == {"USD": Decimal(0)}
+    with pytest.raises(ValueError):
+        await profit_and_loss(
+            async_session, company.id, date(2026, 2, 1), date(2026, 1, 1)
+        )
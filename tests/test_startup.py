@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+import pytest
+
+from pyledger.app import create_app
+from pyledger.models import CurrencyRate
+from pyledger.models.rate_provider import ERAPI
+
+
+def test_app_import_defers_heavy_modules() -> None:
+    code = (
+        "import sys, pyledger.app\n"
+        "lazy = ('httpx', 'pycountry', 'numpy', 'pyledger.models.rate_provider')\n"
+        "print(','.join(m for m in lazy if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_default_rate_provider_resolved_lazily() -> None:
+    assert CurrencyRate.RATE_PROVIDER is None
+    assert CurrencyRate.rate_provider() is ERAPI
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_reference_data(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setenv("SCHEMA_STARTUP", "skip")
+    app = create_app()
+    with caplog.at_level("INFO", logger="pyledger.migration"):
+        async with app.router.lifespan_context(app):
+            pass
+    assert "Startup complete" in caplog.text
+    assert "schema skip, reference data warm-up" in caplog.text
@@ -0,0 +1,197 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pyledger.models import TenantRecord
+from pyledger.tenancy import (
+    HeaderResolver,
+    SingleTenantResolver,
+    SubdomainResolver,
+    Tenant,
+    TenantCache,
+    TenantResolver,
+    get_tenant,
+    get_tenant_resolver,
+    set_tenant_resolver,
+)
+
+TENANTS = {"acme": Tenant(id="acme", db_name="tenant_acme")}
+
+
+class CountingLookup:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls: list[str] = []
+        self.delay = delay
+
+    async def __call__(self, key: str) -> Tenant | None:
+        self.calls.append(key)
+        await asyncio.sleep(self.delay)
+        return TENANTS.get(key)
+
+
+def make_request(headers: dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+@pytest.fixture
+def restore_resolver() -> Iterator[None]:
+    original = get_tenant_resolver()
+    yield
+    set_tenant_resolver(original)
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_and_negative_caching() -> None:
+    lookup = CountingLookup()
+    cache = TenantCache(lookup)
+    for _ in range(5):
+        assert await cache.get("acme") == TENANTS["acme"]
+        assert await cache.get("nope") is None
+    assert lookup.calls == ["acme", "nope"]
+
+
+@pytest.mark.asyncio
+async def test_cache_expiry_and_invalidation() -> None:
+    lookup = CountingLookup()
+    cache = TenantCache(lookup, ttl=0, negative_ttl=0)
+    await cache.get("acme")
+    await cache.get("acme")
+    assert lookup.calls == ["acme", "acme"]
+
+    cache = TenantCache(lookup)
+    await cache.get("acme")
+    cache.invalidate("acme")
+    await cache.get("acme")
+    assert lookup.calls.count("acme") == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_lookup() -> None:
+    lookup = CountingLookup(delay=0.01)
+    cache = TenantCache(lookup)
+    results = await asyncio.gather(*(cache.get("acme") for _ in range(50)))
+    assert all(r == TENANTS["acme"] for r in results)
+    assert lookup.calls == ["acme"]
+
+
+@pytest.mark.asyncio
+async def test_waiter_retries_when_leader_cancelled() -> None:
+    lookup = CountingLookup(delay=0.05)
+    cache = TenantCache(lookup)
+    leader = asyncio.create_task(cache.get("acme"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get("acme"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await waiter == TENANTS["acme"]
+    assert leader.cancelled()
+    assert lookup.calls == ["acme", "acme"]
+
+    # A cancelled waiter still sees its own cancellation
+    cache.invalidate()
+    leader = asyncio.create_task(cache.get("acme"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get("acme"))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert await leader == TENANTS["acme"]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_lookup_not_lost() -> None:
+    registered: dict[str, Tenant] = {}
+    started = asyncio.Event()
+
+    async def lookup(key: str) -> Tenant | None:
+        tenant = registered.get(key)  # read before the tenant is committed
+        started.set()
+        await asyncio.sleep(0.01)
+        return tenant
+
+    cache = TenantCache(lookup)
+    pending = asyncio.create_task(cache.get("beta"))
+    await started.wait()
+    registered["beta"] = Tenant(id="beta", db_name="tenant_beta")
+    cache.invalidate("beta")
+    assert await pending is None
+    assert await cache.get("beta") == registered["beta"]
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_not_cached() -> None:
+    calls = 0
+
+    async def flaky(key: str) -> Tenant | None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ConnectionError("common DB down")
+        return TENANTS.get(key)
+
+    cache = TenantCache(flaky)
+    with pytest.raises(ConnectionError):
+        await cache.get("acme")
+    assert await cache.get("acme") == TENANTS["acme"]
+
+
+@pytest.mark.asyncio
+async def test_subdomain_resolver() -> None:
+    resolver = SubdomainResolver("app.example.com", CountingLookup())
+    request = make_request({"host": "ACME.app.example.com:8443"})
+    assert await resolver.resolve(request) == TENANTS["acme"]
+    with pytest.raises(HTTPException) as err:
+        await resolver.resolve(make_request({"host": "other.app.example.com"}))
+    assert err.value.status_code == 404
+    with pytest.raises(HTTPException) as err:
+        await resolver.resolve(make_request({"host": "app.example.com"}))
+    assert err.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_header_resolver_sets_request_state(restore_resolver: None) -> None:
+    set_tenant_resolver(HeaderResolver(CountingLookup()))
+    request = make_request({"X-Tenant": " Acme "})
+    tenant = await get_tenant(request)
+    assert tenant == TENANTS["acme"]
+    assert request.state.tenant is tenant
+
+
+@pytest.mark.asyncio
+async def test_single_tenant_resolver_default() -> None:
+    resolver: TenantResolver = SingleTenantResolver()
+    assert await resolver.resolve(make_request({})) == Tenant(id="default")
+
+
+@pytest.mark.asyncio
+async def test_tenant_record_writes_invalidate_cache(
+    async_session: AsyncSession, restore_resolver: None
+) -> None:
+    async def db_lookup(slug: str) -> Tenant | None:
+        record = await TenantRecord.lookup(async_session, slug)
+        return Tenant(id=record.slug, db_name=record.db_name) if record else None
+
+    resolver = HeaderResolver(db_lookup)
+    set_tenant_resolver(resolver)
+    assert await resolver.cache.get("acme") is None  # negatively cached
+
+    record = TenantRecord(slug="acme", name="Acme", db_name="tenant_acme")
+    async_session.add(record)
+    await async_session.commit()
+    assert await resolver.cache.get("acme") == Tenant("acme", "tenant_acme")
+
+    record.slug = "acme2"
+    await async_session.commit()
+    assert await resolver.cache.get("acme") is None
+    assert await resolver.cache.get("acme2") == Tenant("acme2", "tenant_acme")